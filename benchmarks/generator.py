@@ -0,0 +1,115 @@
+import logging
+from typing import Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dates import DATE_FORMAT, PAYMENT_DATE_FORMAT
+
+logger = logging.getLogger(__name__)
+
+# Зерно генератора по умолчанию: одинаковое зерно дает одинаковые данные
+DEFAULT_SEED = 42
+
+# Период, за который генерируются операции
+PERIOD_START = pd.Timestamp("2018-01-01")
+PERIOD_END = pd.Timestamp("2021-12-31 23:59:59")
+
+# Категории: доля операций, MCC, описания, диапазон суммы и знак (пополнения и бонусы положительные)
+CATEGORIES: List[Tuple[str, float, float, List[str], Tuple[float, float], int]] = [
+    ("Супермаркеты", 0.34, 5411, ["Колхоз", "Магнит", "Пятёрочка", "Перекрёсток", "Лента"], (50, 3000), -1),
+    ("Фастфуд", 0.19, 5814, ["Mouse Tail", "Burger King", "KFC", "Теремок"], (50, 800), -1),
+    ("Транспорт", 0.06, 4111, ["Метро Санкт-Петербург", "Яндекс Такси", "Автобус"], (30, 1000), -1),
+    (
+        "Переводы",
+        0.05,
+        np.nan,
+        ["Иван С.", "Мария К.", "Константин Ф.", "Светлана Т.", 'На р/с ООО "ФОРТУНА"', "Перевод на карту"],
+        (500, 50000),
+        -1,
+    ),
+    ("Ж/д билеты", 0.04, 4112, ["РЖД"], (500, 8000), -1),
+    ("Различные товары", 0.03, 5399, ["Ozon.ru", "Wildberries"], (100, 5000), -1),
+    ("Мобильная связь", 0.03, 4814, ["МТС +7 921 11-22-33", "Билайн"], (100, 1000), -1),
+    ("Пополнения", 0.03, np.nan, ["Пополнение через Тинькофф Банк", "Внесение наличных"], (1000, 100000), 1),
+    ("Аптеки", 0.02, 5912, ["Аптека Вита", "36,6"], (100, 3000), -1),
+    ("Каршеринг", 0.02, 7512, ["Ситидрайв", "Делимобиль"], (100, 2000), -1),
+    ("Рестораны", 0.02, 5812, ["Таверна", "Кофейня"], (500, 6000), -1),
+    ("Бонусы", 0.015, np.nan, ["Кэшбэк за обычные покупки"], (10, 500), 1),
+    ("Наличные", 0.015, 6011, ["Снятие в банкомате"], (1000, 20000), -1),
+    ("Дом и ремонт", 0.015, 5200, ["Леруа Мерлен"], (200, 10000), -1),
+    ("Услуги банка", 0.015, np.nan, ["Плата за обслуживание"], (50, 500), -1),
+]
+
+# Карты и их доли (у части операций номер карты не указан, как в реальной выгрузке)
+CARDS: List[Any] = ["*7197", "*4556", np.nan, "*5091", "*5441"]
+CARD_WEIGHTS = [0.72, 0.17, 0.097, 0.008, 0.005]
+
+# Валюты операций, их доли и курс к рублю
+CURRENCIES = ["RUB", "TRY", "EUR", "CNY"]
+CURRENCY_WEIGHTS = [0.98, 0.011, 0.005, 0.004]
+CURRENCY_RATES = np.array([1.0, 5.5, 85.0, 11.5])
+
+
+def _format_dates(seconds: np.ndarray, date_format: str) -> np.ndarray:
+    """Форматирует секунды от начала периода в строки по формату «дата[ время]».
+
+    Дни и время суток форматируются по уникальным значениям, а строки собираются сложением
+    массивов, поэтому форматирование не становится узким местом даже для 10 млн строк."""
+    day_format, _, time_format = date_format.partition(" ")
+    days, day_idx = np.unique(seconds // 86_400, return_inverse=True)
+    day_strings = (PERIOD_START.normalize() + pd.to_timedelta(days, unit="D")).strftime(day_format).to_numpy(object)
+    if not time_format:
+        return day_strings[day_idx]
+    times, time_idx = np.unique(seconds % 86_400, return_inverse=True)
+    time_strings = (pd.Timestamp(0) + pd.to_timedelta(times, unit="s")).strftime(time_format).to_numpy(object)
+    return day_strings[day_idx] + " " + time_strings[time_idx]
+
+
+def generate_operations(rows: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """Генерирует синтетическую выгрузку операций в схеме data/operations.xlsx.
+
+    Данные детерминированы зерном seed, операции отсортированы от новых к старым, как в выгрузке банка."""
+    logger.info("Генерация %d синтетических операций (seed=%s)", rows, seed)
+    rng = np.random.default_rng(seed)
+    span = int((PERIOD_END - PERIOD_START).total_seconds()) + 1
+    seconds = np.sort(rng.integers(0, span, size=rows))[::-1]
+
+    weights = np.array([category[1] for category in CATEGORIES])
+    category_idx = rng.choice(len(CATEGORIES), size=rows, p=weights / weights.sum())
+    low = np.array([category[4][0] for category in CATEGORIES])[category_idx]
+    high = np.array([category[4][1] for category in CATEGORIES])[category_idx]
+    sign = np.array([category[5] for category in CATEGORIES])[category_idx]
+    amounts = np.round(low + (high - low) * rng.random(rows) ** 3, 2) * sign
+
+    # Описание выбирается из описаний категории
+    descriptions = np.empty(rows, dtype=object)
+    for position, (_, _, _, category_descriptions, _, _) in enumerate(CATEGORIES):
+        selected = np.flatnonzero(category_idx == position)
+        choices = np.array(category_descriptions, dtype=object)
+        descriptions[selected] = choices[rng.integers(0, len(choices), size=len(selected))]
+
+    currency_idx = rng.choice(len(CURRENCIES), size=rows, p=CURRENCY_WEIGHTS)
+    operation_amounts = np.round(amounts / CURRENCY_RATES[currency_idx], 2)
+    cards = np.array(CARDS, dtype=object)[rng.choice(len(CARDS), size=rows, p=CARD_WEIGHTS)]
+    cashback = np.where(rng.random(rows) < 0.09, np.round(np.abs(amounts) * 0.01, 0), np.nan)
+
+    return pd.DataFrame(
+        {
+            "Дата операции": _format_dates(seconds, DATE_FORMAT),
+            "Дата платежа": _format_dates(seconds, PAYMENT_DATE_FORMAT),
+            "Номер карты": cards,
+            "Статус": np.where(rng.random(rows) < 0.006, "FAILED", "OK").astype(object),
+            "Сумма операции": operation_amounts,
+            "Валюта операции": np.array(CURRENCIES, dtype=object)[currency_idx],
+            "Сумма платежа": amounts,
+            "Валюта платежа": np.full(rows, "RUB", dtype=object),
+            "Кэшбэк": cashback,
+            "Категория": np.array([category[0] for category in CATEGORIES], dtype=object)[category_idx],
+            "MCC": np.array([category[2] for category in CATEGORIES], dtype=float)[category_idx],
+            "Описание": descriptions,
+            "Бонусы (включая кэшбэк)": np.where(amounts < 0, np.abs(amounts) // 100, 0).astype(np.int64),
+            "Округление на инвесткопилку": np.zeros(rows, dtype=np.int64),
+            "Сумма операции с округлением": np.abs(amounts),
+        }
+    )
@@ -0,0 +1,65 @@
+"""Бенчмарк времени импорта модулей пакета (холодный старт короткой команды).
+
+Запуск: python -m benchmarks.imports [--module src.views] [--repeat 5] [--budget 0.3]
+Каждый замер выполняется в новом интерпретаторе. Команда завершается с кодом 1, если лучшее время
+импорта больше бюджета или при импорте загрузились тяжелые зависимости."""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Корень проекта: из него запускается интерпретатор, чтобы импортировался пакет src
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Модуль и бюджет времени импорта по умолчанию (в секундах)
+DEFAULT_MODULE = "src.views"
+DEFAULT_BUDGET = 0.3
+
+# Зависимости, которые должны загружаться только при вызове функций, а не при импорте пакета
+HEAVY_MODULES = ("pandas", "numpy", "requests", "dotenv", "openpyxl")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str = DEFAULT_MODULE, repeat: int = 5) -> Dict[str, Any]:
+    """Замеряет импорт module в новых интерпретаторах и возвращает лучшее время и загруженные тяжелые модули."""
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "best_s": min(run["seconds"] for run in runs),
+        "loaded": sorted({name for run in runs for name in run["loaded"]}),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа: замеряет импорт и сравнивает с бюджетом."""
+    parser = argparse.ArgumentParser(description="Бенчмарк времени импорта пакета")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="импортируемый модуль")
+    parser.add_argument("--repeat", type=int, default=5, help="число замеров")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="бюджет времени импорта в секундах")
+    args = parser.parse_args(argv)
+
+    result = measure_import(args.module, args.repeat)
+    print(f"import {result['module']}: {result['best_s'] * 1000:.1f} мс (бюджет {args.budget * 1000:.0f} мс)")
+    if result["loaded"]:
+        print(f"При импорте загружены тяжелые зависимости: {', '.join(result['loaded'])}")
+    return 1 if result["best_s"] > args.budget or result["loaded"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
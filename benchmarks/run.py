@@ -0,0 +1,220 @@
+"""Бенчмарки основных функций на синтетических операциях.
+
+Запуск: python -m benchmarks.run --sizes 10k 1m [--repeat 3] [--output results.json] [--baseline old.json]
+Результаты сохраняются в JSON; при указании --baseline время сравнивается с прошлым запуском."""
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+import src.utils as utils
+from benchmarks.generator import DEFAULT_SEED, generate_operations
+from src.config import load_user_currencies, load_user_stocks
+from src.market_data import QuoteCache
+from src.reports import spending_by_category
+from src.services import get_transactions_ind
+from src.store import TransactionStore, parse_operations
+from src.utils import get_expenses_cards, load_env, top_transaction
+from src.views import form_main_page_info
+
+logger = logging.getLogger(__name__)
+
+# Именованные размеры синтетической выгрузки
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_SIZES = ["10k", "1m"]
+
+# Директория для результатов по умолчанию
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Даты запросов: конец периода синтетических данных
+MAIN_PAGE_DATE = "2021-12-31 23:59:59"
+REPORT_DATE = "31.12.2021 23:59:59"
+REPORT_CATEGORY = "Супермаркеты"
+
+# Допустимое замедление относительно базового запуска (доля)
+DEFAULT_TOLERANCE = 0.2
+
+
+def parse_size(size: str) -> int:
+    """Переводит размер («10k», «1m», «10m» или число строк) в число строк."""
+    if size.lower() in SIZES:
+        return SIZES[size.lower()]
+    return int(size)
+
+
+@contextlib.contextmanager
+def _offline_quotes() -> Iterator[None]:
+    """Подменяет кэш котировок отдельным кэшем с постоянными значениями, чтобы бенчмарк не обращался к сети.
+
+    Общий кэш котировок (и его файл) не изменяется, подмена и API-ключ действуют только внутри блока."""
+    cache = QuoteCache({"fx": math.inf, "stock": math.inf})
+    rates = {"RUB": 75.0, **{currency: 1.0 for currency in load_user_currencies()}}
+    cache.put("fx", "USD", {"rates": rates})
+    for stock in load_user_stocks():
+        cache.put("stock", stock, {"stock": stock, "price": 100.0})
+
+    # .env читается до подстановки ключа: иначе его значения были бы потеряны после восстановления окружения
+    load_env()
+    previous_cache, previous_key = utils.quote_cache, os.environ.get("API_KEY")
+    utils.quote_cache = cache
+    os.environ.setdefault("API_KEY", "benchmark")
+    try:
+        yield
+    finally:
+        utils.quote_cache = previous_cache
+        if previous_key is None:
+            os.environ.pop("API_KEY", None)
+
+
+def benchmark_cases(df: pd.DataFrame) -> Dict[str, Callable[[], Any]]:
+    """Возвращает измеряемые функции, вызванные на операциях из хранилища."""
+    return {
+        "form_main_page_info": lambda: form_main_page_info(MAIN_PAGE_DATE),
+        "spending_by_category": lambda: spending_by_category(df, REPORT_CATEGORY, REPORT_DATE),
+        "get_transactions_ind": lambda: get_transactions_ind(df),
+        "get_expenses_cards": lambda: get_expenses_cards(df),
+        "top_transaction": lambda: top_transaction(df),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Замеряет лучшее и среднее время repeat запусков и пиковую память отдельного запуска."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    # Память считается отдельным запуском: tracemalloc замедляет код и исказил бы время
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"best_s": min(timings), "mean_s": sum(timings) / len(timings), "peak_mb": peak / 2**20}
+
+
+def run_benchmarks(sizes: List[str], repeat: int = 3, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """Запускает бенчмарки для каждого размера и возвращает результаты с описанием окружения."""
+    results = []
+    previous_store = TransactionStore.set_instance(None)
+    try:
+        # Отчеты декоратора spending_by_category пишутся во временную директорию
+        with _offline_quotes(), tempfile.TemporaryDirectory() as workdir, contextlib.chdir(workdir):
+            for size in sizes:
+                rows = parse_size(size)
+                started = time.perf_counter()
+                df = generate_operations(rows, seed)
+                generated = time.perf_counter() - started
+
+                started = time.perf_counter()
+                store = TransactionStore.from_frame(parse_operations(df))
+                TransactionStore.set_instance(store)
+                loaded = time.perf_counter() - started
+                logger.info("%d строк: генерация %.2f с, загрузка в хранилище %.2f с", rows, generated, loaded)
+                results.append(
+                    {
+                        "size": size,
+                        "rows": rows,
+                        "function": "TransactionStore.from_frame",
+                        "best_s": loaded,
+                        "mean_s": loaded,
+                        "peak_mb": None,
+                        "rows_per_s": rows / loaded if loaded else None,
+                    }
+                )
+
+                for name, func in benchmark_cases(store.frame()).items():
+                    timing = measure(func, repeat)
+                    throughput = rows / timing["best_s"] if timing["best_s"] else None
+                    results.append({"size": size, "rows": rows, "function": name, **timing, "rows_per_s": throughput})
+                    logger.info("%s (%d строк): %.4f с, %.1f МБ", name, rows, timing["best_s"], timing["peak_mb"])
+    finally:
+        TransactionStore.set_instance(previous_store)
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_results(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """Сравнивает лучшее время с базовым запуском и возвращает описания замедлений больше tolerance."""
+    previous = {(item["size"], item["function"]): item for item in baseline.get("results", [])}
+    regressions = []
+    for item in current["results"]:
+        old = previous.get((item["size"], item["function"]))
+        if old is None or not old.get("best_s"):
+            continue
+        ratio = item["best_s"] / old["best_s"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{item['function']} ({item['size']}): {old['best_s']:.4f} с -> {item['best_s']:.4f} с (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    """Печатает результаты в виде таблицы."""
+    print(f"{'size':>6} {'function':<28} {'best, s':>10} {'mean, s':>10} {'rows/s':>14} {'peak, MB':>10}")
+    for item in report["results"]:
+        peak = f"{item['peak_mb']:.1f}" if item["peak_mb"] is not None else "-"
+        throughput = f"{item['rows_per_s']:.0f}" if item["rows_per_s"] else "-"
+        print(
+            f"{item['size']:>6} {item['function']:<28} {item['best_s']:>10.4f} {item['mean_s']:>10.4f} "
+            f"{throughput:>14} {peak:>10}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа: запускает бенчмарки, сохраняет JSON и при необходимости сравнивает с базовым."""
+    parser = argparse.ArgumentParser(description="Бенчмарки анализа банковских операций")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="размеры: 10k, 1m, 10m или число строк")
+    parser.add_argument("--repeat", type=int, default=3, help="число замеров каждой функции")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="зерно генератора данных")
+    parser.add_argument("--output", type=Path, help="файл для результатов в формате JSON")
+    parser.add_argument("--baseline", type=Path, help="результаты прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="допустимое замедление")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.repeat, args.seed)
+    _print_table(report)
+
+    output = args.output or RESULTS_DIR / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты сохранены в {output}")
+
+    if args.baseline:
+        regressions = compare_results(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for message in regressions:
+            print(f"Замедление: {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
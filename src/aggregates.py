@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+from src.lazy import lazy_import
+from src.metrics import timed
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Длительность суток в наносекундах
+DAY_NS = 86_400 * 10**9
+
+
+class DailyRollup:
+    """Накопленные по дням суммы значения в разрезе ключа (карты, категории и т. п.).
+
+    Сумма за любой интервал складывается из разности префиксных сумм по целым дням
+    и небольшого числа операций из неполных крайних дней, поэтому время ответа
+    не зависит от длины истории."""
+
+    def __init__(self, dates: pd.DatetimeIndex, keys: pd.Series, values: pd.Series, mask: Any = None) -> None:
+        dates_ns, keys_arr, values_arr = self._select(dates, keys, values, mask)
+        codes, labels = pd.factorize(keys_arr, sort=True)
+
+        self.labels = pd.Index(labels)
+        self._dates = dates_ns
+        self._codes = codes
+        self._values = values_arr
+
+        days = self._dates // DAY_NS
+        self._days, day_idx = np.unique(days, return_inverse=True)
+        daily = np.zeros((len(self._days), len(self.labels)))
+        np.add.at(daily, (day_idx, self._codes), self._values)
+        self._prefix = np.vstack([np.zeros((1, len(self.labels))), np.cumsum(daily, axis=0)])
+        logger.debug("Построен свод: %d дней, %d ключей", len(self._days), len(self.labels))
+
+    @staticmethod
+    def _select(
+        dates: pd.DatetimeIndex, keys: pd.Series, values: pd.Series, mask: Any
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Отбирает учитываемые операции и сортирует их по дате."""
+        dates = pd.DatetimeIndex(dates)
+        dates_ns = np.asarray(dates.asi8)
+        keys_arr = np.asarray(keys, dtype=object)
+        values_arr = np.asarray(values, dtype="float64")
+        # Операции без даты, суммы или ключа (например, без номера карты) не учитываются
+        selected = ~dates.isna() & ~np.isnan(values_arr) & pd.notna(keys_arr)
+        if mask is not None:
+            selected &= np.asarray(mask, dtype=bool)
+        order = np.argsort(dates_ns[selected], kind="stable")
+        return dates_ns[selected][order], keys_arr[selected][order], values_arr[selected][order]
+
+    def appended(self, dates: pd.DatetimeIndex, keys: pd.Series, values: pd.Series, mask: Any = None) -> "DailyRollup":
+        """Возвращает новый свод, дополненный операциями не раньше уже учтенных.
+
+        Пересчитываются только суммы новых дней (и последнего дня, если новые операции в него попадают),
+        поэтому стоимость пропорциональна числу новых операций. Исходный свод не изменяется."""
+        dates_ns, keys_arr, values_arr = self._select(dates, keys, values, mask)
+        if not len(dates_ns):
+            return self
+        if len(self._dates) and dates_ns[0] < self._dates[-1]:
+            raise ValueError("В свод можно дописывать только операции не раньше уже учтенных")
+
+        labels, codes, prefix = self.labels, self._codes, self._prefix
+        new_labels = pd.Index(pd.unique(keys_arr)).difference(labels)
+        if len(new_labels):
+            # Новый ключ (карта, категория) появляется редко: тогда коды переупорядочиваются
+            labels = labels.append(new_labels).sort_values()
+            remap = labels.get_indexer(self.labels)
+            codes = remap[codes]
+            prefix = np.zeros((len(prefix), len(labels)))
+            prefix[:, remap] = self._prefix
+        new_codes = labels.get_indexer(keys_arr)
+
+        new_days, day_idx = np.unique(dates_ns // DAY_NS, return_inverse=True)
+        daily: np.ndarray = np.zeros((len(new_days), len(labels)))
+        np.add.at(daily, (day_idx, new_codes), values_arr)
+        days = self._days
+        if len(days) and new_days[0] == days[-1]:
+            # Новые операции продолжают последний учтенный день
+            prefix = np.vstack([prefix[:-1], prefix[-1:] + daily[:1]])
+            new_days, daily = new_days[1:], daily[1:]
+
+        rollup = object.__new__(DailyRollup)
+        rollup.labels = labels
+        rollup._dates = np.concatenate([self._dates, dates_ns])
+        rollup._codes = np.concatenate([codes, new_codes])
+        rollup._values = np.concatenate([self._values, values_arr])
+        rollup._days = np.concatenate([days, new_days])
+        rollup._prefix = np.vstack([prefix, prefix[-1] + np.cumsum(daily, axis=0)])
+        logger.debug("Свод дополнен %d операциями", len(dates_ns))
+        return rollup
+
+    # Массивы, из которых состоит свод (кроме меток ключей)
+    ARRAYS = ("dates", "codes", "values", "days", "prefix")
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Возвращает массивы свода, например для сохранения в снимок на диске."""
+        return {name: getattr(self, f"_{name}") for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, labels: Any, arrays: Dict[str, np.ndarray]) -> "DailyRollup":
+        """Восстанавливает свод из меток ключей и массивов to_arrays (в том числе отображенных в память)."""
+        rollup = object.__new__(cls)
+        rollup.labels = pd.Index(labels)
+        for name in cls.ARRAYS:
+            setattr(rollup, f"_{name}", arrays[name])
+        return rollup
+
+    def _raw_total(self, start_ns: int, end_ns: int) -> np.ndarray:
+        """Суммирует операции с датой в [start_ns, end_ns) напрямую."""
+        left = np.searchsorted(self._dates, start_ns, side="left")
+        right = np.searchsorted(self._dates, end_ns, side="left")
+        return np.bincount(self._codes[left:right], weights=self._values[left:right], minlength=len(self.labels))
+
+    @timed("aggregate")
+    def total(self, start: Any, end: Any) -> pd.Series:
+        """Возвращает суммы по ключам за интервал [start, end] включительно."""
+        start_ns = pd.Timestamp(start).value
+        end_ns = pd.Timestamp(end).value + 1  # Правая граница включительно
+        if start_ns >= end_ns:
+            return pd.Series(np.zeros(len(self.labels)), index=self.labels)
+
+        first_day = -(-start_ns // DAY_NS)  # Первые целые сутки внутри интервала
+        last_day = end_ns // DAY_NS  # Сутки, в которых интервал заканчивается
+        if first_day >= last_day:
+            totals = self._raw_total(start_ns, end_ns)
+        else:
+            lo = np.searchsorted(self._days, first_day, side="left")
+            hi = np.searchsorted(self._days, last_day, side="left")
+            totals = (
+                self._prefix[hi]
+                - self._prefix[lo]
+                + self._raw_total(start_ns, first_day * DAY_NS)
+                + self._raw_total(last_day * DAY_NS, end_ns)
+            )
+        return pd.Series(totals, index=self.labels)
+
+
+def _rollup_inputs(df: pd.DataFrame) -> Dict[str, Tuple[pd.Series, pd.Series, Any]]:
+    """Возвращает для каждого свода ключи, значения и маску учитываемых операций."""
+    inputs: Dict[str, Tuple[pd.Series, pd.Series, Any]] = {}
+    if {"Номер карты", "Сумма платежа"} <= set(df.columns):
+        inputs["card_spend"] = (df["Номер карты"], df["Сумма платежа"], df["Сумма платежа"] < 0)
+    if {"Номер карты", "Кэшбэк"} <= set(df.columns):
+        inputs["card_cashback"] = (df["Номер карты"], df["Кэшбэк"], None)
+    if {"Категория", "Сумма операции с округлением"} <= set(df.columns):
+        inputs["category_spend"] = (
+            df["Категория"],
+            df["Сумма операции с округлением"],
+            df["Сумма операции с округлением"] > 0,
+        )
+    return inputs
+
+
+@timed("aggregate")
+def build_rollups(df: pd.DataFrame) -> Dict[str, DailyRollup]:
+    """Строит своды по проиндексированному по дате датафрейму операций."""
+    dates = pd.DatetimeIndex(df.index)
+    return {name: DailyRollup(dates, keys, values, mask) for name, (keys, values, mask) in _rollup_inputs(df).items()}
+
+
+@timed("aggregate")
+def extend_rollups(rollups: Dict[str, DailyRollup], df: pd.DataFrame) -> Dict[str, DailyRollup]:
+    """Дополняет своды новыми операциями (проиндексированными по дате и не раньше уже учтенных)."""
+    dates = pd.DatetimeIndex(df.index)
+    extended = dict(rollups)
+    for name, (keys, values, mask) in _rollup_inputs(df).items():
+        if name in extended:
+            extended[name] = extended[name].appended(dates, keys, values, mask)
+        else:
+            extended[name] = DailyRollup(dates, keys, values, mask)
+    return extended
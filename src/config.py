@@ -1,7 +1,13 @@
 import json
+import logging
+import math
 import os
+import threading
+import time
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
+
+logger = logging.getLogger(__name__)
 
 # Определяем корневую директорию проекта
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -9,36 +15,199 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 # Путь к директории с данными
 DATA_DIR = PROJECT_ROOT / 'data'
 
-# Путь к файлу операций
-file_path = DATA_DIR / 'operations.xlsx'
+# Путь к файлу операций: Excel-выгрузка или JSON/JSONL в формате operations.json
+file_path = Path(os.environ.get('OPERATIONS_FILE', DATA_DIR / 'operations.xlsx'))
+
+# Путь к директории с кэшем разобранных операций
+CACHE_DIR = DATA_DIR / '.cache'
+
+# Снимки операций на диске (массивы NumPy, отображаемые в память) для быстрого холодного старта.
+# Включаются переменной окружения TRANSACTION_SNAPSHOT=1
+SNAPSHOT_DIR = CACHE_DIR / 'snapshots'
+SNAPSHOT_ENABLED = os.environ.get('TRANSACTION_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+
+# Разделы хранилища по пользователям: выгрузки <пользователь>.xlsx|json|jsonl или директории <пользователь>/
+PARTITIONS_DIR = Path(os.environ.get('PARTITIONS_DIR', DATA_DIR / 'users'))
+
+# Бюджет памяти загруженных разделов (в мегабайтах): сверх него давно не использованные разделы выгружаются
+PARTITION_MEMORY_BUDGET = int(float(os.environ.get('PARTITION_MEMORY_MB', 512)) * 2**20)
+
+# Время жизни котировок в кэше (в секундах) по источникам: курсы валют и цены акций
+QUOTE_TTL = {
+    'fx': float(os.environ.get('FX_QUOTE_TTL', 3600)),
+    'stock': float(os.environ.get('STOCK_QUOTE_TTL', 900)),
+}
+
+# Максимальное число котировок в кэше
+QUOTE_CACHE_SIZE = 256
+
+# Файл для сохранения кэша котировок между запусками (если не задан, кэш хранится только в памяти)
+QUOTE_CACHE_FILE = os.environ.get('QUOTE_CACHE_FILE')
 
 # Путь к директории с логами
 LOG_DIR = PROJECT_ROOT / 'logs'
-os.makedirs(LOG_DIR, exist_ok=True)  # Создаем директорию для логов, если она не существует
 
 # Файл логов
 LOG_FILE = LOG_DIR / 'app.log'
 
+
+class LoggingConfig(TypedDict):
+    """Настройки логирования: уровень, формат записей и файл логов."""
+
+    level: str
+    format: str
+    filename: Union[str, Path]
+
+
 # Настройки логирования
-LOGGING_CONFIG = {
-    'level': 'INFO',
-    'format': '%(asctime)s - %(levelname)s - %(message)s',
-    'filename': LOG_FILE,
+LOGGING_CONFIG: LoggingConfig = {
+    'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    'filename': os.environ.get('LOG_FILE', LOG_FILE),
 }
 
+# Профилирование стадий обработки: PROFILE_MODE=cprofile,tracemalloc (через запятую, по умолчанию выключено)
+PROFILE_MODE = os.environ.get('PROFILE_MODE', '')
+
+# Директория для файлов cProfile (*.prof)
+PROFILE_DIR = LOG_DIR / 'profiles'
+
+# Запись отчетов декоратора decorator_spending_by_category:
+# формат (json, compact, jsonl, parquet), путь к файлу (заменяет имя, заданное в декораторе)
+# и запись в фоновом потоке с объединением частых записей в одну
+REPORT_FORMAT = os.environ.get('REPORT_FORMAT', 'json')
+REPORT_PATH = os.environ.get('REPORT_PATH')
+REPORT_BACKGROUND = os.environ.get('REPORT_BACKGROUND', '').lower() in ('1', 'true', 'yes')
+
+# Сколько секунд фоновый поток ждет новых отчетов, прежде чем записать накопленные
+REPORT_FLUSH_INTERVAL = float(os.environ.get('REPORT_FLUSH_INTERVAL', 0.5))
+
+# Сериализация JSON: библиотека (auto - orjson, если установлен, иначе json; orjson; json)
+# и вывод с отступами вместо компактного
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+JSON_PRETTY = os.environ.get('JSON_PRETTY', '').lower() in ('1', 'true', 'yes')
+
 # Путь к файлу с пользовательскими настройками
 user_setting_path = Path(__file__).parent.parent / "user_settings.json"
 
+# Как часто (в секундах) проверять, не изменился ли файл настроек; 0 - при каждом обращении
+SETTINGS_CHECK_INTERVAL = float(os.environ.get('SETTINGS_CHECK_INTERVAL', 1.0))
+
+# Имя профиля настроек, заданного на верхнем уровне user_settings.json
+DEFAULT_PROFILE = 'default'
+
+# Поля профиля настроек
+SETTINGS_FIELDS = ('user_currencies', 'user_stocks')
+
+
+class UserSettings:
+    """Пользовательские настройки из user_settings.json, разобранные один раз и закэшированные.
+
+    Файл перечитывается только при изменении времени модификации или размера, а проверяется не чаще,
+    чем раз в check_interval секунд, поэтому обращение к настройкам на каждый запрос не читает файл.
+    Кроме настроек верхнего уровня (профиль default), файл может содержать именованные профили:
+    {"user_currencies": [...], "user_stocks": [...], "profiles": {"имя": {"user_currencies": [...]}}}.
+    Поля, не заданные в профиле, берутся из настроек верхнего уровня."""
+
+    def __init__(self, path: Union[str, Path], check_interval: float = SETTINGS_CHECK_INTERVAL) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._profiles: Optional[Dict[str, Dict[str, List[str]]]] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = -math.inf
+        self._lock = threading.Lock()
+
+    def profiles(self) -> Dict[str, Dict[str, List[str]]]:
+        """Возвращает все профили настроек по имени (профиль default всегда есть)."""
+        with self._lock:
+            now = time.monotonic()
+            profiles = self._profiles
+            if profiles is None or now - self._checked_at >= self.check_interval:
+                profiles = self._refresh()
+                self._checked_at = now
+            return profiles
+
+    def profile(self, name: Optional[str] = None) -> Dict[str, List[str]]:
+        """Возвращает профиль настроек name (по умолчанию default). Неизвестный профиль - KeyError."""
+        profiles = self.profiles()
+        name = name or DEFAULT_PROFILE
+        if name not in profiles:
+            raise KeyError(f"Профиль настроек {name} не найден в {self.path}")
+        return profiles[name]
+
+    def currencies(self, profile: Optional[str] = None) -> List[str]:
+        """Возвращает валюты профиля."""
+        return list(self.profile(profile)['user_currencies'])
+
+    def stocks(self, profile: Optional[str] = None) -> List[str]:
+        """Возвращает акции профиля."""
+        return list(self.profile(profile)['user_stocks'])
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш: при следующем обращении файл будет прочитан заново."""
+        with self._lock:
+            self._profiles = None
+            self._signature = None
+
+    def _refresh(self) -> Dict[str, Dict[str, List[str]]]:
+        """Перечитывает файл, если он изменился. Если файл пропал или не разбирается,
+        остаются прежние настройки (при первом чтении ошибка пробрасывается)."""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._profiles is not None and signature == self._signature:
+                return self._profiles
+            with open(self.path, encoding="utf-8") as file:
+                profiles = _parse_profiles(json.load(file))
+        except (OSError, ValueError) as e:
+            if self._profiles is None:
+                raise
+            logger.warning("Не удалось перечитать настройки %s, используются прежние: %s", self.path, e)
+            return self._profiles
+        self._profiles, self._signature = profiles, signature
+        logger.info("Загружены настройки %s (профилей: %d)", self.path, len(profiles))
+        return profiles
+
+
+def _string_list(values: Any) -> List[str]:
+    """Оставляет в списке настроек только строки."""
+    return [value for value in values if isinstance(value, str)] if isinstance(values, list) else []
+
+
+def _parse_profiles(content: Any) -> Dict[str, Dict[str, List[str]]]:
+    """Разбирает содержимое user_settings.json в словарь профилей.
+
+    Каждый именованный профиль должен быть объектом хотя бы с одним из полей SETTINGS_FIELDS, заданные
+    поля - списками. Некорректная структура - ValueError, при перечитывании остаются прежние настройки."""
+    if not isinstance(content, dict):
+        raise ValueError("Настройки должны быть JSON-объектом")
+    default = {field: _string_list(content.get(field, [])) for field in SETTINGS_FIELDS}
+    profiles = {DEFAULT_PROFILE: default}
+    named = content.get('profiles')
+    if named is None:
+        return profiles
+    if not isinstance(named, dict):
+        raise ValueError("Поле profiles должно быть JSON-объектом")
+    for name, profile in named.items():
+        if not isinstance(profile, dict) or not any(field in profile for field in SETTINGS_FIELDS):
+            raise ValueError(f"Профиль {name} должен быть JSON-объектом с полями {', '.join(SETTINGS_FIELDS)}")
+        if any(not isinstance(profile[field], list) for field in SETTINGS_FIELDS if field in profile):
+            raise ValueError(f"Поля профиля {name} должны быть списками")
+        profiles[name] = {
+            field: _string_list(profile[field]) if field in profile else default[field] for field in SETTINGS_FIELDS
+        }
+    return profiles
+
+
+# Общие для процесса настройки пользователя
+user_settings = UserSettings(user_setting_path)
+
 
-def load_user_currencies() -> List[str]:
-    """Загружает пользовательские валюты из файла user_settings.json."""
-    with open(user_setting_path, encoding="utf-8") as file:
-        content = json.load(file)
-    return [currency for currency in content.get('user_currencies', []) if isinstance(currency, str)]
+def load_user_currencies(profile: Optional[str] = None) -> List[str]:
+    """Загружает пользовательские валюты профиля из файла user_settings.json (с кэшированием)."""
+    return user_settings.currencies(profile)
 
 
-def load_user_stocks() -> List[str]:
-    """Загружает пользовательские акции из файла user_settings.json."""
-    with open(user_setting_path, encoding="utf-8") as file:
-        content = json.load(file)
-    return [stock for stock in content.get('user_stocks', []) if isinstance(stock, str)]
+def load_user_stocks(profile: Optional[str] = None) -> List[str]:
+    """Загружает пользовательские акции профиля из файла user_settings.json (с кэшированием)."""
+    return user_settings.stocks(profile)
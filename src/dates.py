@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
+
+from src.lazy import lazy_import
+from src.metrics import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Колонка с датой операции в выгрузке и формат даты в ней
+DATE_COLUMN = "Дата операции"
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+# Колонка с уже разобранной датой операции
+PARSED_DATE_COLUMN = "datetime"
+
+# Колонка с датой платежа и формат даты в ней
+PAYMENT_DATE_COLUMN = "Дата платежа"
+PAYMENT_DATE_FORMAT = "%d.%m.%Y"
+
+# Формат даты, которую принимает главная страница
+PARAM_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Явные форматы колонок с датами: даты всегда разбираются по формату, без угадывания
+COLUMN_FORMATS: Dict[str, str] = {
+    DATE_COLUMN: DATE_FORMAT,
+    PAYMENT_DATE_COLUMN: PAYMENT_DATE_FORMAT,
+}
+
+
+def parse_date(value: str, date_format: str = DATE_FORMAT) -> datetime:
+    """Разбирает одну дату по явному формату. Если строка не соответствует формату, поднимает ValueError."""
+    return datetime.strptime(value, date_format)
+
+
+@timed("parse_dates")
+def parse_date_column(values: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """Разбирает колонку дат по явному формату, некорректные даты становятся NaT.
+
+    Если формат не указан, он берется из COLUMN_FORMATS по имени колонки.
+    Уже разобранная колонка возвращается без изменений."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if date_format is None:
+        date_format = COLUMN_FORMATS.get(str(values.name), DATE_FORMAT)
+    logger.debug("Разбор колонки %s (%d значений) по формату %s", values.name, len(values), date_format)
+    return pd.to_datetime(values, format=date_format, errors="coerce", cache=True)
@@ -1,34 +1,225 @@
-import json
+from __future__ import annotations
+
+import atexit
+import functools
 import logging
 import os
-from typing import Any, Callable, Optional
+import tempfile
+import threading
+import time
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.config import REPORT_BACKGROUND, REPORT_FLUSH_INTERVAL, REPORT_FORMAT, REPORT_PATH
+from src.lazy import lazy_import
+from src.metrics import measure_stage
+from src.serialization import dumps, loads
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Форматы файла отчета: JSON в том виде, в каком его вернула функция, компактный JSON,
+# JSON Lines (дописывание) и Parquet
+REPORT_FORMATS = ("json", "compact", "jsonl", "parquet")
+
+# Имя файла отчета по умолчанию
+DEFAULT_REPORT_FILENAME = "spending_by_category.json"
+
+
+def _report_data(result: Any) -> Any:
+    """Возвращает данные отчета: JSON, который вернула функция (строкой или байтами), разбирается,
+    остальное - как есть."""
+    return loads(result) if isinstance(result, (str, bytes)) else result
+
+
+def encode_report(result: Any, report_format: str) -> bytes:
+    """Кодирует результат функции в содержимое файла отчета (кроме Parquet).
+
+    В формате json JSON, который вернула функция (строкой или байтами), записывается как есть,
+    без повторного кодирования, а остальные результаты кодируются с отступами. Форматы compact
+    и jsonl записываются в одну строку: готовый JSON перекодируется, только если в нем есть переводы строк."""
+    if isinstance(result, str):
+        result = result.encode("utf-8")
+    if report_format == "json":
+        return result if isinstance(result, bytes) else dumps(result, pretty=True)
+    if report_format in ("compact", "jsonl"):
+        compact = isinstance(result, bytes) and b"\n" not in result
+        line: bytes = result if compact else dumps(_report_data(result), pretty=False)
+        return line + b"\n" if report_format == "jsonl" else line
+    raise ValueError(f"Неизвестный формат отчета: {report_format}")
+
+
+def _report_frame(results: List[Any]) -> pd.DataFrame:
+    """Собирает отчеты в таблицу для Parquet: списки операций объединяются, словари категорий разворачиваются."""
+    records: List[Any] = []
+    for result in map(_report_data, results):
+        if isinstance(result, dict) and all(isinstance(items, list) for items in result.values()):
+            records.extend(chain.from_iterable(result.values()))
+        elif isinstance(result, list):
+            records.extend(result)
+        else:
+            records.append(result)
+    return pd.DataFrame.from_records(records)
+
+
+def _replace_file(path: Path, write: Callable[[Path], Any]) -> None:
+    """Записывает файл во временный файл рядом с ним и атомарно подменяет исходный."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_report(path: Union[str, Path], report_format: str, results: List[Any]) -> None:
+    """Записывает отчеты в файл. В форматах json, compact и parquet файл атомарно заменяется
+    последним отчетом, в формате jsonl все отчеты дописываются в конец файла по строке на отчет."""
+    path = Path(path)
+    with measure_stage("serialize", "write_report", rows=len(results)):
+        if report_format == "jsonl":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as file:
+                file.write(b"".join(encode_report(result, report_format) for result in results))
+        elif report_format == "parquet":
+            frame = _report_frame(results[-1:])
+            _replace_file(path, lambda tmp_path: frame.to_parquet(tmp_path, index=False))
+        else:
+            content = encode_report(results[-1], report_format)
+            _replace_file(path, lambda tmp_path: tmp_path.write_bytes(content))
+
+
+class ReportWriter:
+    """Фоновый поток записи отчетов.
+
+    Вызывающий код только ставит отчет в очередь и не ждет записи на диск. Отчеты, пришедшие
+    за flush_interval секунд, объединяются: в форматах с заменой файла записывается только последний
+    отчет по каждому пути, в формате jsonl все отчеты дописываются одной записью."""
+
+    def __init__(self, flush_interval: float = REPORT_FLUSH_INTERVAL) -> None:
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[Path, str], List[Any]] = {}
+        self._busy = False
+        self._closed = False
+        self._flush_waiters = 0
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Union[str, Path], report_format: str, result: Any) -> None:
+        """Ставит отчет в очередь на запись."""
+        key = (Path(path), report_format)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Поток записи отчетов остановлен")
+            if report_format == "jsonl":
+                self._pending.setdefault(key, []).append(result)
+            else:
+                # Более ранний, еще не записанный отчет по этому пути больше не нужен
+                self._pending[key] = [result]
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждет записи всех отчетов из очереди. Возвращает False, если не дождался за timeout секунд."""
+        with self._condition:
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Записывает оставшиеся отчеты и останавливает поток."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Даем накопиться частым записям, пока не истечет flush_interval или не попросят flush
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and not self._flush_waiters:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, {}
+                self._busy = True
+            try:
+                for (path, report_format), results in batch.items():
+                    try:
+                        write_report(path, report_format, results)
+                        logger.info("Отчет записан в %s (%s, отчетов: %d)", path, report_format, len(results))
+                    except Exception as e:
+                        logger.error("Произошла ошибка при записи отчета в %s: %s", path, e)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+_writer: Optional[ReportWriter] = None
+_lock = threading.Lock()
+
+
+def get_report_writer() -> ReportWriter:
+    """Возвращает общий для процесса поток записи отчетов, запуская его при первом обращении."""
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = ReportWriter()
+                atexit.register(_writer.close)
+    return _writer
+
 
-# Настройка логирования
-log_directory = "logs"  # Или любое другое место
-os.makedirs(log_directory, exist_ok=True)  # Создаем директорию для логов, если не существует
+def flush_reports(timeout: Optional[float] = None) -> bool:
+    """Ждет записи отчетов, поставленных в очередь фоновому потоку."""
+    return _writer.flush(timeout) if _writer is not None else True
 
-logging.basicConfig(
-    filename=os.path.join(log_directory, "spending_by_category.log"),  # Файл для логирования
-    level=logging.INFO,  # Уровень логирования
-    format="%(asctime)s - %(levelname)s - %(message)s",  # Формат сообщений
-)
 
+def decorator_spending_by_category(
+    report_filename: Optional[str] = None,
+    report_format: Optional[str] = None,
+    background: Optional[bool] = None,
+) -> Callable:
+    """Декоратор, который записывает результат функции в файл отчета (по умолчанию spending_by_category.json).
 
-def decorator_spending_by_category(report_filename: Optional[str] = None) -> Callable:
-    """Декоратор, который логирует результат функции в файл по умолчанию spending_by_category.json,
-    а также записывает сообщения в лог-файл."""
+    Формат (json, compact, jsonl, parquet) и запись в фоновом потоке по умолчанию берутся из настроек
+    REPORT_FORMAT и REPORT_BACKGROUND, а путь из REPORT_PATH, если он задан. Ошибки записи только логируются."""
 
     def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             result = func(*args, **kwargs)
-            # Определяем имя файла для записи
-            filename = report_filename if report_filename else "spending_by_category.json"
+            # Определяем файл, формат и способ записи
+            filename = REPORT_PATH or report_filename or DEFAULT_REPORT_FILENAME
+            fmt = (report_format or REPORT_FORMAT).lower()
             try:
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(result, f, ensure_ascii=False, indent=4)
-                logging.info(f"Результат функции {func.__name__} успешно записан в {filename}")
+                if fmt not in REPORT_FORMATS:
+                    raise ValueError(f"Неизвестный формат отчета: {fmt}")
+                if REPORT_BACKGROUND if background is None else background:
+                    get_report_writer().submit(filename, fmt, result)
+                else:
+                    write_report(filename, fmt, [result])
+                    logger.info("Результат функции %s успешно записан в %s", func.__name__, filename)
             except Exception as e:
-                logging.error(f"Произошла ошибка при записи в файл: {e}")
+                logger.error("Произошла ошибка при записи в файл: %s", e)
             return result
 
         return wrapper
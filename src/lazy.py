@@ -0,0 +1,55 @@
+"""Ленивый импорт тяжелых зависимостей (pandas, numpy, requests, dotenv).
+
+Модули пакета импортируют такие зависимости через lazy_import, поэтому import src.views не загружает
+pandas: настоящий модуль импортируется при первом обращении к его атрибуту внутри функции.
+Для проверки типов модули импортируются обычным образом под TYPE_CHECKING."""
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Any, Dict
+
+_proxies: Dict[str, "LazyModule"] = {}
+_lock = threading.RLock()
+
+
+class LazyModule(ModuleType):
+    """Заместитель модуля, который импортирует настоящий модуль при первом обращении к атрибуту.
+
+    Атрибуты не копируются в заместитель: каждое обращение берет атрибут из модуля в sys.modules,
+    поэтому подмены в настоящем модуле (patch("pandas.read_pickle")) видны и через заместитель.
+    Атрибуты, заданные в самом заместителе, имеют приоритет. Заместитель один на имя модуля
+    и общий для всех модулей пакета."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def _load(self) -> ModuleType:
+        """Возвращает настоящий модуль, импортируя его при первом обращении."""
+        module = sys.modules.get(self.__name__)
+        spec = getattr(module, "__spec__", None)
+        if module is None or getattr(spec, "_initializing", False):
+            # Импорт (или ожидание импорта, начатого в другом потоке) под блокировками importlib
+            module = importlib.import_module(self.__name__)
+        return module
+
+    def __repr__(self) -> str:
+        state = "загружен" if is_loaded(self.__name__) else "не загружен"
+        return f"<ленивый модуль {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Возвращает модуль name: уже импортированный модуль как есть, иначе его ленивый заместитель."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        if name not in _proxies:
+            _proxies[name] = LazyModule(name)
+        return _proxies[name]
+
+
+def is_loaded(name: str) -> bool:
+    """Проверяет, импортирован ли модуль name на самом деле."""
+    return name in sys.modules
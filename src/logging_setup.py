@@ -0,0 +1,60 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional, Union
+
+from src.config import LOGGING_CONFIG
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_lock = threading.Lock()
+
+
+def setup_logging(
+    level: Union[str, int, None] = None, filename: Union[str, Path, None] = None
+) -> QueueListener:
+    """Настраивает логирование приложения один раз на процесс.
+
+    Модули только создают логгеры через logging.getLogger(__name__) и не настраивают обработчики сами.
+    Записи попадают в очередь через QueueHandler, а в файл их пишет отдельный поток QueueListener,
+    поэтому запись логов не задерживает обработку запроса. Уровень и файл по умолчанию берутся
+    из LOGGING_CONFIG (переменные окружения LOG_LEVEL и LOG_FILE). Повторный вызов ничего не меняет."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        path = Path(filename or LOGGING_CONFIG["filename"])
+        os.makedirs(path.parent, exist_ok=True)
+        file_handler = logging.FileHandler(path, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_handler = QueueHandler(log_queue)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(level or LOGGING_CONFIG["level"])
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся в очереди записи, останавливает поток записи и закрывает файл."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        if _queue_handler is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar, Union
+
+from src.config import QUOTE_CACHE_FILE, QUOTE_CACHE_SIZE, QUOTE_TTL
+from src.lazy import lazy_import
+from src.metrics import timed
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = lazy_import("requests")
+
+logger = logging.getLogger(__name__)
+
+# Таймаут одного запроса к API котировок: (подключение, чтение) в секундах
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Сколько запросов к API котировок выполняется одновременно
+MAX_WORKERS = 8
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Возвращает общую для процесса HTTP-сессию с пулом соединений."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Возвращает общий пул потоков для запросов котировок."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="market-data")
+    return _executor
+
+
+@timed("fetch")
+def http_get(url: str) -> requests.Response:
+    """Выполняет GET-запрос через общую сессию с таймаутом."""
+    return get_session().get(url, timeout=REQUEST_TIMEOUT)
+
+
+def fetch_concurrently(func: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """Вызывает func для каждого элемента параллельно и возвращает результаты в исходном порядке."""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(get_executor().map(func, items))
+
+
+class QuoteCache:
+    """Кэш котировок с временем жизни по источникам и вытеснением давно не запрошенных символов.
+
+    Если котировка устарела, возвращается старое значение, а обновление запускается в фоне.
+    Кэш может сохраняться в JSON-файл, чтобы переживать перезапуск процесса."""
+
+    def __init__(
+        self,
+        ttl: Dict[str, float],
+        max_entries: int = QUOTE_CACHE_SIZE,
+        persist_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.ttl = dict(ttl)
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, source: str, symbol: str, fetch: Callable[[], Any]) -> Any:
+        """Возвращает котировку из кэша или запрашивает ее через fetch.
+
+        fetch возвращает None, если котировку получить не удалось: такой результат не кэшируется."""
+        key = (source, symbol)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                value, fetched_at = entry
+                if time.time() - fetched_at < self.ttl.get(source, 0):
+                    return value
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    get_executor().submit(self._refresh, key, fetch)
+                logger.info("Котировка %s:%s устарела, обновляется в фоне", source, symbol)
+                return value
+
+        value = fetch()
+        if value is not None:
+            self.put(source, symbol, value)
+        return value
+
+    def put(self, source: str, symbol: str, value: Any, fetched_at: Optional[float] = None) -> None:
+        """Сохраняет котировку в кэш."""
+        with self._lock:
+            self._entries[(source, symbol)] = (value, time.time() if fetched_at is None else fetched_at)
+            self._entries.move_to_end((source, symbol))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._save()
+
+    def clear(self) -> None:
+        """Очищает кэш в памяти."""
+        with self._lock:
+            self._entries.clear()
+
+    def _refresh(self, key: Tuple[str, str], fetch: Callable[[], Any]) -> None:
+        """Обновляет устаревшую котировку (выполняется в фоновом потоке)."""
+        try:
+            value = fetch()
+            if value is not None:
+                self.put(*key, value)
+        except Exception as e:
+            logger.error("Не удалось обновить котировку %s:%s: %s", key[0], key[1], e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _load(self) -> None:
+        """Загружает сохраненные котировки из файла, если он задан и существует."""
+        if self.persist_path is None or not self.persist_path.is_file():
+            return
+        try:
+            with open(self.persist_path, encoding="utf-8") as file:
+                saved = json.load(file)
+            for item in saved:
+                self._entries[(item["source"], item["symbol"])] = (item["value"], float(item["fetched_at"]))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Не удалось прочитать кэш котировок %s: %s", self.persist_path, e)
+
+    def _save(self) -> None:
+        """Сохраняет котировки в файл, если он задан."""
+        if self.persist_path is None:
+            return
+        with self._lock:
+            saved = [
+                {"source": source, "symbol": symbol, "value": value, "fetched_at": fetched_at}
+                for (source, symbol), (value, fetched_at) in self._entries.items()
+            ]
+        tmp_path = self.persist_path.with_name(f"{self.persist_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.makedirs(self.persist_path.parent, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(saved, file, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.warning("Не удалось сохранить кэш котировок %s: %s", self.persist_path, e)
+
+
+# Общий для процесса кэш котировок
+quote_cache = QuoteCache(QUOTE_TTL, persist_path=QUOTE_CACHE_FILE)
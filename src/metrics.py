@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+
+from src.config import PROFILE_DIR, PROFILE_MODE
+from src.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+    import numpy as np
+    import pandas as pd
+else:
+    # Профилировщики нужны только при включенном PROFILE_MODE
+    cProfile = lazy_import("cProfile")
+    pstats = lazy_import("pstats")
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Стадии обработки, по которым собираются метрики
+STAGES = ("load", "parse_dates", "index", "filter", "aggregate", "fetch", "serialize")
+
+# Режимы профилирования, которые можно включить через PROFILE_MODE
+PROFILE_MODES = {"cprofile", "tracemalloc"}
+
+
+def parse_profile_mode(value: str) -> Set[str]:
+    """Разбирает значение PROFILE_MODE («cprofile,tracemalloc», «all» или пустая строка)."""
+    modes = {mode.strip().lower() for mode in value.split(",") if mode.strip()}
+    if "all" in modes:
+        return set(PROFILE_MODES)
+    unknown = modes - PROFILE_MODES
+    if unknown:
+        logger.warning("Неизвестные режимы профилирования: %s", sorted(unknown))
+    return modes & PROFILE_MODES
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """Возвращает число строк для датафрейма, серии, массива или списка, иначе None.
+
+    Типы pandas и numpy проверяются, только если модуль уже загружен: значение этого типа
+    без загруженного модуля не существует, а проверка не должна импортировать модуль ради
+    функций, которые с ним не работают (например, http_get)."""
+    if isinstance(value, list):
+        return len(value)
+    if "pandas" in sys.modules and isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if "numpy" in sys.modules and isinstance(value, np.ndarray):
+        return len(value)
+    return None
+
+
+class StageMeasurement:
+    """Замер одного выполнения стадии. Внутри measure_stage можно указать число строк."""
+
+    __slots__ = ("stage", "operation", "rows", "seconds", "alloc_bytes")
+
+    def __init__(self, stage: str, operation: str, rows: Optional[int] = None) -> None:
+        self.stage = stage
+        self.operation = operation
+        self.rows = rows
+        self.seconds = 0.0
+        self.alloc_bytes: Optional[int] = None
+
+
+class MetricsRegistry:
+    """Реестр метрик стадий обработки, общий для процесса.
+
+    По каждой паре (стадия, операция) накапливаются число вызовов, суммарное и максимальное время,
+    число обработанных строк и прирост выделенной памяти (если включен tracemalloc).
+    Реестр выгружается в JSON или в текстовый формат Prometheus."""
+
+    def __init__(self, profile_mode: str = PROFILE_MODE, profile_dir: Union[str, Path] = PROFILE_DIR) -> None:
+        self.profile_dir = Path(profile_dir)
+        self._stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._profiles: Dict[Tuple[str, str], pstats.Stats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.profile_modes: Set[str] = set()
+        self._dump_registered = False
+        self._started_tracemalloc = False
+        self.configure_profiling(profile_mode)
+
+    def configure_profiling(self, modes: Union[str, Iterable[str]]) -> None:
+        """Включает режимы профилирования (cprofile, tracemalloc) или выключает их пустым значением."""
+        self.profile_modes = parse_profile_mode(modes if isinstance(modes, str) else ",".join(modes))
+        if "tracemalloc" in self.profile_modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif "tracemalloc" not in self.profile_modes and self._started_tracemalloc:
+            # Останавливается только трассировка, запущенная самим реестром
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if "cprofile" in self.profile_modes and not self._dump_registered:
+            # Профили сохраняются в profile_dir при завершении процесса
+            atexit.register(self.dump_profiles)
+            self._dump_registered = True
+        elif "cprofile" not in self.profile_modes and self._dump_registered:
+            atexit.unregister(self.dump_profiles)
+            self._dump_registered = False
+
+    def record(self, measurement: StageMeasurement) -> None:
+        """Добавляет замер в реестр."""
+        key = (measurement.stage, measurement.operation)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0}
+            stats["calls"] += 1
+            stats["seconds"] += measurement.seconds
+            stats["max_seconds"] = max(stats["max_seconds"], measurement.seconds)
+            if measurement.rows is not None:
+                stats["rows"] += measurement.rows
+            if measurement.alloc_bytes is not None:
+                stats["alloc_bytes"] = stats.get("alloc_bytes", 0) + measurement.alloc_bytes
+
+    def _add_profile(self, key: Tuple[str, str], profiler: cProfile.Profile) -> None:
+        """Накапливает статистику cProfile по операции."""
+        profiler.create_stats()
+        with self._lock:
+            if key in self._profiles:
+                self._profiles[key].add(profiler)
+            else:
+                self._profiles[key] = pstats.Stats(profiler)
+
+    @contextmanager
+    def measure(self, stage: str, operation: str, rows: Optional[int] = None) -> Iterator[StageMeasurement]:
+        """Контекстный менеджер, который замеряет выполнение блока как стадию stage операции operation."""
+        measurement = StageMeasurement(stage, operation, rows)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+
+        # cProfile не допускает вложенных профилировщиков: профилируется только внешняя стадия потока
+        profiler = cProfile.Profile() if "cprofile" in self.profile_modes and depth == 0 else None
+        tracing = tracemalloc.is_tracing()
+        allocated_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        started = time.perf_counter()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None  # В потоке уже работает другой профилировщик
+        try:
+            yield measurement
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            measurement.seconds = time.perf_counter() - started
+            if tracing and tracemalloc.is_tracing():
+                measurement.alloc_bytes = tracemalloc.get_traced_memory()[0] - allocated_before
+            self._local.depth = depth
+            self.record(measurement)
+            if profiler is not None:
+                self._add_profile((stage, operation), profiler)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Возвращает копию накопленных метрик: {стадия: {операция: метрики}}."""
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        with self._lock:
+            for (stage, operation), stats in sorted(self._stats.items()):
+                result.setdefault(stage, {})[operation] = dict(stats)
+        return result
+
+    def reset(self) -> None:
+        """Очищает накопленные метрики и профили."""
+        with self._lock:
+            self._stats.clear()
+            self._profiles.clear()
+
+    def to_json(self) -> str:
+        """Выгружает метрики в JSON."""
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix: str = "bank") -> str:
+        """Выгружает метрики в текстовом формате Prometheus."""
+        metrics = [
+            ("calls", "counter", "Число выполнений стадии", f"{prefix}_stage_calls_total"),
+            ("seconds", "counter", "Суммарное время стадии в секундах", f"{prefix}_stage_seconds_total"),
+            ("max_seconds", "gauge", "Максимальное время одного выполнения стадии", f"{prefix}_stage_max_seconds"),
+            ("rows", "counter", "Число обработанных строк", f"{prefix}_stage_rows_total"),
+            ("alloc_bytes", "gauge", "Суммарный прирост выделенной памяти в байтах", f"{prefix}_stage_alloc_bytes"),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for field, kind, description, name in metrics:
+            samples = [
+                (stage, operation, stats[field])
+                for stage, operations in snapshot.items()
+                for operation, stats in operations.items()
+                if field in stats
+            ]
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, operation, value in samples:
+                labels = f'stage="{_escape_label(stage)}",operation="{_escape_label(operation)}"'
+                lines.append(f"{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def dump_profiles(self, directory: Optional[Union[str, Path]] = None) -> None:
+        """Сохраняет накопленную статистику cProfile в файлы <стадия>.<операция>.prof
+        в директории directory (по умолчанию profile_dir)."""
+        with self._lock:
+            profiles = dict(self._profiles)
+        if not profiles:
+            return
+        target = Path(directory) if directory is not None else self.profile_dir
+        os.makedirs(target, exist_ok=True)
+        for (stage, operation), stats in profiles.items():
+            path = target / f"{stage}.{operation}.prof"
+            stats.dump_stats(path)
+            logger.info("Профиль стадии %s (%s) сохранен в %s", stage, operation, path)
+
+
+def _escape_label(value: str) -> str:
+    """Экранирует значение метки Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Общий для процесса реестр метрик
+registry = MetricsRegistry()
+
+
+def measure_stage(stage: str, operation: str, rows: Optional[int] = None) -> Any:
+    """Замеряет блок кода как стадию обработки в общем реестре:
+
+    with measure_stage("serialize", "form_main_page_info") as measurement:
+        ...
+        measurement.rows = len(items)"""
+    return registry.measure(stage, operation, rows)
+
+
+def timed(stage: str, rows: Optional[Callable[[Any], Optional[int]]] = None) -> Callable:
+    """Декоратор, который записывает время выполнения функции, число строк и прирост памяти
+    в общий реестр метрик под стадией stage.
+
+    Число строк по умолчанию берется из первого позиционного аргумента-датафрейма (или серии, списка),
+    а если такого нет - из результата. Можно передать свою функцию rows(result)."""
+
+    def decorator(func: Callable) -> Callable:
+        operation = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with registry.measure(stage, operation) as measurement:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    measurement.rows = rows(result)
+                else:
+                    counts = (count_rows(arg) for arg in (*args, result))
+                    measurement.rows = next((count for count in counts if count is not None), None)
+            return result
+
+        return wrapper
+
+    return decorator
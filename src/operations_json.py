@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from itertools import islice
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.dates import DATE_COLUMN, DATE_FORMAT, PARSED_DATE_COLUMN, PAYMENT_DATE_FORMAT, parse_date_column
+from src.lazy import lazy_import
+from src.metrics import timed
+from src.serialization import loads
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Расширения файлов с операциями в JSON: массив (как data/operations.json) или JSON Lines
+JSON_SUFFIXES = {".json", ".jsonl"}
+
+# Колонки выгрузки операций в порядке Excel-выгрузки
+OPERATION_COLUMNS = [
+    DATE_COLUMN,
+    "Дата платежа",
+    "Номер карты",
+    "Статус",
+    "Сумма операции",
+    "Валюта операции",
+    "Сумма платежа",
+    "Валюта платежа",
+    "Кэшбэк",
+    "Категория",
+    "MCC",
+    "Описание",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+
+# Статусы операций operations.json и соответствующие им статусы Excel-выгрузки
+STATE_STATUSES = {"EXECUTED": "OK", "CANCELED": "FAILED"}
+
+# Описания переводов начинаются с этого слова, они попадают в категорию «Переводы»
+TRANSFER_PREFIX = "Перевод"
+
+# Валюта платежа Excel-выгрузки: суммы платежа всегда в рублях
+PAYMENT_CURRENCY = "RUB"
+
+# Реквизиты счета (в отличие от карты) начинаются с этого слова
+ACCOUNT_PREFIX = "Счет"
+
+# Размер порции записей и размер блока чтения файла
+CHUNK_SIZE = 10_000
+READ_SIZE = 1 << 16
+
+# Файлы JSON-массивов меньше этого размера разбираются целиком, большие - потоково
+STREAM_THRESHOLD = 32 * 2**20
+
+_SEPARATORS = re.compile(r"[\s,]*")
+_AMOUNT = re.compile(r"\s*(-?)(\d+)(?:\.(\d{0,2}))?\s*")
+_ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}:\d{2}:\d{2})")
+
+
+def is_nested_operation(record: Dict[str, Any]) -> bool:
+    """Проверяет, что запись в формате operations.json (сумма во вложенном operationAmount)."""
+    return "operationAmount" in record
+
+
+def _iter_json_array(file: IO[str], read_size: int = READ_SIZE) -> Iterator[Any]:
+    """Потоково разбирает JSON-массив по одному элементу, держа в памяти только текущий блок файла."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer and (chunk := file.read(read_size)):
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Ожидается JSON-массив операций")
+    position = 1
+    eof = False
+    while True:
+        separators = _SEPARATORS.match(buffer, position)
+        if separators is not None:
+            position = separators.end()
+        if position < len(buffer):
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                pass  # Элемент целиком не поместился в прочитанный блок
+            else:
+                position = end
+                yield value
+                continue
+        if eof:
+            raise ValueError("Некорректный JSON-массив операций")
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def iter_json_records(file_path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Читает записи из JSON-массива или JSON Lines, пропуская пустые объекты.
+
+    Небольшие файлы разбираются целиком (через orjson, если он установлен), большие JSON-массивы -
+    потоково, JSON Lines всегда читаются построчно."""
+    path = Path(file_path)
+    if path.suffix.lower() == ".jsonl":
+        with open(path, encoding="utf-8") as file:
+            records: Iterator[Any] = (loads(line) for line in file if line.strip())
+            yield from (record for record in records if record)
+        return
+    if path.stat().st_size < STREAM_THRESHOLD:
+        records = iter(loads(path.read_bytes()))
+        yield from (record for record in records if record)
+        return
+    with open(path, encoding="utf-8") as file:
+        yield from (record for record in _iter_json_array(file) if record)
+
+
+def _parse_minor(value: Any) -> Optional[int]:
+    """Разбирает одну сумму-строку в копейки, для некорректной суммы возвращает None."""
+    match = _AMOUNT.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        return None
+    sign, units, cents = match.groups()
+    minor = int(units) * 100 + int(cents.ljust(2, "0") if cents else 0)
+    return -minor if sign else minor
+
+
+def parse_amount_minor(values: Iterable[Any]) -> pd.Series:
+    """Разбирает суммы-строки («31957.58») в целое число копеек без промежуточного float.
+    Некорректные суммы становятся пропусками (<NA>)."""
+    return pd.Series([_parse_minor(value) for value in values], dtype="Int64")
+
+
+def _mask_card(value: Any) -> Any:
+    """Превращает реквизиты карты («Visa Classic 6831982476737658») в номер вида «*7658», как в Excel-выгрузке.
+    Для счетов и пустых реквизитов номер карты не указывается."""
+    if not isinstance(value, str) or value.startswith(ACCOUNT_PREFIX) or not value[-4:].isdigit():
+        return np.nan
+    return "*" + value[-4:]
+
+
+def _format_dates(values: List[Any], dates: pd.Series) -> Tuple[List[Any], List[Any]]:
+    """Возвращает дату операции и дату платежа строками в форматах Excel-выгрузки.
+
+    Строки ISO переставляются по частям без форматирования datetime, остальные разобранные даты
+    форматируются через strftime, неразобранные даты становятся пропусками."""
+    operation_dates: List[Any] = []
+    payment_dates: List[Any] = []
+    for position, (value, missing) in enumerate(zip(values, dates.isna().to_numpy())):
+        if missing:
+            operation_dates.append(np.nan)
+            payment_dates.append(np.nan)
+            continue
+        match = _ISO_DATE.match(value) if isinstance(value, str) else None
+        if match is None:
+            operation_dates.append(dates.iloc[position].strftime(DATE_FORMAT))
+            payment_dates.append(dates.iloc[position].strftime(PAYMENT_DATE_FORMAT))
+        else:
+            year, month, day, time_of_day = match.groups()
+            operation_dates.append(f"{day}.{month}.{year} {time_of_day}")
+            payment_dates.append(f"{day}.{month}.{year}")
+    return operation_dates, payment_dates
+
+
+def operations_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Приводит записи формата operations.json к колонкам Excel-выгрузки с разобранной датой операции.
+
+    Суммы разбираются как фиксированная точка (копейки) и переводятся в единицы валюты делением на 100,
+    операции со счетом или картой списания (поле from) считаются расходами и получают знак минус.
+    В operations.json нет суммы списания в рублях, поэтому сумма и валюта платежа (и сумма с округлением)
+    заполняются только для рублевых операций, у операций в другой валюте они остаются пропусками."""
+    amounts = [record.get("operationAmount") or {} for record in records]
+    raw_dates = [record.get("date") for record in records]
+    states = [record.get("state") for record in records]
+    descriptions = [record.get("description") for record in records]
+    sources = [record.get("from") for record in records]
+    currencies = [(amount.get("currency") or {}).get("code") for amount in amounts]
+
+    dates = pd.to_datetime(pd.Series(raw_dates, dtype=object), format="ISO8601", errors="coerce")
+    operation_dates, payment_dates = _format_dates(raw_dates, dates)
+    values = parse_amount_minor(amount.get("amount") for amount in amounts).to_numpy(np.float64, na_value=np.nan) / 100
+    debit = np.array([source is not None for source in sources], dtype=bool)
+    signed = np.where(debit, -values, values)
+    in_rubles = np.array([code == PAYMENT_CURRENCY for code in currencies], dtype=bool)
+    missing = np.full(len(records), np.nan)
+
+    df = pd.DataFrame(
+        {
+            DATE_COLUMN: operation_dates,
+            "Дата платежа": payment_dates,
+            "Номер карты": [_mask_card(source) for source in sources],
+            "Статус": [STATE_STATUSES.get(state, state) if isinstance(state, str) else state for state in states],
+            "Сумма операции": signed,
+            "Валюта операции": currencies,
+            "Сумма платежа": np.where(in_rubles, signed, np.nan),
+            "Валюта платежа": [PAYMENT_CURRENCY if flag else np.nan for flag in in_rubles],
+            "Кэшбэк": missing,
+            "Категория": [
+                "Переводы" if isinstance(text, str) and text.startswith(TRANSFER_PREFIX) else text
+                for text in descriptions
+            ],
+            "MCC": missing,
+            "Описание": descriptions,
+            "Бонусы (включая кэшбэк)": np.zeros(len(records), dtype=np.int64),
+            "Округление на инвесткопилку": np.zeros(len(records), dtype=np.int64),
+            "Сумма операции с округлением": np.where(in_rubles, np.abs(values), np.nan),
+        },
+        columns=OPERATION_COLUMNS,
+    )
+    df[PARSED_DATE_COLUMN] = dates.to_numpy()
+    return df
+
+
+def _flat_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Собирает датафрейм из записей, уже записанных в колонках Excel-выгрузки."""
+    df = pd.DataFrame.from_records(records)
+    df[PARSED_DATE_COLUMN] = parse_date_column(df[DATE_COLUMN], DATE_FORMAT)
+    return df
+
+
+def iter_operations_json(file_path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Потоково читает операции из JSON/JSONL порциями-датафреймами в колонках Excel-выгрузки.
+
+    Формат записей (operations.json или колонки Excel-выгрузки) определяется по первой записи файла."""
+    records = iter_json_records(file_path)
+    nested = None
+    while chunk := list(islice(records, chunk_size)):
+        if nested is None:
+            nested = is_nested_operation(chunk[0])
+        yield operations_frame(chunk) if nested else _flat_frame(chunk)
+
+
+@timed("load")
+def read_operations_json(file_path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """Загружает операции из JSON/JSONL в один датафрейм с колонками Excel-выгрузки и разобранной датой.
+    Файл читается порциями, поэтому в памяти не держатся все исходные записи сразу."""
+    logger.info("Чтение операций из %s", file_path)
+    frames = list(iter_operations_json(file_path, chunk_size))
+    if not frames:
+        return operations_frame([])
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
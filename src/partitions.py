@@ -0,0 +1,206 @@
+"""Хранилище операций, разделенное по пользователям или счетам.
+
+Каждый раздел - отдельный TransactionStore со своим индексом дат и посуточными сводами, поэтому запрос
+одного пользователя затрагивает только его операции. Разделы загружаются при первом обращении,
+а при превышении бюджета памяти давно не использованные разделы выгружаются (LRU)."""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import hashlib
+import logging
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
+
+from src.config import PARTITION_MEMORY_BUDGET, PARTITIONS_DIR
+from src.lazy import lazy_import
+from src.store import OPERATION_SUFFIXES, PARSED_DATE_COLUMN, TransactionStore, get_operation_dates
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Колонка выгрузки, по которой операции делятся на счета
+ACCOUNT_COLUMN = "Номер карты"
+
+
+class PartitionedStore:
+    """Набор разделов хранилища операций с ленивой загрузкой и вытеснением по бюджету памяти.
+
+    Раздел описывается функцией загрузки, которая возвращает готовый TransactionStore.
+    Загруженные разделы хранятся в порядке последнего обращения; после загрузки нового раздела
+    самые старые выгружаются, пока суммарная память больше memory_budget (последний раздел остается
+    всегда). Выгруженный раздел при следующем обращении загружается заново."""
+
+    def __init__(
+        self, loaders: Dict[str, Callable[[], TransactionStore]], memory_budget: int = PARTITION_MEMORY_BUDGET
+    ) -> None:
+        self.memory_budget = memory_budget
+        self._loaders = dict(loaders)
+        self._loaded: "OrderedDict[str, Tuple[TransactionStore, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    @classmethod
+    def from_directory(
+        cls,
+        root: Union[str, Path] = PARTITIONS_DIR,
+        memory_budget: int = PARTITION_MEMORY_BUDGET,
+        cache_dir: Optional[Union[str, Path]] = None,
+    ) -> "PartitionedStore":
+        """Создает разделы по директории: выгрузка <ключ>.xlsx|json|jsonl или поддиректория <ключ>/
+        с несколькими выгрузками. Файлы не читаются до первого обращения к разделу.
+        Разобранные выгрузки кэшируются в cache_dir (по умолчанию CACHE_DIR)."""
+        loaders: Dict[str, Callable[[], TransactionStore]] = {}
+        root = Path(root)
+        for path in sorted(root.iterdir()) if root.is_dir() else []:
+            if path.is_dir():
+                loaders[path.name] = functools.partial(TransactionStore.from_files, path, cache_dir=cache_dir)
+            elif path.suffix.lower() in OPERATION_SUFFIXES and not path.name.startswith("~$"):
+                if path.stem in loaders:
+                    logger.warning("Раздел %s задан несколькими выгрузками, используется %s", path.stem, path)
+                loaders[path.stem] = functools.partial(_file_store, path, cache_dir)
+        logger.info("Найдено разделов в %s: %d", root, len(loaders))
+        return cls(loaders, memory_budget)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        column: str = ACCOUNT_COLUMN,
+        spill_dir: Optional[Union[str, Path]] = None,
+        memory_budget: int = PARTITION_MEMORY_BUDGET,
+    ) -> "PartitionedStore":
+        """Делит выгрузку на разделы по значению колонки column (по умолчанию - по счетам-картам).
+
+        Каждый раздел записывается на диск (pickle в spill_dir или во временную директорию),
+        и в памяти остаются только загруженные разделы. Операции без значения column пропускаются."""
+        if PARSED_DATE_COLUMN not in df.columns:
+            df = df.assign(**{PARSED_DATE_COLUMN: get_operation_dates(df).to_numpy()})
+        if spill_dir is None:
+            # Временная директория удаляется при завершении процесса
+            spill_dir = tempfile.mkdtemp(prefix="partitions-")
+            atexit.register(shutil.rmtree, spill_dir, True)
+        spill_root = Path(spill_dir)
+        spill_root.mkdir(parents=True, exist_ok=True)
+
+        keys = df[column]
+        missing = int(keys.isna().sum())
+        if missing:
+            logger.warning("Операций без значения %s (не попадут в разделы): %d", column, missing)
+        loaders: Dict[str, Callable[[], TransactionStore]] = {}
+        for key, part in df[keys.notna()].groupby(keys[keys.notna()].astype(str), sort=True):
+            digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+            path = spill_root / f"{digest}.pkl"
+            part.reset_index(drop=True).to_pickle(path)
+            loaders[key] = functools.partial(_pickle_store, path)
+        logger.info("Выгрузка разделена по %s на %d разделов в %s", column, len(loaders), spill_root)
+        return cls(loaders, memory_budget)
+
+    def keys(self) -> List[str]:
+        """Возвращает ключи всех разделов (загруженных и нет)."""
+        return list(self._loaders)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._loaders
+
+    def __len__(self) -> int:
+        return len(self._loaders)
+
+    def loaded(self) -> List[str]:
+        """Возвращает ключи загруженных разделов, от давно использованных к недавним."""
+        with self._lock:
+            return list(self._loaded)
+
+    def memory_usage(self) -> int:
+        """Возвращает оценку памяти загруженных разделов в байтах."""
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._loaded.values())
+
+    def get(self, key: str) -> TransactionStore:
+        """Возвращает раздел key, загружая его при первом обращении. Неизвестный раздел - KeyError."""
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._loaded[key][0]
+            if key not in self._loaders:
+                raise KeyError(f"Раздел {key} не найден")
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Раздел загружается вне общей блокировки: запросы к другим разделам не ждут загрузки
+        with key_lock:
+            with self._lock:
+                if key in self._loaded:
+                    self._loaded.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return self._loaded[key][0]
+            store = self._loaders[key]()
+            nbytes = store.memory_usage()
+            with self._lock:
+                self._loaded[key] = (store, nbytes)
+                self.stats["loads"] += 1
+                self._evict()
+        logger.info("Раздел %s загружен: %d байт", key, nbytes)
+        return store
+
+    def evict(self, key: str) -> bool:
+        """Выгружает раздел key из памяти. Возвращает False, если он не был загружен."""
+        with self._lock:
+            return self._loaded.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Выгружает все разделы."""
+        with self._lock:
+            self._loaded.clear()
+
+    def _evict(self) -> None:
+        """Выгружает давно не использованные разделы, пока память больше бюджета (вызывается под блокировкой)."""
+        total = sum(nbytes for _, nbytes in self._loaded.values())
+        while total > self.memory_budget and len(self._loaded) > 1:
+            key, (_, nbytes) = self._loaded.popitem(last=False)
+            total -= nbytes
+            self.stats["evictions"] += 1
+            logger.info("Раздел %s выгружен из памяти (%d байт), осталось: %d", key, nbytes, len(self._loaded))
+
+
+def _file_store(path: Path, cache_dir: Optional[Union[str, Path]] = None) -> TransactionStore:
+    """Загружает раздел из одной выгрузки; раздел перечитывается при изменении файла (refresh)."""
+    store = TransactionStore(path, cache_dir)
+    store.refresh()
+    return store
+
+
+def _pickle_store(path: Path) -> TransactionStore:
+    """Загружает раздел, записанный PartitionedStore.from_frame."""
+    return TransactionStore.from_frame(pd.read_pickle(path))
+
+
+_partitions: Optional[PartitionedStore] = None
+_partitions_lock = threading.Lock()
+
+
+def get_partitions() -> PartitionedStore:
+    """Возвращает общие для процесса разделы хранилища по пользователям из PARTITIONS_DIR."""
+    global _partitions
+    if _partitions is None:
+        with _partitions_lock:
+            if _partitions is None:
+                _partitions = PartitionedStore.from_directory()
+    return _partitions
+
+
+def reset_partitions() -> None:
+    """Сбрасывает общие разделы, следующий вызов get_partitions() заново просмотрит PARTITIONS_DIR."""
+    global _partitions
+    with _partitions_lock:
+        _partitions = None
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import csv
+import logging
+import math
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from src.lazy import lazy_import
+from src.operations_json import JSON_SUFFIXES, iter_operations_json
+from src.store import PARSED_DATE_COLUMN, parse_operations
+
+if TYPE_CHECKING:
+    import openpyxl
+    import pandas as pd
+else:
+    openpyxl = lazy_import("openpyxl")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Числовые колонки выгрузки операций
+NUMERIC_COLUMNS = {
+    "Сумма операции",
+    "Сумма платежа",
+    "Кэшбэк",
+    "MCC",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+}
+
+# Размер порции строк по умолчанию
+CHUNK_SIZE = 10_000
+
+
+def _to_number(value: str) -> Union[int, float]:
+    """Преобразует строку из CSV в int или float."""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value.replace(",", "."))
+
+
+def _typed_record(header: List[str], values: Iterable[Any]) -> Dict[str, Any]:
+    """Собирает запись операции; пустые ячейки становятся NaN, как при чтении через pandas."""
+    record = {}
+    for column, value in zip(header, values):
+        if value is None or value == "":
+            value = math.nan
+        elif column in NUMERIC_COLUMNS and isinstance(value, str):
+            value = _to_number(value)
+        record[column] = value
+    return record
+
+
+def _iter_excel(file_path: Path) -> Iterator[Dict[str, Any]]:
+    """Построчно читает Excel-выгрузку в режиме только для чтения."""
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(column) for column in next(rows, ())]
+        for row in rows:
+            if any(value is not None for value in row):
+                yield _typed_record(header, row)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(file_path: Path) -> Iterator[Dict[str, Any]]:
+    """Построчно читает CSV-выгрузку (разделитель определяется автоматически)."""
+    with open(file_path, encoding="utf-8-sig", newline="") as file:
+        dialect = csv.Sniffer().sniff(file.read(4096), delimiters=",;\t")
+        file.seek(0)
+        reader = csv.reader(file, dialect)
+        header = next(reader, [])
+        for row in reader:
+            yield _typed_record(header, row)
+
+
+def _iter_json(file_path: Path) -> Iterator[Dict[str, Any]]:
+    """Потоково читает выгрузку JSON или JSON Lines (в том числе в формате data/operations.json)
+    в колонках Excel-выгрузки."""
+    for frame in iter_operations_json(file_path):
+        for record in frame.drop(columns=PARSED_DATE_COLUMN).to_dict(orient="records"):
+            yield _typed_record(list(record), record.values())
+
+
+def iter_operations(file_path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Потоково читает выгрузку операций (xlsx, csv, json или jsonl) по одной записи.
+
+    В памяти одновременно находится только текущая строка, поэтому можно обрабатывать
+    выгрузки, которые не помещаются в память целиком."""
+    path = Path(file_path)
+    if not path.is_file():
+        logger.error("Файл не найден: %s", path)
+        raise FileNotFoundError(f"Файл не найден: {path}")
+
+    readers = {".xlsx": _iter_excel, ".csv": _iter_csv, ".json": _iter_json, ".jsonl": _iter_json}
+    reader = readers.get(path.suffix.lower())
+    if reader is None:
+        raise ValueError(f"Неподдерживаемый формат выгрузки: {path.suffix}")
+    logger.info("Потоковое чтение выгрузки %s", path)
+    return reader(path)
+
+
+def iter_operation_chunks(
+    file_path: Union[str, Path], chunk_size: int = CHUNK_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """Потоково читает выгрузку порциями по chunk_size записей."""
+    records = iter_operations(file_path)
+    while chunk := list(islice(records, chunk_size)):
+        yield chunk
+
+
+def iter_operation_frames(
+    file_path: Union[str, Path], chunk_size: int = CHUNK_SIZE, columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Потоково читает выгрузку порциями-датафреймами с разобранной датой операции.
+    Порции можно передавать, например, в spending_by_category."""
+    if Path(file_path).suffix.lower() in JSON_SUFFIXES and columns is None:
+        # Порции JSON сразу собираются в колонки выгрузки, без промежуточных словарей
+        yield from iter_operations_json(file_path, chunk_size)
+        return
+    for chunk in iter_operation_chunks(file_path, chunk_size):
+        df = pd.DataFrame.from_records(chunk, columns=columns)
+        yield parse_operations(df)
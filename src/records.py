@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import math
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.dates import DATE_COLUMN, DATE_FORMAT, parse_date
+from src.lazy import lazy_import
+from src.store import get_operation_dates
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+# Поля записи операции: атрибут, колонка выгрузки и способ хранения в TransactionBatch
+# date - дата (datetime64), code - код в словаре строк, text - строка, float и int - числа
+FIELDS: List[Tuple[str, str, str]] = [
+    ("date", DATE_COLUMN, "date"),
+    ("payment_date", "Дата платежа", "code"),
+    ("card", "Номер карты", "code"),
+    ("status", "Статус", "code"),
+    ("amount", "Сумма операции", "float"),
+    ("currency", "Валюта операции", "code"),
+    ("payment_amount", "Сумма платежа", "float"),
+    ("payment_currency", "Валюта платежа", "code"),
+    ("cashback", "Кэшбэк", "float"),
+    ("category", "Категория", "code"),
+    ("mcc", "MCC", "float"),
+    ("description", "Описание", "text"),
+    ("bonuses", "Бонусы (включая кэшбэк)", "int"),
+    ("invest_rounding", "Округление на инвесткопилку", "int"),
+    ("rounded_amount", "Сумма операции с округлением", "float"),
+]
+
+
+def intern_value(value: Any) -> Any:
+    """Интернирует строку, чтобы одинаковые значения занимали память один раз."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Transaction:
+    """Компактная запись одной операции.
+
+    Вместо словаря с длинными ключами на кириллице хранит значения в слотах,
+    строки интернированы, дата операции разобрана."""
+
+    __slots__ = tuple(attr for attr, _, _ in FIELDS)
+
+    # Типы слотов из FIELDS: текстовые поля и дата при пропуске в выгрузке равны NaN
+    date: Any
+    payment_date: Any
+    card: Any
+    status: Any
+    amount: float
+    currency: Any
+    payment_amount: float
+    payment_currency: Any
+    cashback: float
+    category: Any
+    mcc: float
+    description: Any
+    bonuses: Any
+    invest_rounding: Any
+    rounded_amount: float
+
+    def __init__(self, **values: Any) -> None:
+        for attr, _, _ in FIELDS:
+            setattr(self, attr, values.get(attr, math.nan))
+
+    def __repr__(self) -> str:
+        return f"Transaction(date={self.date!r}, amount={self.amount!r}, category={self.category!r})"
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "Transaction":
+        """Создает запись из словаря с колонками выгрузки (например, из get_dict_transaction)."""
+        values = {}
+        for attr, column, _ in FIELDS:
+            value = record.get(column, math.nan)
+            if attr == "date" and isinstance(value, str):
+                value = parse_date(value)
+            values[attr] = intern_value(value)
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает запись в виде словаря с колонками выгрузки."""
+        record = {column: getattr(self, attr) for attr, column, _ in FIELDS}
+        if isinstance(self.date, datetime):
+            record[DATE_COLUMN] = self.date.strftime(DATE_FORMAT)
+        return record
+
+
+class TransactionBatch:
+    """Набор операций в колоночном виде: по массиву NumPy на каждое поле.
+
+    Повторяющиеся строки (категории, карты, валюты, статусы) хранятся кодами в словаре строк,
+    описания интернированы. Такой набор принимают get_transactions_ind и spending_by_category."""
+
+    __slots__ = ("columns", "labels", "_length")
+
+    def __init__(self, columns: Dict[str, np.ndarray], labels: Dict[str, np.ndarray], length: int) -> None:
+        self.columns = columns
+        self.labels = labels
+        self._length = length
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TransactionBatch":
+        """Создает набор из датафрейма выгрузки (в том числе из хранилища)."""
+        columns: Dict[str, np.ndarray] = {}
+        labels: Dict[str, np.ndarray] = {}
+        for attr, column, kind in FIELDS:
+            if kind == "date":
+                columns[attr] = get_operation_dates(df).to_numpy(dtype="datetime64[ns]")
+            elif column not in df.columns:
+                continue
+            elif kind == "code":
+                codes, uniques = pd.factorize(df[column])
+                columns[attr] = codes.astype(np.int32)
+                labels[attr] = np.array([intern_value(value) for value in uniques], dtype=object)
+            elif kind == "text":
+                columns[attr] = np.array([intern_value(value) for value in df[column]], dtype=object)
+            elif kind == "int" and not df[column].isna().any():
+                columns[attr] = df[column].to_numpy(dtype=np.int64)
+            else:
+                columns[attr] = df[column].to_numpy(dtype=np.float64)
+        return cls(columns, labels, len(df))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "TransactionBatch":
+        """Создает набор из словарей с колонками выгрузки."""
+        return cls.from_frame(pd.DataFrame.from_records(list(records)))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def column(self, attr: str) -> np.ndarray:
+        """Возвращает значения поля; коды словаря раскрываются в строки, пропуски - NaN."""
+        values = self.columns[attr]
+        if attr in self.labels:
+            expanded: np.ndarray = np.append(self.labels[attr], math.nan)[values]
+            return expanded
+        return values
+
+    def code_of(self, attr: str, value: Any) -> Optional[int]:
+        """Возвращает код значения в словаре строк поля или None, если такого значения нет."""
+        matches = np.flatnonzero(self.labels[attr] == value)
+        return int(matches[0]) if len(matches) else None
+
+    def select(self, mask: Union[np.ndarray, slice]) -> "TransactionBatch":
+        """Возвращает набор из операций, отмеченных маской, индексами или срезом (срез не копирует массивы)."""
+        columns = {attr: values[mask] for attr, values in self.columns.items()}
+        length = len(next(iter(columns.values()))) if columns else 0
+        return TransactionBatch(columns, self.labels, length)
+
+    def __getitem__(self, position: int) -> Transaction:
+        values = {}
+        for attr, values_array in self.columns.items():
+            value = values_array[position]
+            if attr in self.labels:
+                value = self.labels[attr][value] if value >= 0 else math.nan
+            elif attr == "date":
+                value = pd.Timestamp(value).to_pydatetime() if not np.isnat(value) else math.nan
+            else:
+                value = value.item() if isinstance(value, np.generic) else value
+            values[attr] = value
+        return Transaction(**values)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for position in range(self._length):
+            yield self[position]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Возвращает набор в виде датафрейма с колонками выгрузки."""
+        return pd.DataFrame({column: self.column(attr) for attr, column, _ in FIELDS if attr in self.columns})
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Возвращает набор в виде списка словарей с колонками выгрузки."""
+        return [transaction.to_dict() for transaction in self]
@@ -1,56 +1,110 @@
-import json
+from __future__ import annotations
+
 import logging
-import os
 from pathlib import Path
-from typing import Optional
-
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
 
+from src.dates import DATE_FORMAT, parse_date
 from src.decorators import decorator_spending_by_category
-from src.utils import get_dict_transaction
+from src.lazy import lazy_import
+from src.logging_setup import setup_logging
+from src.metrics import measure_stage, timed
+from src.records import TransactionBatch
+from src.serialization import to_payload
+from src.store import date_slice, get_operation_dates, get_store
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
 
 # Определяем пути
 PROJECT_ROOT = Path(__file__).resolve().parent.parent  # Выйти на уровень выше, чтобы достичь корня
 DATA_DIR = PROJECT_ROOT / "data"  # Путь к директории с данными
 file_path = DATA_DIR / "operations.xlsx"  # Путь к вашему файлу Excel
 
-# Проверка пути
-print(f"Путь к файлу: {file_path}")  # Выводим путь для отладки
+logger = logging.getLogger(__name__)
 
-# Проверка и создание директории для логов, если она не существует
-log_directory = PROJECT_ROOT / "logs"
-os.makedirs(log_directory, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(filename)s - %(levelname)s - %(message)s",
-    filename=os.path.join(log_directory, "reports.log"),
-    filemode="w",
-)
-logger = logging.getLogger(__name__)
+def _spending_amounts(transactions: pd.DataFrame) -> pd.Series:
+    """Возвращает суммы трат, проиндексированные разобранной датой операции."""
+    dates = pd.DatetimeIndex(get_operation_dates(transactions))
+    return pd.Series(transactions["Сумма операции с округлением"].to_numpy(), index=dates)
 
-spending_by_category_logger = logging.getLogger()
 
+def _format_spending(amounts: pd.Series) -> List[Dict[str, Any]]:
+    """Формирует список трат {"date", "amount"} по колонкам, без обхода строк.
+    Траты упорядочены по возрастанию даты, траты с одинаковой датой - в порядке строк выгрузки."""
+    if not amounts.index.is_monotonic_increasing:
+        amounts = amounts.sort_index(kind="stable")
+    formatted = amounts.index.strftime(DATE_FORMAT).tolist()
+    return [{"date": date, "amount": amount} for date, amount in zip(formatted, amounts.tolist())]
 
-@decorator_spending_by_category(report_filename="custom_report.json")
-def spending_by_category(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> str:
-    """Функция возвращающая траты за последние 90 дней по заданной категории."""
 
-    logger.info(f"Запуск функции spending_by_category для категории: {category} и даты: {date}")
+@timed("filter")
+def _select_spending(
+    transactions: pd.DataFrame, categories: List[str], date_start: pd.Timestamp, date_end: pd.Timestamp
+) -> Dict[str, pd.Series]:
+    """Отбирает суммы трат по категориям за период из одного датафрейма."""
+    # Для хранилища период находится двоичным поиском по индексу дат
+    window = date_slice(transactions, date_start, date_end)
+    filtered_transactions = window[
+        window["Категория"].isin(categories) & (window["Сумма операции с округлением"] > 0)
+    ]
+    if len(categories) == 1:
+        return {categories[0]: _spending_amounts(filtered_transactions)}
+    return {
+        str(name): _spending_amounts(group) for name, group in filtered_transactions.groupby("Категория", sort=False)
+    }
+
 
-    final_list = []
+@decorator_spending_by_category(report_filename="custom_report.json")
+def spending_by_category(
+    transactions: Union[pd.DataFrame, Iterable[pd.DataFrame], TransactionBatch, None],
+    category: Union[str, List[str]],
+    date: Optional[str] = None,
+    as_bytes: bool = False,
+) -> Union[str, bytes]:
+    """Функция возвращающая траты за последние 90 дней по заданной категории.
+    Если передан список категорий, возвращает траты по каждой из них за один проход.
+    Если transactions равен None, используются операции из общего хранилища.
+    Вместо датафрейма можно передать итератор порций (например, из readers.iter_operation_frames),
+    тогда выгрузка обрабатывается по частям в ограниченном объеме памяти. Колоночный набор
+    TransactionBatch тоже принимается.
+    Переданный датафрейм не изменяется и не копируется целиком.
+    Траты возвращаются по возрастанию даты операции при любом источнике и порядке строк в нем
+    (выгрузка банка идет от новых операций к старым), траты с одинаковой датой - в порядке строк.
+    При as_bytes=True JSON возвращается байтами (UTF-8)."""
+
+    logger.info("Запуск функции spending_by_category для категории: %s и даты: %s", category, date)
+
+    categories = [category] if isinstance(category, str) else list(category)
+    spending: Dict[str, List[Dict[str, Any]]] = {name: [] for name in categories}
+
+    # Операции обрабатываются порциями: датафрейм (из хранилища или переданный) - одна порция
+    store = None
+    chunks: Iterable[pd.DataFrame]
+    if transactions is None:
+        store = get_store()
+        chunks = [store.frame()]
+    elif isinstance(transactions, TransactionBatch):
+        chunks = [transactions.to_frame()]
+    elif isinstance(transactions, pd.DataFrame):
+        chunks = [transactions]
+    else:
+        chunks = transactions
 
     # Определяем конечную дату
     if date is None:
         date_end = pd.Timestamp.now()  # Используем Pandas Timestamp для согласованности
         logger.info("Дата окончания не указана, используется текущая дата.")
     else:
-        # Преобразуем дату и проверяем на NaT
-        date_end_temp = pd.to_datetime(date, format="%d.%m.%Y %H:%M:%S", errors="coerce")  # Преобразуем дату
-        if pd.isna(date_end_temp):  # Проверяем на NaT
-            logger.error(f"Неверный формат даты: {date}")
-            raise ValueError(f"Неверный формат даты: {date}")
-        date_end = date_end_temp  # Присваиваем только если дата корректна
+        # Преобразуем дату по явному формату выгрузки
+        try:
+            date_end = pd.Timestamp(parse_date(date))
+        except ValueError:
+            logger.error("Неверный формат даты: %s", date)
+            raise ValueError(f"Неверный формат даты: {date}") from None
 
     # Начальная дата - 90 дней назад от конечной даты
     if date_end is not None:  # Убедитесь, что date_end не None
@@ -58,49 +112,44 @@ def spending_by_category(transactions: pd.DataFrame, category: str, date: Option
     else:
         raise ValueError("date_end должен быть корректной временной меткой.")
 
-    # Преобразуем даты операций и удаляем записи без дат
-    transactions["Дата операции"] = pd.to_datetime(
-        transactions["Дата операции"], format="%d.%m.%Y %H:%M:%S", errors="coerce"
-    )
-
-    # Приводим тип к Timestamp
-    transactions["Дата операции"] = transactions["Дата операции"].astype("datetime64[ns]")
-
-    # Удаляем записи с NaT
-    transactions = transactions.dropna(subset=["Дата операции"])
-
-    filtered_transactions = transactions[
-        (transactions["Категория"] == category)
-        & (pd.notna(transactions["Дата операции"]) & transactions["Дата операции"].between(date_start, date_end))
-        & (transactions["Сумма операции с округлением"] > 0)
-    ]
+    # По своду хранилища отбрасываем категории, по которым трат за период нет
+    searched = categories
+    if store is not None:
+        category_spend = store.category_spend(date_start, date_end)
+        searched = [name for name in categories if category_spend.get(name, 0) != 0]
+
+    if searched:
+        # Отбираем операции за 90 дней из каждой порции по очереди
+        parts: Dict[str, List[pd.Series]] = {name: [] for name in searched}
+        for chunk in chunks:
+            for name, amounts in _select_spending(chunk, searched, date_start, date_end).items():
+                parts[name].append(amounts)
+        # Траты из разных порций сливаются по уже разобранным датам, без повторного разбора строк
+        for name, series in parts.items():
+            if series:
+                spending[name] = _format_spending(series[0] if len(series) == 1 else pd.concat(series))
 
     logger.info(
-        f"Найдено {len(filtered_transactions)} транзакций для категории '{category}' "
-        f"за период с {date_start} по {date_end}."
+        "Найдено %d транзакций для категорий %s за период с %s по %s.",
+        sum(len(items) for items in spending.values()),
+        categories,
+        date_start,
+        date_end,
     )
 
-    # Формируем результирующий список
-    for _, transaction in filtered_transactions.iterrows():
-        final_list.append(
-            {
-                "date": transaction["Дата операции"].strftime("%d.%m.%Y %H:%M:%S"),
-                "amount": transaction["Сумма операции с округлением"],
-            }
-        )
-
-    logger.info(f"Возвращаемый результат: {json.dumps(final_list, indent=4, ensure_ascii=False)}")
-
     # Возвращаем результат в формате JSON
-    return json.dumps(final_list, indent=4, ensure_ascii=False)
+    result: Union[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]
+    result = spending[category] if isinstance(category, str) else spending
+    with measure_stage("serialize", "spending_by_category", rows=sum(len(items) for items in spending.values())):
+        json_result = to_payload(result, as_bytes)
+    logger.debug("Возвращаемый результат: %d символов JSON", len(json_result))
+    return json_result
 
 
 if __name__ == "__main__":
+    setup_logging()
     try:
-        f = pd.DataFrame(get_dict_transaction(str(file_path)))
-        logger.info(f"Загруженные данные: \n{f}")  # Логируем загруженные данные
-        result = spending_by_category(f, "Фастфуд", "17.12.2021 16:28:23")
-        logger.info(f"Результат выполнения: {result}")
+        result = spending_by_category(None, "Фастфуд", "17.12.2021 16:28:23")
         print(result)
     except FileNotFoundError as e:
         logger.error("Файл не найден: %s", e)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+import math
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Union
+
+from src.config import JSON_BACKEND, JSON_PRETTY
+from src.lazy import lazy_import
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него используется стандартный json
+    orjson = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Сериализатор получает объект и признак вывода с отступами и возвращает JSON строкой или байтами
+Serializer = Callable[[Any, bool], Union[str, bytes]]
+
+_backends: Dict[str, Serializer] = {}
+_backend_name = ""
+
+
+def _replace_nan(value: Any) -> Any:
+    """Заменяет NaN и бесконечности во вложенных словарях и списках на None, как это делает orjson.
+
+    Числа numpy float64 - подкласс float, поэтому до default стандартного json они не доходят,
+    и без замены json записал бы NaN, который не является корректным JSON."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _replace_nan(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_nan(item) for item in value]
+    return value
+
+
+def _default(value: Any) -> Any:
+    """Приводит типы numpy и pandas, даты и Decimal к типам, которые умеет записывать JSON.
+    NaN и бесконечности становятся None."""
+    if value is pd.NaT or value is None:
+        return None
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (np.floating, Decimal)):
+        return _replace_nan(float(value))
+    if isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+        return _replace_nan(value.tolist())
+    if isinstance(value, pd.DataFrame):
+        return _replace_nan(value.to_dict(orient="records"))
+    if isinstance(value, (pd.Timedelta, dt.timedelta)):
+        return str(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _json_dumps(value: Any, pretty: bool) -> str:
+    """Сериализатор на стандартном json. NaN записывается как null, так же как в orjson."""
+    value = _replace_nan(value)
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, indent=2, default=_default, allow_nan=False)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default, allow_nan=False)
+
+
+def _orjson_dumps(value: Any, pretty: bool) -> bytes:
+    """Сериализатор на orjson: массивы и скаляры numpy записываются без преобразования в объекты Python."""
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(value, default=_default, option=option)
+
+
+def register_backend(name: str, serializer: Serializer) -> None:
+    """Регистрирует сериализатор под именем name, после чего его можно выбрать через set_backend."""
+    _backends[name] = serializer
+
+
+def set_backend(name: str = "auto") -> str:
+    """Выбирает сериализатор по имени. auto - orjson, если он установлен, иначе json.
+    Возвращает имя выбранного сериализатора."""
+    global _backend_name
+    if name == "auto":
+        name = "orjson" if "orjson" in _backends else "json"
+    if name not in _backends:
+        raise ValueError(f"Неизвестный сериализатор JSON: {name}")
+    _backend_name = name
+    logger.debug("Выбран сериализатор JSON: %s", name)
+    return name
+
+
+def get_backend() -> str:
+    """Возвращает имя текущего сериализатора."""
+    return _backend_name
+
+
+def dumps(value: Any, pretty: Optional[bool] = None) -> bytes:
+    """Сериализует значение в JSON (UTF-8). По умолчанию вывод компактный, если не задан JSON_PRETTY."""
+    result = _backends[_backend_name](value, JSON_PRETTY if pretty is None else pretty)
+    return result if isinstance(result, bytes) else result.encode("utf-8")
+
+
+def dumps_str(value: Any, pretty: Optional[bool] = None) -> str:
+    """Сериализует значение в строку JSON."""
+    result = _backends[_backend_name](value, JSON_PRETTY if pretty is None else pretty)
+    return result if isinstance(result, str) else result.decode("utf-8")
+
+
+def to_payload(value: Any, as_bytes: bool = False, pretty: Optional[bool] = None) -> Union[str, bytes]:
+    """Сериализует ответ функции: байты для as_bytes=True (без промежуточной строки), иначе строку."""
+    return dumps(value, pretty) if as_bytes else dumps_str(value, pretty)
+
+
+def as_payload(payload: str, as_bytes: bool = False) -> Union[str, bytes]:
+    """Приводит уже готовую строку JSON к нужному типу ответа."""
+    return payload.encode("utf-8") if as_bytes else payload
+
+
+def loads(payload: Union[str, bytes]) -> Any:
+    """Разбирает JSON из строки или байтов."""
+    if orjson is not None:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            pass  # Например, NaN в JSON, записанном без замены на null
+    return json.loads(payload)
+
+
+register_backend("json", _json_dumps)
+if orjson is not None:
+    register_backend("orjson", _orjson_dumps)
+set_backend(JSON_BACKEND)
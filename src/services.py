@@ -1,43 +1,189 @@
-import json
+from __future__ import annotations
+
 import logging
 import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Pattern, Tuple, Union
+
+from src.lazy import lazy_import
+from src.logging_setup import setup_logging
+from src.metrics import measure_stage, timed
+from src.records import Transaction, TransactionBatch
+from src.serialization import as_payload, to_payload
+from src.store import PARSED_DATE_COLUMN, get_store
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+
+# Паттерн для поиска переводов физическим лицам
+INDIVIDUAL_PATTERN = r"\b[А-Я][а-я]+\s[А-Я]\."
+
+# Паттерны переводов по номеру телефона и организациям
+PHONE_PATTERN = r".*\+7[\s\d()-]{9,}"
+ORGANISATION_PATTERN = r"(?:На р/с\s+)?(?:ООО|ОАО|ЗАО|ПАО|АО|ИП)\s"
+
+# Именованные паттерны переводов для find_transfers, порядок задает приоритет
+TRANSFER_PATTERNS = {
+    "individual": INDIVIDUAL_PATTERN,
+    "phone": PHONE_PATTERN,
+    "organisation": ORGANISATION_PATTERN,
+}
+
+# Колонка, в которой find_transfers отмечает сработавший паттерн
+TRANSFER_TYPE_COLUMN = "Тип перевода"
+
+
+# Конструкции, которые работают только в отдельном выражении: глобальные флаги в начале паттерна
+# и ссылки на группы по номеру (при объединении паттернов номера групп сдвигаются)
+_STANDALONE_SYNTAX = re.compile(r"^\(\?[aiLmsux]+\)|\\[1-9]|\(\?\(\d")
+
+
+@lru_cache(maxsize=32)
+def _compile_transfer_pattern(pattern: str) -> Pattern[str]:
+    """Компилирует один паттерн как есть, с той же семантикой, что и re.match(pattern, ...)."""
+    return re.compile(pattern)
+
 
-from src.utils import get_dict_transaction
+@lru_cache(maxsize=32)
+def _combine_transfer_patterns(patterns: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """Собирает паттерны в одно регулярное выражение с именованной группой на каждый паттерн.
+    Возвращает None, если паттерны нельзя объединить без изменения их смысла.
+    Выражение компилируется один раз для каждого набора паттернов."""
+    if any(_STANDALONE_SYNTAX.search(pattern) for pattern in patterns):
+        return None
+    alternatives = "|".join(f"(?P<_p{position}>{pattern})" for position, pattern in enumerate(patterns))
+    try:
+        return re.compile(f"^(?:{alternatives})")
+    except re.error:
+        return None
 
-# Настройка логирования
-logger = logging.getLogger("logs")
-logger.setLevel(logging.INFO)
-file_handler = logging.FileHandler("..\\logs\\services.log", encoding="utf-8")
-file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s: %(message)s")
-file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
 
+@timed("filter")
+def _match_transfers(transactions: pd.DataFrame, patterns: Dict[str, str]) -> pd.DataFrame:
+    """Отбирает переводы, описание которых соответствует одному из паттернов (как re.match).
+    Сначала отбираются операции категории "Переводы", регулярное выражение применяется только к ним.
+    Каждая найденная строка отмечается в колонке TRANSFER_TYPE_COLUMN именем первого подходящего паттерна."""
+    transfers = transactions[transactions["Категория"] == "Переводы"]
+    descriptions = transfers["Описание"].astype("string")
+    names = list(patterns)
 
-def get_transactions_ind(dict_transaction: list[dict], pattern: str) -> str:
-    """Функция возвращает JSON со всеми транзакциями, которые относятся к переводам физлицам."""
+    if len(names) == 1:
+        matched = descriptions.str.match(_compile_transfer_pattern(patterns[names[0]]), na=False).to_numpy(bool)
+        return transfers[matched].assign(**{TRANSFER_TYPE_COLUMN: names[0]})
+
+    regex = _combine_transfer_patterns(tuple(patterns.values()))
+    if regex is not None:
+        # Все паттерны проверяются за один проход: совпавшая группа указывает на паттерн
+        groups = descriptions.str.extract(regex, expand=True)
+        hits = groups[[f"_p{position}" for position in range(len(names))]].notna().to_numpy()
+    else:
+        logger.debug("Паттерны переводов нельзя объединить, они проверяются по одному")
+        hits = np.column_stack(
+            [
+                descriptions.str.match(_compile_transfer_pattern(pattern), na=False).to_numpy(bool)
+                for pattern in patterns.values()
+            ]
+        )
+    matched = hits.any(axis=1)
+    tags = np.asarray(names, dtype=object)[hits.argmax(axis=1)]
+    return transfers[matched].assign(**{TRANSFER_TYPE_COLUMN: tags[matched]})
+
+
+def get_transactions_ind(
+    dict_transaction: Union[Iterable[dict], Iterable[Transaction], TransactionBatch, pd.DataFrame, None] = None,
+    pattern: str = INDIVIDUAL_PATTERN,
+    as_bytes: bool = False,
+) -> Union[str, bytes]:
+    """Функция возвращает JSON со всеми транзакциями, которые относятся к переводам физлицам.
+    Принимает список словарей или датафрейм, по умолчанию берет операции из общего хранилища.
+    Можно передать и генератор записей (например, readers.iter_operations): выгрузка тогда
+    просматривается потоково, в памяти остаются только найденные переводы.
+    Также принимаются записи Transaction и колоночный набор TransactionBatch.
+    При as_bytes=True JSON возвращается байтами (UTF-8)."""
     logger.info("Вызвана функция get_transactions_ind")
     list_transactions_fl = []
 
-    for trans in dict_transaction:
-        # Проверяем, что "Описание" соответствует паттерну и категория равна "Переводы"
-        if "Описание" in trans and re.match(pattern, trans["Описание"]) and trans.get("Категория") == "Переводы":
-            list_transactions_fl.append(trans)
+    if dict_transaction is None:
+        dict_transaction = get_store().frame()
+    if isinstance(dict_transaction, pd.DataFrame):
+        # Датафрейм проверяется векторно, в словари преобразуются только найденные переводы
+        transfers = _match_transfers(dict_transaction, {"individual": pattern})
+        transfers = transfers.drop(columns=[PARSED_DATE_COLUMN, TRANSFER_TYPE_COLUMN], errors="ignore")
+        list_transactions_fl = transfers.to_dict(orient="records")
+    else:
+        if isinstance(dict_transaction, TransactionBatch):
+            # В наборе переводы отбираются по коду категории, без раскрытия строк
+            transfers_code = dict_transaction.code_of("category", "Переводы")
+            dict_transaction = dict_transaction.select(dict_transaction.columns["category"] == transfers_code)
+
+        regex = _compile_transfer_pattern(pattern)
+        for trans in dict_transaction:
+            if isinstance(trans, Transaction):
+                if trans.category == "Переводы" and isinstance(trans.description, str) and regex.match(
+                    trans.description
+                ):
+                    list_transactions_fl.append(trans.to_dict())
+            # Сначала проверяем категорию "Переводы", и только потом описание по паттерну
+            elif trans.get("Категория") == "Переводы" and isinstance(trans.get("Описание"), str) and regex.match(
+                trans["Описание"]
+            ):
+                list_transactions_fl.append(trans)
 
-    logger.info(f"Найдено {len(list_transactions_fl)} транзакций, соответствующих паттерну и категории 'Переводы'")
+    logger.info("Найдено %d транзакций, соответствующих паттерну и категории 'Переводы'", len(list_transactions_fl))
 
     if list_transactions_fl:
-        list_transactions_fl_json = json.dumps(list_transactions_fl, ensure_ascii=False, indent=2)
-        logger.info(f"Возвращен JSON со {len(list_transactions_fl)} транзакциями")
+        with measure_stage("serialize", "get_transactions_ind", rows=len(list_transactions_fl)):
+            list_transactions_fl_json = to_payload(list_transactions_fl, as_bytes)
+        logger.info("Возвращен JSON со %d транзакциями", len(list_transactions_fl))
         return list_transactions_fl_json
     else:
         logger.info("Возвращен пустой список")
-        return "[]"
+        return as_payload("[]", as_bytes)
+
+
+def find_transfers(
+    transactions: Union[Iterable[dict], TransactionBatch, pd.DataFrame, None] = None,
+    patterns: Dict[str, str] = TRANSFER_PATTERNS,
+    as_bytes: bool = False,
+) -> Union[str, bytes]:
+    """Функция возвращает JSON с переводами, описание которых соответствует одному из именованных
+    паттернов (по умолчанию физлица, переводы по номеру телефона и организации).
+    У каждой транзакции в поле "Тип перевода" указано имя паттерна, который сработал первым.
+    Все паттерны проверяются за один векторный проход, по умолчанию берутся операции из хранилища.
+    При as_bytes=True JSON возвращается байтами (UTF-8)."""
+    logger.info("Вызвана функция find_transfers с паттернами %s", list(patterns))
+
+    frame: pd.DataFrame
+    if transactions is None:
+        frame = get_store().frame()
+    elif isinstance(transactions, TransactionBatch):
+        frame = transactions.to_frame()
+    elif isinstance(transactions, pd.DataFrame):
+        frame = transactions
+    else:
+        frame = pd.DataFrame.from_records(list(transactions))
+
+    if frame.empty or not {"Категория", "Описание"} <= set(frame.columns) or not patterns:
+        logger.info("Возвращен пустой список")
+        return as_payload("[]", as_bytes)
+
+    transfers = _match_transfers(frame, patterns).drop(columns=PARSED_DATE_COLUMN, errors="ignore")
+    if logger.isEnabledFor(logging.INFO):
+        counts = transfers[TRANSFER_TYPE_COLUMN].value_counts().to_dict()
+        logger.info("Найдено %d переводов: %s", len(transfers), counts)
+    with measure_stage("serialize", "find_transfers", rows=len(transfers)):
+        return to_payload(transfers.to_dict(orient="records"), as_bytes)
 
 
 if __name__ == "__main__":
-    # Вызываем функцию, передавая данные и паттерн для поиска физических лиц
-    list_transactions_fl_json = get_transactions_ind(
-        get_dict_transaction("..\\data\\operations.xlsx"),
-        pattern=r"\b[А-Я][а-я]+\s[А-Я]\.",  # Паттерн для поиска физических лиц
-    )
+    setup_logging()
+    # Вызываем функцию для операций из хранилища и паттерна для поиска физических лиц
+    list_transactions_fl_json = get_transactions_ind(pattern=INDIVIDUAL_PATTERN)
     print(list_transactions_fl_json)
@@ -0,0 +1,266 @@
+"""Снимок операций на диске для быстрого холодного старта.
+
+Снимок - директория с массивами NumPy фиксированной ширины (даты, суммы, коды строк), словарем строк
+и посуточными сводами. Массивы открываются через mmap без копирования, поэтому открытие снимка
+не зависит от размера выгрузки, а процессы-воркеры после fork делят одни и те же страницы памяти.
+
+Запись снимка: python -m src.snapshot [путь к выгрузке]"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+from src.aggregates import DailyRollup, build_rollups
+from src.config import SNAPSHOT_DIR, SNAPSHOT_ENABLED
+from src.config import file_path as default_file_path
+from src.dates import DATE_COLUMN, PARSED_DATE_COLUMN
+from src.lazy import lazy_import
+from src.metrics import timed
+from src.records import TransactionBatch, intern_value
+from src.store import index_by_date, load_operations
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Версия формата снимка: снимки другой версии считаются устаревшими
+SNAPSHOT_VERSION = 1
+
+_opened: Dict[Path, Tuple[Tuple[int, int], "Snapshot"]] = {}
+_lock = threading.Lock()
+
+
+class Snapshot:
+    """Открытый снимок операций.
+
+    Операции хранятся в TransactionBatch, отсортированном по дате (операции без даты в начале),
+    своды - в DailyRollup; все массивы отображены в память только для чтения."""
+
+    __slots__ = ("batch", "rollups", "file_order", "raw_dates", "meta")
+
+    def __init__(
+        self,
+        batch: TransactionBatch,
+        rollups: Dict[str, DailyRollup],
+        file_order: np.ndarray,
+        raw_dates: Tuple[np.ndarray, np.ndarray],
+        meta: Dict[str, Any],
+    ) -> None:
+        self.batch = batch
+        self.rollups = rollups
+        self.file_order = file_order
+        # Даты операций строками, как в выгрузке (коды в порядке строк файла и словарь строк)
+        self.raw_dates = raw_dates
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+    def between(self, start: Any, end: Any) -> TransactionBatch:
+        """Возвращает операции за интервал [start, end] двоичным поиском по дате, без копирования массивов."""
+        dates_ns = self.batch.columns["date"].view("i8")
+        left = np.searchsorted(dates_ns, pd.Timestamp(start).value, side="left")
+        right = np.searchsorted(dates_ns, pd.Timestamp(end).value, side="right")
+        return self.batch.select(slice(left, right))
+
+    def aggregate(self, name: str, start: Any, end: Any) -> pd.Series:
+        """Возвращает суммы свода name за интервал [start, end], как TransactionStore.aggregate."""
+        if name not in self.rollups:
+            raise KeyError(f"Свод {name} недоступен для этих данных")
+        return self.rollups[name].total(start, end)
+
+    def card_spend(self, start: Any, end: Any) -> pd.Series:
+        """Расходы по каждой карте за интервал (отрицательные суммы платежей)."""
+        return self.aggregate("card_spend", start, end)
+
+    def category_spend(self, start: Any, end: Any) -> pd.Series:
+        """Траты по каждой категории за интервал."""
+        return self.aggregate("category_spend", start, end)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Возвращает операции списком словарей с колонками выгрузки в порядке строк исходного файла,
+        как get_dict_transaction."""
+        frame = self.batch.select(self.file_order).to_frame()
+        codes, labels = self.raw_dates
+        frame[DATE_COLUMN] = np.append(labels, np.nan)[codes]
+        records: List[Dict[str, Any]] = frame.to_dict(orient="records")
+        return records
+
+
+def snapshot_dir(source: Union[str, Path], root: Optional[Union[str, Path]] = None) -> Path:
+    """Возвращает директорию снимка для исходной выгрузки."""
+    source = Path(source)
+    key = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:12]
+    return Path(root if root is not None else SNAPSHOT_DIR) / f"{source.stem}.{key}"
+
+
+def _signature(source: Path) -> Tuple[int, int]:
+    """Возвращает время изменения и размер исходного файла."""
+    stat = source.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+@timed("serialize")
+def write_snapshot(
+    df: pd.DataFrame, source: Union[str, Path], root: Optional[Union[str, Path]] = None
+) -> Path:
+    """Записывает снимок операций df (в порядке строк файла source, с разобранной датой) и возвращает его директорию.
+
+    Снимок собирается во временной директории и подменяет прежний целиком."""
+    source = Path(source)
+    signature = _signature(source)
+    target = snapshot_dir(source, root)
+    tmp_dir = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    # Строки сортируются по дате так же, как в хранилище; file_order восстанавливает порядок файла
+    order = np.argsort(df[PARSED_DATE_COLUMN].to_numpy(dtype="datetime64[ns]").view("i8"), kind="stable")
+    file_order = np.empty_like(order)
+    file_order[order] = np.arange(len(order))
+    frame = index_by_date(df)
+    batch = TransactionBatch.from_frame(frame)
+
+    strings: Dict[str, Any] = {"columns": {}, "rollups": {}}
+    # Исходные строки дат нужны, чтобы вернуть операции в том виде, в каком они записаны в выгрузке
+    raw_codes, raw_labels = pd.factorize(df[DATE_COLUMN])
+    np.save(tmp_dir / "raw_dates.npy", raw_codes.astype(np.int32))
+    strings["raw_dates"] = list(raw_labels)
+    for attr, values in batch.columns.items():
+        if attr in batch.labels:
+            strings["columns"][attr] = batch.labels[attr].tolist()
+        elif values.dtype == object:
+            # Описания тоже хранятся кодами: в файле могут быть только массивы фиксированной ширины
+            codes, uniques = pd.factorize(values)
+            values = codes.astype(np.int32)
+            strings["columns"][attr] = list(uniques)
+        # Даты из pandas несут пустые метаданные dtype, которые np.save не сохраняет
+        np.save(tmp_dir / f"{attr}.npy", values.view(np.dtype(values.dtype.str)))
+    np.save(tmp_dir / "file_order.npy", file_order)
+
+    rollups = build_rollups(frame)
+    for name, rollup in rollups.items():
+        strings["rollups"][name] = rollup.labels.tolist()
+        for array_name, values in rollup.to_arrays().items():
+            np.save(tmp_dir / f"rollup.{name}.{array_name}.npy", values)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "source": str(source.resolve()),
+        "mtime_ns": signature[0],
+        "size": signature[1],
+        "rows": len(batch),
+        "columns": list(batch.columns),
+        "rollups": list(rollups),
+    }
+    (tmp_dir / "strings.json").write_text(json.dumps(strings, ensure_ascii=False, default=str), encoding="utf-8")
+    (tmp_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    old_dir = target.with_name(f"{target.name}.{os.getpid()}.old")
+    if target.exists():
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info("Снимок %d операций из %s записан в %s", len(batch), source, target)
+    return target
+
+
+def _read_meta(directory: Path) -> Dict[str, Any]:
+    """Читает метаданные снимка, при любой ошибке возвращает пустой словарь."""
+    try:
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _load(directory: Path, meta: Dict[str, Any]) -> Snapshot:
+    """Открывает массивы снимка через mmap и читает словарь строк."""
+    strings = json.loads((directory / "strings.json").read_text(encoding="utf-8"))
+    columns = {attr: np.load(directory / f"{attr}.npy", mmap_mode="r") for attr in meta["columns"]}
+    labels = {
+        attr: np.array([intern_value(value) for value in values], dtype=object)
+        for attr, values in strings["columns"].items()
+    }
+    batch = TransactionBatch(columns, labels, meta["rows"])
+    rollups = {
+        name: DailyRollup.from_arrays(
+            strings["rollups"][name],
+            {array: np.load(directory / f"rollup.{name}.{array}.npy", mmap_mode="r") for array in DailyRollup.ARRAYS},
+        )
+        for name in meta["rollups"]
+    }
+    raw_dates = (
+        np.load(directory / "raw_dates.npy", mmap_mode="r"),
+        np.array(strings["raw_dates"], dtype=object),
+    )
+    return Snapshot(batch, rollups, np.load(directory / "file_order.npy", mmap_mode="r"), raw_dates, meta)
+
+
+@timed("load")
+def open_snapshot(source: Union[str, Path], root: Optional[Union[str, Path]] = None) -> Optional[Snapshot]:
+    """Открывает снимок выгрузки source, если он записан для текущей версии файла, иначе возвращает None.
+    Открытый снимок запоминается, повторные вызовы только сверяют метаданные."""
+    source = Path(source)
+    directory = snapshot_dir(source, root)
+    meta = _read_meta(directory)
+    try:
+        signature = _signature(source)
+    except OSError:
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION or (meta.get("mtime_ns"), meta.get("size")) != signature:
+        return None
+
+    with _lock:
+        cached = _opened.get(directory)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            snapshot = _load(directory, meta)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Не удалось открыть снимок %s: %s", directory, e)
+            return None
+        _opened[directory] = (signature, snapshot)
+    logger.info("Открыт снимок %d операций %s", len(snapshot), directory)
+    return snapshot
+
+
+def get_snapshot(
+    source: Union[str, Path] = default_file_path,
+    root: Optional[Union[str, Path]] = None,
+    build: bool = True,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> Optional[Snapshot]:
+    """Возвращает снимок выгрузки, если снимки включены (TRANSACTION_SNAPSHOT=1), иначе None.
+
+    Устаревший или отсутствующий снимок при build=True записывается заново из выгрузки,
+    которая читается через кэш разобранных операций в cache_dir (по умолчанию CACHE_DIR)."""
+    if not SNAPSHOT_ENABLED:
+        return None
+    snapshot: Optional[Snapshot] = open_snapshot(source, root)
+    if snapshot is None and build:
+        try:
+            write_snapshot(load_operations(source, cache_dir), source, root)
+        except (OSError, ValueError) as e:
+            logger.warning("Не удалось записать снимок для %s: %s", source, e)
+            return None
+        snapshot = open_snapshot(source, root)
+    return snapshot
+
+
+if __name__ == "__main__":
+    operations_path = Path(sys.argv[1]) if len(sys.argv) > 1 else default_file_path
+    print(f"Снимок записан в {write_snapshot(load_operations(operations_path), operations_path)}")
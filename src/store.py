@@ -0,0 +1,500 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent import futures
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Counter, Dict, List, Optional, Tuple, Union
+
+from src.aggregates import DailyRollup, build_rollups, extend_rollups
+from src.config import CACHE_DIR
+from src.config import file_path as default_file_path
+from src.dates import DATE_COLUMN, DATE_FORMAT, PARSED_DATE_COLUMN, parse_date_column
+from src.lazy import lazy_import
+from src.metrics import timed
+from src.operations_json import JSON_SUFFIXES, read_operations_json
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Расширения файлов, которые считаются выгрузками операций
+OPERATION_SUFFIXES = {".xlsx", *JSON_SUFFIXES}
+
+# Версия формата кэша: при изменении структуры кэша старые файлы пересобираются
+CACHE_VERSION = 1
+
+
+def _cache_paths(source: Path, cache_dir: Path) -> Tuple[Path, Path]:
+    """Возвращает пути к файлу кэша и к файлу с его метаданными для исходного файла."""
+    key = hashlib.sha1(str(source.resolve()).encode("utf-8")).hexdigest()[:12]
+    base = f"{source.stem}.{key}"
+    return cache_dir / f"{base}.pkl", cache_dir / f"{base}.meta.json"
+
+
+def _file_hash(source: Path) -> str:
+    """Считает sha256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(source, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(meta_path: Path) -> Dict[str, Any]:
+    """Читает метаданные кэша, при любой ошибке возвращает пустой словарь."""
+    try:
+        with open(meta_path, encoding="utf-8") as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def _write_atomic(path: Path, write: Any) -> None:
+    """Записывает файл через временный файл и атомарное переименование."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def parse_operations(df: pd.DataFrame) -> pd.DataFrame:
+    """Добавляет к выгрузке колонку с разобранной датой операции."""
+    df[PARSED_DATE_COLUMN] = parse_date_column(df[DATE_COLUMN], DATE_FORMAT)
+    return df
+
+
+@timed("load")
+def load_operations(file_path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None) -> pd.DataFrame:
+    """Загружает выгрузку операций из Excel или JSON/JSONL (формат data/operations.json)
+    через колоночный кэш на диске.
+
+    Кэш хранит типизированный датафрейм с уже разобранными датами и пересобирается,
+    только если у исходного файла изменились время модификации, размер и содержимое."""
+    source = Path(file_path)
+    if not source.is_file():
+        logger.error("Файл не найден: %s", source)
+        raise FileNotFoundError(f"Файл не найден: {source}")
+
+    cache_root = Path(cache_dir) if cache_dir is not None else CACHE_DIR
+    cache_path, meta_path = _cache_paths(source, cache_root)
+    stat = source.stat()
+    meta = _read_meta(meta_path)
+
+    if meta.get("version") == CACHE_VERSION and cache_path.is_file():
+        if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+            logger.info("Операции загружены из кэша %s", cache_path)
+            return pd.read_pickle(cache_path)
+        # Файл могли просто «потрогать»: сверяем содержимое, прежде чем разбирать Excel заново
+        if meta.get("size") == stat.st_size and meta.get("sha256") == _file_hash(source):
+            meta.update(mtime_ns=stat.st_mtime_ns)
+            _write_atomic(meta_path, lambda path: path.write_text(json.dumps(meta), encoding="utf-8"))
+            logger.info("Содержимое %s не изменилось, используется кэш %s", source, cache_path)
+            return pd.read_pickle(cache_path)
+
+    logger.info("Кэш для %s устарел или отсутствует, файл читается заново", source)
+    if source.suffix.lower() in JSON_SUFFIXES:
+        df = read_operations_json(source)
+    else:
+        df = parse_operations(pd.read_excel(source))
+
+    try:
+        os.makedirs(cache_root, exist_ok=True)
+        _write_atomic(cache_path, df.to_pickle)
+        meta = {
+            "version": CACHE_VERSION,
+            "source": str(source.resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": _file_hash(source),
+        }
+        _write_atomic(meta_path, lambda path: path.write_text(json.dumps(meta), encoding="utf-8"))
+        logger.info("Кэш операций записан в %s", cache_path)
+    except OSError as e:
+        # Без кэша приложение продолжает работать, просто медленнее
+        logger.warning("Не удалось записать кэш операций: %s", e)
+
+    return df
+
+
+def _load_operations_timed(
+    file_path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None
+) -> Tuple[pd.DataFrame, float]:
+    """Загружает одну выгрузку и возвращает ее вместе со временем загрузки в секундах."""
+    started = time.perf_counter()
+    df = load_operations(file_path, cache_dir)
+    return df, time.perf_counter() - started
+
+
+def find_operation_files(source: Union[str, Path]) -> List[Path]:
+    """Возвращает выгрузки операций по пути к директории (все *.xlsx, *.json и *.jsonl в ней) или по glob-шаблону."""
+    if Path(source).is_dir():
+        paths = (path for path in Path(source).iterdir() if path.suffix.lower() in OPERATION_SUFFIXES)
+    else:
+        paths = (Path(path) for path in glob.glob(str(source)))
+    # Временные файлы Excel (~$имя.xlsx) не являются выгрузками
+    return sorted(path for path in paths if path.is_file() and not path.name.startswith("~$"))
+
+
+def load_operations_many(
+    source: Union[str, Path], max_workers: Optional[int] = None, cache_dir: Optional[Union[str, Path]] = None
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """Загружает несколько выгрузок параллельно в пуле процессов и объединяет их.
+
+    Все выгрузки должны иметь одинаковый набор колонок. Возвращает объединенный датафрейм
+    и отчет о загрузке: файл, число строк и время загрузки каждого файла."""
+    paths = find_operation_files(source)
+    if not paths:
+        logger.error("Выгрузки операций не найдены: %s", source)
+        raise FileNotFoundError(f"Выгрузки операций не найдены: {source}")
+
+    started = time.perf_counter()
+    if len(paths) == 1:
+        results = [_load_operations_timed(paths[0], cache_dir)]
+    else:
+        with futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_load_operations_timed, paths, repeat(cache_dir)))
+
+    columns = list(results[0][0].columns)
+    report = []
+    for path, (df, seconds) in zip(paths, results):
+        if list(df.columns) != columns:
+            logger.error("Колонки выгрузки %s не совпадают с колонками %s", path, paths[0])
+            raise ValueError(f"Колонки выгрузки {path} не совпадают с колонками {paths[0]}")
+        report.append({"file": str(path), "rows": len(df), "seconds": round(seconds, 4)})
+        logger.info("Выгрузка %s загружена: %d строк за %.3f с", path, len(df), seconds)
+
+    df = pd.concat([df for df, _ in results], ignore_index=True)
+    logger.info("Загружено %d выгрузок, %d строк за %.3f с", len(paths), len(df), time.perf_counter() - started)
+    return df, report
+
+
+@timed("index")
+def index_by_date(df: pd.DataFrame) -> pd.DataFrame:
+    """Сортирует операции по разобранной дате и делает ее индексом.
+
+    Операции без даты оказываются в начале: их значение в индексе меньше любой даты,
+    поэтому в срезы по интервалу дат они никогда не попадают."""
+    df = df.sort_values(PARSED_DATE_COLUMN, kind="stable", na_position="first")
+    return df.set_index(PARSED_DATE_COLUMN)
+
+
+def is_date_indexed(df: pd.DataFrame) -> bool:
+    """Проверяет, что датафрейм отсортирован и проиндексирован функцией index_by_date."""
+    return isinstance(df.index, pd.DatetimeIndex) and df.index.name == PARSED_DATE_COLUMN
+
+
+def get_operation_dates(df: pd.DataFrame) -> pd.Series:
+    """Возвращает разобранные даты операций датафрейма в порядке его строк."""
+    if is_date_indexed(df):
+        return df.index.to_series(index=df.index)
+    return parse_date_column(df[DATE_COLUMN], DATE_FORMAT)
+
+
+@timed("filter")
+def date_slice(df: pd.DataFrame, start: Any, end: Any) -> pd.DataFrame:
+    """Возвращает операции с датой в интервале [start, end] включительно.
+
+    Для датафрейма из хранилища интервал находится двоичным поиском по индексу за O(log n),
+    для произвольного датафрейма даты разбираются один раз и фильтруются маской."""
+    if is_date_indexed(df):
+        positions = df.index.asi8
+        left = np.searchsorted(positions, pd.Timestamp(start).value, side="left")
+        right = np.searchsorted(positions, pd.Timestamp(end).value, side="right")
+        return df.iloc[left:right]
+    return df[get_operation_dates(df).between(start, end)]
+
+
+def _fingerprint_value(value: Any) -> str:
+    """Приводит значение ячейки к строке, не зависящей от типа столбца (1 и 1.0 совпадают)."""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return repr(float(value))
+    return repr(value)
+
+
+def row_fingerprints(df: pd.DataFrame) -> List[str]:
+    """Возвращает отпечатки строк выгрузки: sha1 от значений всех колонок, кроме разобранной даты."""
+    columns = sorted(column for column in df.columns if column != PARSED_DATE_COLUMN)
+    return [
+        hashlib.sha1("\x1f".join(map(_fingerprint_value, row)).encode("utf-8")).hexdigest()
+        for row in df[columns].itertuples(index=False, name=None)
+    ]
+
+
+def _take(counts: Counter[str], key: str) -> bool:
+    """Уменьшает счетчик key, если он положителен, и сообщает, удалось ли это."""
+    if counts[key] > 0:
+        counts[key] -= 1
+        return True
+    return False
+
+
+def _freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """Запрещает запись в массивы колонок датафрейма и возвращает его.
+
+    Поверхностные копии делят эти массивы с исходным датафреймом, поэтому попытка изменить
+    значение на месте завершается ValueError, а замена колонки целиком меняет только копию."""
+    for values in df._mgr.arrays:
+        # У массивов-расширений pandas (даты с зоной, категории) данные лежат в _ndarray
+        array = values if isinstance(values, np.ndarray) else getattr(values, "_ndarray", None)
+        if isinstance(array, np.ndarray):
+            array.flags.writeable = False
+    return df
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    """Считает память датафрейма вместе со строками, как memory_usage(deep=True).
+
+    memory_usage(deep=True) не умеет обходить объектные массивы только для чтения, поэтому размеры
+    объектов суммируются напрямую."""
+    total = int(df.index.memory_usage(deep=True))
+    for _, column in df.items():
+        total += int(column.memory_usage(index=False, deep=False))
+        if column.dtype == object:
+            total += sum(value.__sizeof__() for value in column.to_numpy())
+    return total
+
+
+class TransactionStore:
+    """Хранилище операций, общее для всего процесса.
+
+    Данные загружаются один раз и хранятся в одном типизированном датафрейме, отсортированном
+    по дате операции, вместе с посуточными сводами по картам и категориям. Наружу выдаются
+    поверхностные копии с массивами только для чтения: изменить значения хранилища через них нельзя."""
+
+    _instance: Optional["TransactionStore"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self, file_path: Union[str, Path] = default_file_path, cache_dir: Optional[Union[str, Path]] = None
+    ) -> None:
+        self.file_path: Optional[Path] = Path(file_path)
+        self.cache_dir = cache_dir
+        self._frame: Optional[pd.DataFrame] = None
+        self._rollups: Dict[str, DailyRollup] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+        self.load_report: List[Dict[str, Any]] = []
+        # Дописанные порции, еще не слитые с основным датафреймом
+        self._pending: List[pd.DataFrame] = []
+        # Отметка последней загруженной операции и число строк с каждым отпечатком на эту дату
+        self.high_water_mark: Optional[pd.Timestamp] = None
+        self._mark_fingerprints: Counter[str] = Counter()
+        # Разобранные колонки дат (кроме даты операции, которая хранится индексом)
+        self._parsed_dates: Dict[str, pd.Series] = {}
+
+    @classmethod
+    def instance(cls) -> "TransactionStore":
+        """Возвращает единственный экземпляр хранилища для процесса."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        """Проверяет, создан ли уже общий экземпляр хранилища (не загружая его)."""
+        return cls._instance is not None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TransactionStore":
+        """Создает хранилище из уже загруженной выгрузки (с колонкой разобранной даты)."""
+        store = cls()
+        store.file_path = None
+        store._set_frame(df)
+        return store
+
+    @classmethod
+    def from_files(
+        cls, source: Union[str, Path], max_workers: Optional[int] = None, cache_dir: Optional[Union[str, Path]] = None
+    ) -> "TransactionStore":
+        """Создает хранилище из всех выгрузок в директории или по glob-шаблону, загружая их параллельно.
+        Отчет о загрузке файлов сохраняется в атрибуте load_report."""
+        df, report = load_operations_many(source, max_workers, cache_dir)
+        store = cls.from_frame(df)
+        store.load_report = report
+        return store
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        """Сбрасывает экземпляр хранилища, следующий вызов instance() создаст новый."""
+        with cls._instance_lock:
+            cls._instance = None
+
+    @classmethod
+    def set_instance(cls, store: Optional["TransactionStore"]) -> Optional["TransactionStore"]:
+        """Делает store общим экземпляром хранилища и возвращает прежний экземпляр (или None)."""
+        with cls._instance_lock:
+            previous, cls._instance = cls._instance, store
+        return previous
+
+    def _set_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Запоминает загруженный датафрейм как единственное представление данных."""
+        frame = _freeze(index_by_date(df))
+        self._rollups = build_rollups(frame)
+        self._frame = frame
+        self._pending = []
+        self._parsed_dates = {}
+        self.high_water_mark = None
+        self._mark_fingerprints = Counter()
+        self._advance_mark(frame)
+        return frame
+
+    def _advance_mark(self, frame: pd.DataFrame) -> None:
+        """Сдвигает отметку на последнюю операцию проиндексированной порции frame."""
+        if frame.empty or pd.isna(frame.index[-1]):
+            return
+        last = frame.index[-1]
+        at_mark = frame.iloc[np.searchsorted(frame.index.asi8, last.value, side="left"):]
+        if last != self.high_water_mark:
+            self._mark_fingerprints = Counter()
+        self._mark_fingerprints.update(row_fingerprints(at_mark))
+        self.high_water_mark = last
+
+    def _consolidated(self) -> pd.DataFrame:
+        """Сливает дописанные порции с основным датафреймом и возвращает его."""
+        with self._lock:
+            if self._frame is None:
+                raise ValueError("Хранилище не содержит данных")
+            if self._pending:
+                # Порции не раньше отметки, поэтому после слияния порядок по дате сохраняется
+                self._frame = _freeze(pd.concat([self._frame, *self._pending]))
+                self._pending = []
+            return self._frame
+
+    def refresh(self, force: bool = False, incremental: bool = False) -> pd.DataFrame:
+        """Перечитывает данные, если исходный файл изменился (или всегда при force=True).
+        При incremental=True из измененного файла дописываются только новые операции (см. append)."""
+        with self._lock:
+            source = self.file_path
+            if source is None:
+                if self._frame is None:
+                    raise ValueError("Хранилище не связано с файлом и не содержит данных")
+                # Хранилище создано из датафрейма, перечитывать нечего
+                return self._consolidated()
+            stat = source.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if not force and self._frame is not None and signature == self._signature:
+                return self._consolidated()
+            if incremental and not force and self._frame is not None:
+                self.append(source)
+                self._signature = signature
+                return self._consolidated()
+            logger.info("Загрузка операций в хранилище из %s", source)
+            df = self._set_frame(load_operations(source, self.cache_dir))
+            self._signature = signature
+            return df
+
+    def append(self, source: Union[str, Path, pd.DataFrame]) -> int:
+        """Дописывает в хранилище новые операции из выгрузки (файла или датафрейма).
+
+        Новыми считаются операции позже отметки high_water_mark, а с датой, равной отметке, - строки
+        сверх уже загруженных с тем же отпечатком (одинаковые операции в одну секунду не схлопываются);
+        более ранние операции и операции без даты пропускаются.
+        В индекс дат и своды попадают только новые строки, история не пересортировывается и своды
+        не пересчитываются. Возвращает число добавленных операций."""
+        df = source if isinstance(source, pd.DataFrame) else load_operations(source, self.cache_dir)
+        with self._lock:
+            current = self._frame if self._frame is not None else self.refresh()
+            columns = list(current.columns)
+            if set(df.columns) - {PARSED_DATE_COLUMN} != set(columns):
+                logger.error("Колонки дописываемой выгрузки не совпадают с колонками хранилища")
+                raise ValueError("Колонки дописываемой выгрузки не совпадают с колонками хранилища")
+
+            dates = get_operation_dates(df) if PARSED_DATE_COLUMN not in df.columns else df[PARSED_DATE_COLUMN]
+            mark = self.high_water_mark
+            is_new = dates.notna() if mark is None else dates >= mark
+            delta = df.loc[is_new.to_numpy(), columns].assign(**{PARSED_DATE_COLUMN: dates[is_new.to_numpy()]})
+            if mark is not None:
+                # Строки с датой, равной отметке, сверяются по отпечаткам с учетом числа повторов:
+                # каждая уже загруженная строка погашает одну строку выгрузки с тем же отпечатком
+                at_mark = (delta[PARSED_DATE_COLUMN] == mark).to_numpy()
+                if at_mark.any():
+                    remaining = Counter(self._mark_fingerprints)
+                    seen = np.ones(len(delta), dtype=bool)
+                    seen[at_mark] = [_take(remaining, fp) for fp in row_fingerprints(delta[at_mark])]
+                    delta = delta[~(at_mark & seen)]
+
+            logger.info("Из %d операций выгрузки новых: %d", len(df), len(delta))
+            if delta.empty:
+                return 0
+            delta = index_by_date(delta)
+            self._rollups = extend_rollups(self._rollups, delta)
+            # Уже разобранные колонки дат дополняются датами только новых строк
+            self._parsed_dates = {
+                column: pd.concat([dates, parse_date_column(delta[column])])
+                for column, dates in self._parsed_dates.items()
+            }
+            self._pending.append(delta)
+            self._advance_mark(delta)
+            return len(delta)
+
+    def frame(self) -> pd.DataFrame:
+        """Возвращает операции в виде датафрейма только для чтения.
+
+        Запись значений на месте (iloc/loc) завершается ValueError, данные хранилища не меняются."""
+        df = self._consolidated() if self._frame is not None else self.refresh()
+        return df.copy(deep=False)
+
+    def dates(self, column: str = DATE_COLUMN) -> pd.Series:
+        """Возвращает разобранную колонку дат в порядке строк frame().
+
+        Каждая колонка разбирается по явному формату один раз и хранится в хранилище,
+        дата операции берется из индекса без разбора."""
+        df = self.frame()
+        if column == DATE_COLUMN:
+            return get_operation_dates(df)
+        with self._lock:
+            if column not in self._parsed_dates:
+                self._parsed_dates[column] = parse_date_column(df[column])
+            return self._parsed_dates[column]
+
+    def between(self, start: Any, end: Any) -> pd.DataFrame:
+        """Возвращает операции хранилища за интервал [start, end] двоичным поиском по дате."""
+        return date_slice(self.frame(), start, end)
+
+    def aggregate(self, name: str, start: Any, end: Any) -> pd.Series:
+        """Возвращает суммы свода name (card_spend, card_cashback, category_spend) за интервал [start, end]."""
+        if self._frame is None:
+            self.refresh()
+        if name not in self._rollups:
+            raise KeyError(f"Свод {name} недоступен для этих данных")
+        return self._rollups[name].total(start, end)
+
+    def card_spend(self, start: Any, end: Any) -> pd.Series:
+        """Расходы по каждой карте за интервал (отрицательные суммы платежей)."""
+        return self.aggregate("card_spend", start, end)
+
+    def category_spend(self, start: Any, end: Any) -> pd.Series:
+        """Траты по каждой категории за интервал."""
+        return self.aggregate("category_spend", start, end)
+
+    def memory_usage(self) -> int:
+        """Оценивает память хранилища в байтах: операции (вместе со строками) и массивы сводов."""
+        frame = self.frame()
+        with self._lock:
+            rollups = list(self._rollups.values())
+        return _frame_nbytes(frame) + sum(
+            values.nbytes for rollup in rollups for values in rollup.to_arrays().values()
+        )
+
+
+def get_store() -> TransactionStore:
+    """Возвращает общее для процесса хранилище операций."""
+    return TransactionStore.instance()
@@ -1,29 +1,42 @@
+from __future__ import annotations
+
 import datetime as dt
+import functools
 import logging
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
-
-import pandas as pd
-import requests
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 from src.config import DATA_DIR
+from src.dates import DATE_COLUMN, parse_date
+from src.lazy import lazy_import
+from src.logging_setup import setup_logging
+from src.market_data import fetch_concurrently, get_executor, http_get, quote_cache
+from src.metrics import timed
+from src.records import TransactionBatch
+from src.snapshot import get_snapshot
+from src.store import PARSED_DATE_COLUMN, date_slice, get_operation_dates, load_operations
+
+if TYPE_CHECKING:
+    import dotenv
+    import numpy as np
+    import pandas as pd
+    import requests
+else:
+    dotenv = lazy_import("dotenv")
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+    requests = lazy_import("requests")
 
-load_dotenv("..\\.env")
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 file_path = DATA_DIR / "operations.xlsx"
 
-log_directory = "../logs"
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
+# Адреса API котировок по умолчанию (переопределяются переменными окружения FX_API_URL и STOCK_API_URL)
+FX_API_URL = "https://openexchangerates.org/api/latest.json"
+STOCK_API_URL = "https://www.alphavantage.co/query"
 
 logger = logging.getLogger(__name__)
-file_handler = logging.FileHandler(os.path.join(log_directory, "utils.log"), encoding="utf-8")
-logging.basicConfig(
-    level=logging.DEBUG, format="%(asctime)s - %(filename)s - %(levelname)s - %(message)s", handlers=[file_handler]
-)
 
 
 def greeting_by_time_of_day() -> str:
@@ -41,25 +54,52 @@ def greeting_by_time_of_day() -> str:
 
 def get_data(data: str) -> Tuple[datetime, datetime]:
     """Функция преобразования даты"""
-    logger.info(f"Получена строка даты: {data}")
+    logger.info("Получена строка даты: %s", data)
     try:
-        data_obj = datetime.strptime(data, "%d.%m.%Y %H:%M:%S")
-        logger.info(f"Преобразована в объект datetime: {data_obj}")
+        data_obj = parse_date(data)
+        logger.info("Преобразована в объект datetime: %s", data_obj)
         start_date = data_obj.replace(day=1, hour=0, minute=0, second=0)
         fin_date = data_obj
         return start_date, fin_date
     except ValueError as e:
-        logger.error(f"Ошибка преобразования даты: {e}")
+        logger.error("Ошибка преобразования даты: %s", e)
         raise e
 
 
-def top_transaction(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
-    """Функция вывода топ 5 транзакций по сумме платежа."""
+def _top_batch_transactions(batch: TransactionBatch) -> List[Dict[str, Any]]:
+    """Топ 5 транзакций по сумме платежа из колоночного набора (например, окна снимка операций)."""
+    valid = np.flatnonzero(~np.isnat(batch.columns["date"]))
+    order = valid[np.argsort(batch.columns["payment_amount"][valid], kind="stable")[:5]]
+    top = batch.select(order)
+    missing = np.full(len(top), np.nan)
+    categories = top.column("category") if "category" in top.columns else missing
+    descriptions = top.column("description") if "description" in top.columns else missing
+    return [
+        {
+            "date": pd.Timestamp(date).strftime("%d.%m.%Y"),
+            "amount": float(amount),
+            "category": category,
+            "description": description,
+        }
+        for date, amount, category, description in zip(
+            top.columns["date"], top.columns["payment_amount"], categories, descriptions
+        )
+    ]
+
+
+@timed("aggregate")
+def top_transaction(df_transactions: Union[pd.DataFrame, TransactionBatch]) -> List[Dict[str, Any]]:
+    """Функция вывода топ 5 транзакций по сумме платежа.
+    Принимает датафрейм операций или колоночный набор TransactionBatch."""
     logger.info("Начало работы функции top_transaction")
 
-    # Убедитесь, что столбец "Дата операции" преобразован в datetime
-    df_transactions.loc[:, 'Дата операции'] = pd.to_datetime(df_transactions['Дата операции'], dayfirst=True,
-                                                             errors='coerce')
+    if isinstance(df_transactions, TransactionBatch):
+        top_transaction_list = _top_batch_transactions(df_transactions)
+        logger.info("Сформирован список топ 5 транзакций")
+        return top_transaction_list
+
+    # Даты берутся из индекса хранилища или разбираются по явному формату (без изменения переданного датафрейма)
+    df_transactions = df_transactions.assign(**{DATE_COLUMN: get_operation_dates(df_transactions).to_numpy()})
 
     # Удаляем транзакции с некорректными датами
     df_transactions = df_transactions.dropna(subset=["Дата операции"])
@@ -82,28 +122,29 @@ def top_transaction(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
                 }
             )
         else:
-            logger.warning(f"Неверный формат даты: {transaction['Дата операции']}")
+            logger.warning("Неверный формат даты: %s", transaction["Дата операции"])
 
     logger.info("Сформирован список топ 5 транзакций")
 
     return top_transaction_list
 
 
-def get_expenses_cards(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
-    """Функция, возвращающая расходы по каждой карте"""
+@timed("aggregate")
+def get_expenses_cards(df_transactions: Union[pd.DataFrame, pd.Series]) -> List[Dict[str, Any]]:
+    """Функция, возвращающая расходы по каждой карте.
+    Принимает операции или уже посчитанные суммы расходов по картам (например, из свода хранилища)."""
     logger.info("Начало выполнения функции get_expenses_cards")
 
-    # Фильтруем расходы только на платежи
-    filtered_expenses = df_transactions[df_transactions["Сумма платежа"] < 0]
+    if isinstance(df_transactions, pd.Series):
+        # Суммы уже посчитаны, карты без расходов за период пропускаем
+        cards_dict = df_transactions[df_transactions != 0].to_dict()
+    else:
+        # Фильтруем расходы только на платежи
+        filtered_expenses = df_transactions[df_transactions["Сумма платежа"] < 0]
 
-    # Группировка и суммирование расходов
-    cards_dict = (
-        filtered_expenses.loc[filtered_expenses["Сумма платежа"] < 0]
-        .groupby(by="Номер карты")["Сумма платежа"]
-        .sum()
-        .to_dict()
-    )
-    logger.debug(f"Получен словарь расходов по картам: {cards_dict}")
+        # Группировка и суммирование расходов
+        cards_dict = filtered_expenses.groupby(by="Номер карты")["Сумма платежа"].sum().to_dict()
+    logger.debug("Получен словарь расходов по картам: %s", cards_dict)
 
     expenses_cards = []
     for card, expenses in cards_dict.items():
@@ -114,11 +155,11 @@ def get_expenses_cards(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
                 "cashback": round(abs(expenses) * 0.01, 2),  # Расчет кэшбэка
             }
         )
-        logger.info(f"Добавлен расход по карте {card}: {abs(expenses)}")
+        logger.debug("Добавлен расход по карте %s: %s", card, abs(expenses))
 
     # Добавлено: Проверка на уникальность карт
     unique_cards = {card[-4:] for card in cards_dict.keys()}
-    logger.info(f"Уникальные карты: {unique_cards}")
+    logger.info("Уникальные карты: %s", unique_cards)
 
     # Обновлено: Возвращаем только уникальные карты
     expenses_cards = [card for card in expenses_cards if card["last_digits"] in unique_cards]
@@ -130,21 +171,26 @@ def get_expenses_cards(df_transactions: pd.DataFrame) -> List[Dict[str, Any]]:
 def get_dict_transaction(file_path: str) -> list[dict]:
     """Функция преобразовывающая датафрейм в словарь Python"""
     if not os.path.isfile(file_path):
-        logger.error(f"Файл не найден: {file_path}")
+        logger.error("Файл не найден: %s", file_path)
         raise FileNotFoundError(f"Файл не найден: {file_path}")
-    logger.info(f"Вызвана функция get_dict_transaction с файлом {file_path}")
+    logger.info("Вызвана функция get_dict_transaction с файлом %s", file_path)
     try:
-        df = pd.read_excel(file_path)
-        logger.info(f"Файл {file_path} прочитан")
-        dict_transaction = df.to_dict(orient="records")
+        # Если снимки включены, операции читаются из снимка на диске без разбора выгрузки
+        snapshot = get_snapshot(file_path)
+        if snapshot is not None:
+            return snapshot.to_dicts()
+        df = load_operations(file_path)
+        logger.info("Файл %s прочитан", file_path)
+        dict_transaction = df.drop(columns=PARSED_DATE_COLUMN).to_dict(orient="records")
         logger.info("Датафрейм преобразован в список словарей")
         return dict_transaction
     except Exception as e:
-        logger.error(f"Произошла ошибка: {str(e)}")
+        logger.error("Произошла ошибка: %s", e)
         raise
 
 
 if __name__ == "__main__":
+    setup_logging()
     try:
         dict_transaction = get_dict_transaction(str(file_path))
         print(dict_transaction)
@@ -154,37 +200,59 @@ if __name__ == "__main__":
 
 def transaction_currency(df_transactions: pd.DataFrame, data: str) -> pd.DataFrame:
     """Функция, формирующая расходы в заданном интервале"""
-    logger.info(f"Вызвана функция transaction_currency с аргументами: data={data}")
+    logger.info("Вызвана функция transaction_currency с аргументами: data=%s", data)
     start_date, fin_date = get_data(data)  # Распаковка значений
-    logger.debug(f"Получены начальная дата: {start_date}, конечная дата: {fin_date}")
+    logger.debug("Получены начальная дата: %s, конечная дата: %s", start_date, fin_date)
 
-    transaction_currency = df_transactions.loc[
-        (pd.to_datetime(df_transactions["Дата операции"], dayfirst=True) <= fin_date)
-        & (pd.to_datetime(df_transactions["Дата операции"], dayfirst=True) >= start_date)
-    ]
-    logger.info(f"Получен DataFrame transaction_currency: {transaction_currency}")
+    transaction_currency = date_slice(df_transactions, start_date, fin_date)
+    logger.info("Получено операций за период: %d", len(transaction_currency))
 
     return transaction_currency if not transaction_currency.empty else pd.DataFrame(columns=df_transactions.columns)
 
 
 def reader_transaction_excel(file_path: str) -> pd.DataFrame:
     """Функция принимает на вход путь до файла и возвращает датафрейм"""
-    logger.info(f"Вызвана функция получения транзакций из файла {file_path}")
+    logger.info("Вызвана функция получения транзакций из файла %s", file_path)
     try:
-        df_transactions = pd.read_excel(file_path)
-        logger.info(f"Файл {file_path} найден, данные о транзакциях получены")
+        df_transactions = load_operations(file_path)
+        logger.info("Файл %s найден, данные о транзакциях получены", file_path)
 
         return df_transactions
     except FileNotFoundError:
-        logger.info(f"Файл {file_path} не найден")
+        logger.info("Файл %s не найден", file_path)
         raise FileNotFoundError("Файл не найден") from None  # Переподнятие с новым сообщением
 
 
+@functools.lru_cache(maxsize=1)
+def load_env() -> None:
+    """Загружает переменные окружения (API-ключи) из файла .env в корне проекта.
+    Файл читается один раз, при первом обращении к API котировок, а не при импорте модуля."""
+    dotenv.load_dotenv(PROJECT_ROOT / ".env")
+
+
+def _fetch_currency_snapshot() -> Optional[dict]:
+    """Запрашивает курсы всех валют относительно USD, при ошибке возвращает None."""
+    api_key = os.environ.get("API_KEY")
+    url = os.environ.get("FX_API_URL", FX_API_URL)
+    try:
+        response = http_get(f"{url}?app_id={api_key}&base=USD")
+    except requests.RequestException as e:
+        logger.error("Ошибка при запросе курсов валют: %s", e)
+        return None
+    # Проверка успешности запроса
+    if response.status_code != 200:
+        logger.error("Ошибка при получении данных с API: %s", response.text)
+        return None
+    snapshot: dict = response.json()
+    return snapshot
+
+
 def get_currency_rates(user_currencies: list) -> list:
-    """Возвращает курсы валют относительно RUB."""
+    """Возвращает курсы валют относительно RUB. Курсы берутся из кэша котировок."""
     logger.info("Поиск курсов валют")
 
     result_currencies: list[Any] = []
+    load_env()
     api_key = os.environ.get("API_KEY")  # Получите ваш API ключ из переменных окружения
 
     # Проверка наличия API ключа
@@ -192,19 +260,11 @@ def get_currency_rates(user_currencies: list) -> list:
         logger.error("API ключ отсутствует. Убедитесь, что он установлен в переменных окружения.")
         return []
 
-    # Получаем курс всех валют относительно USD
-
-    response = requests.get(
-        f"https://openexchangerates.org/api/latest.json?app_id={api_key}&base=USD"
-    )
-    # Проверка успешности запроса
-    if response.status_code != 200:
-        logger.error("Ошибка при получении данных с API: %s", response.text)
+    # Получаем курс всех валют относительно USD (одним снимком для всех валют)
+    data = quote_cache.get("fx", "USD", _fetch_currency_snapshot)
+    if data is None:
         return []
 
-    # Извлечение данных из ответа
-    data = response.json()
-
     # Получаем курс USD к RUB
     rub_to_usd = data['rates'].get("RUB")
 
@@ -228,28 +288,50 @@ def get_currency_rates(user_currencies: list) -> list:
     return result_currencies
 
 
-def get_stock_price(user_stocks: list) -> list[dict]:
-    """Функция, возвращающая курсы акций"""
-    logger.info("Вызвана функция возвращающая курсы акций")
-
+def _fetch_stock_price(stock: str) -> Optional[dict]:
+    """Запрашивает цену одной акции, при ошибке возвращает None."""
+    load_env()
     api_key_stock = os.environ.get("API_KEY_STOCK")
-    stock_price = []
+    base_url = os.environ.get("STOCK_API_URL", STOCK_API_URL)
+    url = f"{base_url}?function=GLOBAL_QUOTE&symbol={stock}&apikey={api_key_stock}"
+    try:
+        response = http_get(url)
+    except requests.RequestException as e:
+        logger.error("Ошибка при запросе цены акции %s: %s", stock, e)
+        return None
 
-    for stock in user_stocks:
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={stock}&apikey={api_key_stock}"
-        response = requests.get(url)
+    if response.status_code != 200:
+        logger.error("Запрос не был успешным. Возможная причина: %s", response.reason)
+        return None  # Пропускаем неуспешные запросы
 
-        if response.status_code != 200:
-            logger.error(f"Запрос не был успешным. Возможная причина: {response.reason}")
-            continue  # Пропускаем неуспешные запросы
+    data_ = response.json()
+    if "Global Quote" not in data_ or not data_["Global Quote"]:
+        logger.error("Нет данных о цене для акции %s. Ответ: %s", stock, data_)
+        return None  # Пропускаем акции без данных
 
-        data_ = response.json()
-        if "Global Quote" not in data_ or not data_["Global Quote"]:
-            logger.error(f"Нет данных о цене для акции {stock}. Ответ: {data_}")
-            continue  # Пропускаем акции без данных
+    price = round(float(data_["Global Quote"]["05. price"]), 2)
+    return {"stock": stock, "price": price}
 
-        price = round(float(data_["Global Quote"]["05. price"]), 2)
-        stock_price.append({"stock": stock, "price": price})
+
+def _cached_stock_price(stock: str) -> Optional[dict]:
+    """Возвращает цену акции из кэша котировок."""
+    price: Optional[dict] = quote_cache.get("stock", stock, lambda: _fetch_stock_price(stock))
+    return price
+
+
+def get_stock_price(user_stocks: list) -> list[dict]:
+    """Функция, возвращающая курсы акций. Котировки берутся из кэша, недостающие запрашиваются параллельно."""
+    logger.info("Вызвана функция возвращающая курсы акций")
+
+    stock_price = [price for price in fetch_concurrently(_cached_stock_price, user_stocks) if price is not None]
 
     logger.info("Функция завершила свою работу")
     return stock_price
+
+
+def get_market_data(user_currencies: list, user_stocks: list) -> Tuple[list, list[dict]]:
+    """Параллельно получает курсы валют и цены акций.
+    Общее время ограничено самым медленным запросом, а не суммой всех запросов."""
+    currency_future = get_executor().submit(get_currency_rates, user_currencies)
+    stock_price = get_stock_price(user_stocks)
+    return currency_future.result(), stock_price
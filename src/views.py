@@ -1,101 +1,289 @@
-import json
+from __future__ import annotations
+
 import logging
-import os
 from datetime import datetime
-from typing import Any, Dict, Union
-
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
-from src.config import file_path, load_user_currencies, load_user_stocks
-from src.utils import get_currency_rates, get_expenses_cards, get_stock_price, greeting_by_time_of_day, top_transaction
+from src.config import SETTINGS_FIELDS, load_user_currencies, load_user_stocks, user_settings
+from src.dates import PARAM_DATE_FORMAT, parse_date
+from src.lazy import lazy_import
+from src.logging_setup import setup_logging
+from src.metrics import measure_stage
+from src.partitions import get_partitions
+from src.serialization import as_payload, dumps_str, to_payload
+from src.snapshot import Snapshot, get_snapshot
+from src.store import TransactionStore, date_slice, get_store
+from src.utils import get_expenses_cards, get_market_data, greeting_by_time_of_day, top_transaction
 
-# Настройка логирования
-log_directory = "../logs"
+if TYPE_CHECKING:
+    import asyncio
 
-# Проверка на существование директории для логов
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
+    import pandas as pd
+else:
+    asyncio = lazy_import("asyncio")
+    pd = lazy_import("pandas")
 
-logger = logging.getLogger("logs")
-logger.setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
-# Проверка на наличие обработчиков, чтобы избежать дублирования
-if not logger.hasHandlers():
-    file_handler = logging.FileHandler(os.path.join(log_directory, "views.log"), encoding="utf-8")
-    file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s: %(message)s")
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-
-
-def form_main_page_info(some_param: Union[str, dict], return_json: bool = False) -> Union[str, Dict[str, Any]]:
-    """Принимает дату в формате строки YYYY-MM-DD HH:MM:SS и возвращает общую информацию в формате
-    json о банковских транзакциях за период с начала месяца до этой даты"""
-    logger.info(f"Запуск функции main с параметром: {some_param}")
-
-    currencies = load_user_currencies()  # Загружаем валюты
-    stocks = load_user_stocks()  # Загружаем акции
-    date_obj = None
 
+def _parse_date_param(some_param: Union[str, dict]) -> Union[datetime, str]:
+    """Разбирает дату из строки или JSON-объекта. При ошибке возвращает JSON с описанием ошибки."""
     # Проверка типа входного аргумента
     if isinstance(some_param, str):
         # Обработка строки
-        try:
-            date_obj = datetime.strptime(some_param, "%Y-%m-%d %H:%M:%S")
-        except ValueError as e:
-            logger.error(f"Ошибка преобразования даты: {e}")
-            return json.dumps({"error": "Некорректный формат даты."}, ensure_ascii=False)
+        date_str = some_param
     elif isinstance(some_param, dict) and 'date' in some_param:
         # Обработка JSON объекта
-        try:
-            date_obj = datetime.strptime(some_param['date'], "%Y-%m-%d %H:%M:%S")
-        except ValueError as e:
-            logger.error(f"Ошибка преобразования даты: {e}")
-            return json.dumps({"error": "Некорректный формат даты."}, ensure_ascii=False)
+        date_str = some_param['date']
     else:
-        return json.dumps({"error": "Некорректный тип параметра. Ожидается строка или JSON."}, ensure_ascii=False)
+        return dumps_str({"error": "Некорректный тип параметра. Ожидается строка или JSON."})
 
     try:
-        data = pd.read_excel(file_path)
-        # Преобразование DataFrame
-        data_df = pd.DataFrame(data)
-        logger.info(f"Исходный DataFrame: {data_df}")  # контроль
-        data_df["datetime"] = pd.to_datetime(
-            data_df["Дата операции"], format="%d.%m.%Y %H:%M:%S", dayfirst=True, errors="coerce"
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при чтении файла: {e}")
-        return json.dumps({"error": "Не удалось прочитать данные."}, ensure_ascii=False)
+        return parse_date(date_str, PARAM_DATE_FORMAT)
+    except ValueError as e:
+        logger.error("Ошибка преобразования даты: %s", e)
+        return dumps_str({"error": "Некорректный формат даты."})
+
+
+def _get_user_market_data(profile: Optional[str] = None) -> Tuple[list, list]:
+    """Загружает настройки пользователя (профиль profile) и получает курсы его валют и цены его акций."""
+    currencies = load_user_currencies(profile)  # Загружаем валюты
+    stocks = load_user_stocks(profile)  # Загружаем акции
+    # Курсы валют и цены акций запрашиваются параллельно
+    return get_market_data(currencies, stocks)
+
+
+def _profile_error(profile: Optional[str]) -> Optional[str]:
+    """Проверяет, что профиль настроек есть в user_settings.json. Иначе возвращает JSON с ошибкой."""
+    if profile is None or profile in user_settings.profiles():
+        return None
+    logger.error("Профиль настроек не найден: %s", profile)
+    return dumps_str({"error": "Профиль настроек не найден."})
 
+
+def _period_info(
+    store: Union[TransactionStore, Snapshot], data_df: Optional[pd.DataFrame], date_obj: datetime
+) -> Dict[str, Any]:
+    """Считает карты и топ транзакций за период с начала месяца до date_obj.
+    Без датафрейма (data_df=None) операции за период берутся из снимка store."""
     # Определяем диапазон дат
     start_date = date_obj.replace(day=1, hour=0, minute=0, second=0)
     fin_date = date_obj
-    logger.debug(f"Диапазон дат: с {start_date} по {fin_date}")  # контроль
+    logger.debug("Диапазон дат: с %s по %s", start_date, fin_date)  # контроль
+
+    json_data = store.between(start_date, fin_date) if data_df is None else date_slice(data_df, start_date, fin_date)
+    empty = len(json_data) == 0
+    logger.info("Количество транзакций за период: %d", len(json_data))
+
+    return {
+        # Расходы по картам считаются по посуточному своду хранилища, а не группировкой строк
+        "cards": get_expenses_cards(store.card_spend(start_date, fin_date)) if not empty else [],
+        "top_transactions": top_transaction(json_data) if not empty else [],
+        "empty": empty,
+    }
 
-    json_data = data_df[data_df["datetime"].between(start_date, fin_date)]
-    logger.info(f"Количество транзакций за период: {len(json_data)}")
+
+def _collect_transactions_info(date_obj: datetime, user: Optional[str] = None) -> Union[Dict[str, Any], str]:
+    """Собирает данные главной страницы по операциям с начала месяца до date_obj.
+    Для пользователя user операции берутся только из его раздела хранилища (см. src.partitions).
+    При ошибке чтения данных возвращает JSON с описанием ошибки."""
+    if user is not None:
+        try:
+            store = get_partitions().get(user)
+            data_df = store.frame()
+        except KeyError:
+            logger.error("Раздел пользователя не найден: %s", user)
+            return dumps_str({"error": "Пользователь не найден."})
+        except Exception as e:
+            logger.error("Ошибка при чтении раздела пользователя %s: %s", user, e)
+            return dumps_str({"error": "Не удалось прочитать данные."})
+        return {"greeting": greeting_by_time_of_day(), **_period_info(store, data_df, date_obj)}
+
+    try:
+        # Пока общее хранилище не загружено, операции берутся из снимка на диске (если снимки включены)
+        snapshot = get_snapshot() if not TransactionStore.is_loaded() else None
+        if snapshot is not None:
+            return {"greeting": greeting_by_time_of_day(), **_period_info(snapshot, None, date_obj)}
+        # Операции берутся из общего хранилища, даты в нем уже разобраны
+        store = get_store()
+        data_df = store.frame()
+        logger.debug("Операций в хранилище: %d", len(data_df))  # контроль
+    except Exception as e:
+        logger.error("Ошибка при чтении файла: %s", e)
+        return dumps_str({"error": "Не удалось прочитать данные."})
 
     # Получаем приветствие
-    greeting = greeting_by_time_of_day()
+    return {"greeting": greeting_by_time_of_day(), **_period_info(store, data_df, date_obj)}
 
-    # Формируем итоговый словарь
+
+def _build_page(
+    transactions_info: Dict[str, Any],
+    currency_rates: list,
+    stock_prices: list,
+    return_json: bool,
+    as_bytes: bool = False,
+) -> Union[str, bytes, Dict[str, Any]]:
+    """Формирует итоговый словарь главной страницы (или его JSON строкой либо байтами)."""
     agg_dict = {
-        "greeting": greeting,
-        "cards": get_expenses_cards(json_data) if not json_data.empty else [],
-        "top_transactions": top_transaction(json_data) if not json_data.empty else [],
-        "currency_rates": get_currency_rates(currencies),
-        "stock_prices": get_stock_price(stocks),
+        "greeting": transactions_info["greeting"],
+        "cards": transactions_info["cards"],
+        "top_transactions": transactions_info["top_transactions"],
+        "currency_rates": currency_rates,
+        "stock_prices": stock_prices,
     }
-    logger.info(f"Filtered transactions: {json_data}")
-    logger.info(f"Agg dict before serialization: {agg_dict}")
+    logger.debug("Данные главной страницы: %s", agg_dict)
 
     # Если нет транзакций, добавляем сообщение об ошибке
-    if json_data.empty:
+    if transactions_info["empty"]:
         logger.warning("Нет транзакций за указанный период.")
         agg_dict["error"] = "Нет транзакций за указанный период."
 
-    return json.dumps(agg_dict, ensure_ascii=False, indent=2) if return_json else agg_dict
+    if not return_json and not as_bytes:
+        return agg_dict
+    with measure_stage("serialize", "form_main_page_info"):
+        return to_payload(agg_dict, as_bytes)
+
+
+def form_main_page_info(
+    some_param: Union[str, dict],
+    return_json: bool = False,
+    as_bytes: bool = False,
+    profile: Optional[str] = None,
+    user: Optional[str] = None,
+) -> Union[str, bytes, Dict[str, Any]]:
+    """Принимает дату в формате строки YYYY-MM-DD HH:MM:SS и возвращает общую информацию в формате
+    json о банковских транзакциях за период с начала месяца до этой даты.
+    При as_bytes=True JSON возвращается байтами (UTF-8), без промежуточной строки.
+    Валюты и акции берутся из профиля настроек profile (по умолчанию - настройки верхнего уровня),
+    операции - из раздела хранилища пользователя user (по умолчанию - из общего хранилища)."""
+    logger.info("Запуск функции main с параметром: %s", some_param)
+
+    date_obj = _parse_date_param(some_param)
+    if isinstance(date_obj, str):
+        return as_payload(date_obj, as_bytes)
+    profile_error = _profile_error(profile)
+    if profile_error is not None:
+        return as_payload(profile_error, as_bytes)
+
+    transactions_info = _collect_transactions_info(date_obj, user)
+    if isinstance(transactions_info, str):
+        return as_payload(transactions_info, as_bytes)
+
+    currency_rates, stock_prices = _get_user_market_data(profile)
+    return _build_page(transactions_info, currency_rates, stock_prices, return_json, as_bytes)
+
+
+async def form_main_page_info_async(
+    some_param: Union[str, dict],
+    return_json: bool = False,
+    as_bytes: bool = False,
+    profile: Optional[str] = None,
+    user: Optional[str] = None,
+) -> Union[str, bytes, Dict[str, Any]]:
+    """Асинхронный вариант form_main_page_info для вызова из asyncio-сервера.
+
+    Обработка операций и запросы котировок выполняются одновременно в отдельных потоках,
+    поэтому цикл событий не блокируется. Результат совпадает с form_main_page_info."""
+    logger.info("Запуск асинхронной функции main с параметром: %s", some_param)
+
+    date_obj = _parse_date_param(some_param)
+    if isinstance(date_obj, str):
+        return as_payload(date_obj, as_bytes)
+    profile_error = _profile_error(profile)
+    if profile_error is not None:
+        return as_payload(profile_error, as_bytes)
+
+    transactions_info, (currency_rates, stock_prices) = await asyncio.gather(
+        asyncio.to_thread(_collect_transactions_info, date_obj, user),
+        asyncio.to_thread(_get_user_market_data, profile),
+    )
+    if isinstance(transactions_info, str):
+        return as_payload(transactions_info, as_bytes)
+
+    return _build_page(transactions_info, currency_rates, stock_prices, return_json, as_bytes)
+
+
+def _select_market_data(
+    currency_rates: list, stock_prices: list, currencies: List[str], stocks: List[str]
+) -> Tuple[list, list]:
+    """Отбирает из общих котировок курсы и цены, нужные одному профилю настроек."""
+    # Курс USD к RUB возвращается всегда, как и в get_currency_rates
+    profile_rates = [rate for rate in currency_rates if rate["currency"] == "USD" or rate["currency"] in currencies]
+    prices = {price["stock"]: price for price in stock_prices}
+    profile_prices = [prices[stock] for stock in stocks if stock in prices]
+    return profile_rates, profile_prices
+
+
+def form_main_page_info_batch(
+    dates: List[Union[str, dict]],
+    profiles: Union[Dict[str, Dict[str, List[str]]], List[str], None] = None,
+    return_json: bool = False,
+) -> Union[List[Any], Dict[str, List[Any]], str]:
+    """Формирует данные главной страницы сразу для нескольких дат (и профилей настроек).
+
+    Операции загружаются и котировки запрашиваются один раз на весь пакет, а каждый период
+    с начала месяца вычисляется по общему отсортированному индексу дат. Профиль задается словарем
+    с ключами user_currencies и user_stocks, профили можно передать и списком имен профилей
+    из user_settings.json. Без профилей возвращается список результатов по датам
+    для настроек из user_settings.json, с профилями - словарь таких списков по имени профиля.
+    Для некорректной даты на ее месте возвращается JSON с ошибкой, как в form_main_page_info,
+    для неизвестного имени профиля или профиля-словаря без обязательных ключей - JSON с ошибкой вместо результата."""
+    logger.info("Запуск пакетного формирования главной страницы для %d дат", len(dates))
+
+    if profiles is None:
+        selected_profiles = {"default": {"user_currencies": load_user_currencies(), "user_stocks": load_user_stocks()}}
+    elif isinstance(profiles, dict):
+        invalid = [
+            name
+            for name, profile in profiles.items()
+            if not isinstance(profile, dict) or any(field not in profile for field in SETTINGS_FIELDS)
+        ]
+        if invalid:
+            logger.error("Профили настроек без user_currencies или user_stocks: %s", invalid)
+            return dumps_str({"error": "Некорректный профиль настроек."})
+        selected_profiles = profiles
+    else:
+        unknown = [name for name in profiles if name not in user_settings.profiles()]
+        if unknown:
+            logger.error("Профили настроек не найдены: %s", unknown)
+            return dumps_str({"error": "Профиль настроек не найден."})
+        selected_profiles = {name: user_settings.profile(name) for name in profiles}
+
+    try:
+        store = get_store()
+        data_df = store.frame()
+    except Exception as e:
+        logger.error("Ошибка при чтении файла: %s", e)
+        return dumps_str({"error": "Не удалось прочитать данные."})
+
+    # Котировки запрашиваются один раз для объединения валют и акций всех профилей
+    all_currencies = sorted({item for profile in selected_profiles.values() for item in profile["user_currencies"]})
+    all_stocks = sorted({item for profile in selected_profiles.values() for item in profile["user_stocks"]})
+    currency_rates, stock_prices = get_market_data(all_currencies, all_stocks)
+
+    greeting = greeting_by_time_of_day()
+    periods: List[Union[Dict[str, Any], str]] = []
+    for some_param in dates:
+        date_obj = _parse_date_param(some_param)
+        if isinstance(date_obj, str):
+            periods.append(date_obj)
+        else:
+            periods.append({"greeting": greeting, **_period_info(store, data_df, date_obj)})
+
+    results: Dict[str, List[Any]] = {}
+    for name, profile in selected_profiles.items():
+        profile_rates, profile_prices = _select_market_data(
+            currency_rates, stock_prices, profile["user_currencies"], profile["user_stocks"]
+        )
+        results[name] = [
+            period if isinstance(period, str) else _build_page(period, profile_rates, profile_prices, return_json)
+            for period in periods
+        ]
+
+    return results["default"] if profiles is None else results
 
 
 if __name__ == "__main__":
+    setup_logging()
     result_json = form_main_page_info('2021-12-17 14:52:09', return_json=True)
     print(result_json)
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from src.aggregates import DailyRollup, build_rollups
+from src.store import index_by_date, parse_operations
+
+
+@pytest.fixture
+def operations() -> pd.DataFrame:
+    return index_by_date(
+        parse_operations(
+            pd.DataFrame(
+                {
+                    "Дата операции": [
+                        "01.12.2021 09:00:00",
+                        "01.12.2021 18:00:00",
+                        "05.12.2021 12:00:00",
+                        "10.12.2021 23:59:59",
+                        "11.12.2021 00:00:00",
+                    ],
+                    "Номер карты": ["*1111", "*2222", "*1111", None, "*2222"],
+                    "Сумма платежа": [-100.0, -50.0, -10.0, -7.0, 200.0],
+                    "Кэшбэк": [1.0, None, 0.5, None, None],
+                    "Категория": ["Еда", "Еда", "Такси", "Еда", "Пополнения"],
+                    "Сумма операции с округлением": [100.0, 50.0, 10.0, 7.0, 200.0],
+                }
+            )
+        )
+    )
+
+
+def test_daily_rollup_full_and_partial_days(operations: pd.DataFrame) -> None:
+    rollup = DailyRollup(operations.index, operations["Номер карты"], operations["Сумма платежа"])
+    totals = rollup.total(pd.Timestamp("2021-12-01 12:00:00"), pd.Timestamp("2021-12-11 00:00:00"))
+    assert totals.to_dict() == {"*1111": -10.0, "*2222": 150.0}
+
+    totals = rollup.total(pd.Timestamp("2021-12-01"), pd.Timestamp("2021-12-31"))
+    assert totals.to_dict() == {"*1111": -110.0, "*2222": 150.0}
+
+    assert rollup.total(pd.Timestamp("2022-01-01"), pd.Timestamp("2022-02-01")).sum() == 0
+
+
+def test_build_rollups(operations: pd.DataFrame) -> None:
+    rollups = build_rollups(operations)
+    period = (pd.Timestamp("2021-12-01"), pd.Timestamp("2021-12-10 23:59:59"))
+
+    assert rollups["card_spend"].total(*period).to_dict() == {"*1111": -110.0, "*2222": -50.0}
+    assert rollups["card_cashback"].total(*period).to_dict() == {"*1111": 1.5}
+    category_spend = rollups["category_spend"].total(*period)
+    assert category_spend["Еда"] == 157.0
+    assert category_spend["Пополнения"] == 0
+
+
+def test_daily_rollup_appended_matches_full_build(operations: pd.DataFrame) -> None:
+    head, tail = operations.iloc[:2], operations.iloc[2:]
+    full = DailyRollup(operations.index, operations["Номер карты"], operations["Сумма платежа"])
+    rollup = DailyRollup(head.index, head["Номер карты"], head["Сумма платежа"])
+    rollup = rollup.appended(tail.index, tail["Номер карты"], tail["Сумма платежа"])
+    for start, end in [("2021-12-01", "2021-12-31"), ("2021-12-01 12:00:00", "2021-12-10 23:59:59")]:
+        assert rollup.total(start, end).to_dict() == full.total(start, end).to_dict()
+
+    # Новый ключ появляется в своде, операции раньше уже учтенных не принимаются
+    new = index_by_date(parse_operations(pd.DataFrame({"Дата операции": ["12.12.2021 10:00:00"]})))
+    extended = rollup.appended(new.index, pd.Series(["*0000"]), pd.Series([-3.0]))
+    assert list(extended.total("2021-12-01", "2021-12-31").index) == ["*0000", "*1111", "*2222"]
+    with pytest.raises(ValueError):
+        extended.appended(head.index, head["Номер карты"], head["Сумма платежа"])
@@ -0,0 +1,70 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+import src.utils
+from benchmarks.generator import generate_operations
+from benchmarks.imports import DEFAULT_BUDGET
+from benchmarks.imports import main as imports_main
+from benchmarks.imports import measure_import
+from benchmarks.run import compare_results, main, parse_size, run_benchmarks
+from src.market_data import quote_cache
+from src.store import get_store
+
+
+def test_generate_operations_schema_and_determinism() -> None:
+    df = generate_operations(500, seed=1)
+    columns = pd.read_excel(Path(__file__).resolve().parent.parent / "data" / "operations.xlsx", nrows=0).columns
+    assert list(df.columns) == list(columns)
+    assert len(df) == 500
+    pd.testing.assert_frame_equal(df, generate_operations(500, seed=1))
+    assert not df.equals(generate_operations(500, seed=2))
+    # Операции идут от новых к старым, даты разбираются по формату выгрузки
+    dates = pd.to_datetime(df["Дата операции"], format="%d.%m.%Y %H:%M:%S")
+    assert dates.is_monotonic_decreasing
+
+
+def test_parse_size() -> None:
+    assert parse_size("10k") == 10_000
+    assert parse_size("1M") == 1_000_000
+    assert parse_size("2500") == 2500
+
+
+def test_run_benchmarks_and_compare(tmp_path: Path, monkeypatch: Any) -> None:
+    monkeypatch.delenv("API_KEY", raising=False)
+    quote_cache.clear()
+    ttl = dict(quote_cache.ttl)
+    previous_store = get_store()
+    report = run_benchmarks(["300"], repeat=1)
+    # Бенчмарк не меняет общее хранилище, кэш котировок и окружение процесса
+    assert get_store() is previous_store
+    assert src.utils.quote_cache is quote_cache
+    assert quote_cache.ttl == ttl
+    assert quote_cache.get("fx", "USD", lambda: None) is None
+    assert "API_KEY" not in os.environ
+    functions = {item["function"] for item in report["results"]}
+    assert {"form_main_page_info", "spending_by_category", "get_transactions_ind", "top_transaction"} <= functions
+    assert all(item["best_s"] > 0 for item in report["results"])
+
+    slower = {"results": [{**item, "best_s": item["best_s"] * 10} for item in report["results"]]}
+    assert compare_results(report, slower) == []
+    assert len(compare_results(slower, report)) == len(report["results"])
+
+    output = tmp_path / "results.json"
+    assert main(["--sizes", "200", "--repeat", "1", "--output", str(output)]) == 0
+    assert json.loads(output.read_text(encoding="utf-8"))["meta"]["repeat"] == 1
+
+
+def test_import_views_within_budget() -> None:
+    result = measure_import("src.views", repeat=3)
+    # Тяжелые зависимости загружаются при вызове функций, а не при импорте
+    assert result["loaded"] == []
+    assert result["best_s"] < DEFAULT_BUDGET
+
+
+def test_import_benchmark_cli(capsys: Any) -> None:
+    assert imports_main(["--module", "src.reports", "--repeat", "1", "--budget", "60"]) == 0
+    assert "import src.reports" in capsys.readouterr().out
@@ -1,27 +1,108 @@
 import json
+import logging
+import os
 from pathlib import Path
-from unittest.mock import mock_open, patch
+from typing import Any
 
 import pytest
 
-from src.config import load_user_currencies, load_user_stocks, user_setting_path
+import src.config as config_module
+from src.config import (LOG_DIR, LOG_FILE, LOGGING_CONFIG, UserSettings, load_user_currencies, load_user_stocks,
+                        user_setting_path)
+from src.logging_setup import setup_logging, shutdown_logging
 
 # Тестовые данные
 mock_user_settings = {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "GOOGL"]}
 
 
-def test_load_user_currencies() -> None:
+@pytest.fixture
+def settings_file(tmp_path: Path, monkeypatch: Any) -> Path:
+    path = tmp_path / "user_settings.json"
+    path.write_text(json.dumps(mock_user_settings), encoding="utf-8")
+    monkeypatch.setattr(config_module, "user_settings", UserSettings(path, check_interval=0))
+    return path
+
+
+def _rewrite(path: Path, content: Any) -> None:
+    """Перезаписывает файл настроек и сдвигает время модификации, чтобы изменение было заметно."""
+    path.write_text(json.dumps(content), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_load_user_currencies(settings_file: Path) -> None:
     """Тестирование функции загрузки пользовательских валют."""
-    with patch("builtins.open", mock_open(read_data=json.dumps(mock_user_settings))):
-        currencies = load_user_currencies()
-        assert currencies == mock_user_settings["user_currencies"], "Должны получить корректный список валют"
+    currencies = load_user_currencies()
+    assert currencies == mock_user_settings["user_currencies"], "Должны получить корректный список валют"
 
 
-def test_load_user_stocks() -> None:
+def test_load_user_stocks(settings_file: Path) -> None:
     """Тестирование функции загрузки пользовательских акций."""
-    with patch("builtins.open", mock_open(read_data=json.dumps(mock_user_settings))):
-        stocks = load_user_stocks()
-        assert stocks == mock_user_settings["user_stocks"], "Должны получить корректный список акций"
+    stocks = load_user_stocks()
+    assert stocks == mock_user_settings["user_stocks"], "Должны получить корректный список акций"
+
+
+def test_user_settings_parsed_once(settings_file: Path, mocker: Any) -> None:
+    """Файл разбирается один раз, пока он не изменился."""
+    load_user_currencies()
+    json_load = mocker.spy(config_module.json, "load")
+    for _ in range(3):
+        load_user_currencies()
+        load_user_stocks()
+    json_load.assert_not_called()
+
+
+def test_user_settings_reload_on_change(settings_file: Path) -> None:
+    """Измененный файл перечитывается, а некорректный не заменяет прежние настройки."""
+    assert load_user_currencies() == ["USD", "EUR"]
+    _rewrite(settings_file, {"user_currencies": ["CNY"], "user_stocks": []})
+    assert load_user_currencies() == ["CNY"]
+
+    settings_file.write_text("{не JSON", encoding="utf-8")
+    os.utime(settings_file, ns=(0, 0))
+    assert load_user_currencies() == ["CNY"]
+
+
+def test_user_settings_check_interval(settings_file: Path) -> None:
+    """В пределах check_interval файл не проверяется."""
+    settings = UserSettings(settings_file, check_interval=3600)
+    assert settings.currencies() == ["USD", "EUR"]
+    _rewrite(settings_file, {"user_currencies": ["CNY"]})
+    assert settings.currencies() == ["USD", "EUR"]
+    settings.invalidate()
+    assert settings.currencies() == ["CNY"]
+
+
+def test_user_settings_profiles(settings_file: Path) -> None:
+    """Именованные профили, поля которых не заданы, наследуют настройки верхнего уровня."""
+    _rewrite(
+        settings_file,
+        {**mock_user_settings, "profiles": {"alice": {"user_currencies": ["CNY"]}, "bob": {"user_stocks": ["TSLA"]}}},
+    )
+    assert set(config_module.user_settings.profiles()) == {"default", "alice", "bob"}
+    assert load_user_currencies("alice") == ["CNY"]
+    assert load_user_stocks("alice") == ["AAPL", "GOOGL"]
+    assert load_user_stocks("bob") == ["TSLA"]
+    with pytest.raises(KeyError):
+        load_user_currencies("carol")
+
+
+@pytest.mark.parametrize(
+    "profiles",
+    [["alice"], "alice", {"alice": ["CNY"]}, {"alice": {}}, {"alice": {"user_currencies": "CNY"}}],
+)
+def test_user_settings_malformed_profiles(settings_file: Path, profiles: Any) -> None:
+    """Некорректные профили - ValueError при первом чтении, при перечитывании остаются прежние настройки."""
+    assert load_user_currencies() == ["USD", "EUR"]
+    _rewrite(settings_file, {**mock_user_settings, "user_currencies": ["CNY"], "profiles": profiles})
+    assert load_user_currencies() == ["USD", "EUR"]
+    with pytest.raises(ValueError):
+        UserSettings(settings_file).profiles()
+
+
+def test_user_settings_missing_file(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        UserSettings(tmp_path / "missing.json").profiles()
 
 
 def test_user_setting_path() -> None:
@@ -35,10 +116,22 @@ def test_data_directory() -> None:
     assert data_dir.is_dir(), "Директория данных должна существовать"
 
 
-def test_log_directory() -> None:
-    """Проверка создания директории для логов."""
-    log_dir = Path(__file__).resolve().parent.parent / "logs"
-    assert log_dir.is_dir(), "Директория логов должна существовать"
+def test_log_directory(tmp_path: Path, mocker: Any) -> None:
+    """Проверка создания директории для логов: она создается при настройке логирования, а не при импорте."""
+    assert LOG_DIR == Path(__file__).resolve().parent.parent / "logs"
+    assert LOG_FILE.parent == LOG_DIR
+
+    log_file = tmp_path / "logs" / "app.log"
+    mocker.patch.dict(LOGGING_CONFIG, {"filename": log_file})
+    root = logging.getLogger()
+    level = root.level
+    shutdown_logging()
+    try:
+        setup_logging("INFO")
+        assert log_file.parent.is_dir(), "Директория логов должна создаваться при настройке логирования"
+    finally:
+        shutdown_logging()
+        root.setLevel(level)
 
 
 if __name__ == "__main__":
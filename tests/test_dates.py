@@ -0,0 +1,28 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.dates import PARAM_DATE_FORMAT, parse_date, parse_date_column
+
+
+def test_parse_date() -> None:
+    assert parse_date("17.12.2021 14:52:09") == datetime(2021, 12, 17, 14, 52, 9)
+    assert parse_date("2021-12-17 14:52:09", PARAM_DATE_FORMAT) == datetime(2021, 12, 17, 14, 52, 9)
+    with pytest.raises(ValueError):
+        parse_date("2021-12-17 14:52:09")
+
+
+def test_parse_date_column_uses_column_format() -> None:
+    operations = pd.Series(["01.02.2022 10:00:00", "неверная дата", None], name="Дата операции")
+    payments = pd.Series(["01.02.2022", "13.02.2022"], name="Дата платежа")
+
+    parsed = parse_date_column(operations)
+    assert parsed.iloc[0] == pd.Timestamp("2022-02-01 10:00:00")  # день идет первым, без угадывания
+    assert parsed.iloc[1:].isna().all()
+    assert list(parse_date_column(payments)) == [pd.Timestamp("2022-02-01"), pd.Timestamp("2022-02-13")]
+
+
+def test_parse_date_column_keeps_parsed() -> None:
+    parsed = pd.Series(pd.to_datetime(["2022-02-01"]))
+    assert parse_date_column(parsed) is parsed
@@ -5,7 +5,8 @@ from typing import Any, Dict, List, TypeVar
 import pandas as pd
 import pytest
 
-from src.decorators import decorator_spending_by_category
+import src.decorators as decorators_module
+from src.decorators import ReportWriter, decorator_spending_by_category, encode_report, flush_reports
 
 # Define a type variable for clarity
 T = TypeVar('T', bound=Dict[str, Any])
@@ -62,5 +63,128 @@ def test_spending_by_category_custom_filename(transactions: pd.DataFrame) -> Non
     os.remove('test_report.json')
 
 
+def test_json_string_result_is_written_without_double_encoding(tmp_path: Any) -> None:
+    report = tmp_path / 'report.json'
+
+    @decorator_spending_by_category(str(report))
+    def spending() -> str:
+        return json.dumps([{'category': 'food', 'amount': 10.0}], indent=4)
+
+    result = spending()
+    assert report.read_text(encoding='utf-8') == result
+
+
+def test_json_format_writes_payload_verbatim(tmp_path: Any, mocker: Any) -> None:
+    report = tmp_path / 'report.json'
+    encode = mocker.spy(decorators_module, 'dumps')
+
+    @decorator_spending_by_category(str(report), report_format='json')
+    def spending() -> str:
+        return json.dumps([{'category': 'food', 'amount': 10.0}], separators=(',', ':'))
+
+    result = spending()
+    assert report.read_text(encoding='utf-8') == result
+    encode.assert_not_called()
+
+    # Результат, который еще не является JSON, записывается с отступами
+    content = encode_report([{'category': 'food'}], 'json').decode('utf-8')
+    assert content.splitlines()[:3] == ['[', '  {', '    "category": "food"']
+
+
+@pytest.mark.parametrize('report_format', ['json', 'compact'])
+def test_report_formats_replace_file(tmp_path: Any, report_format: str) -> None:
+    report = tmp_path / 'reports' / 'report.json'
+
+    @decorator_spending_by_category(str(report), report_format=report_format)
+    def spending(amount: float) -> str:
+        return json.dumps([{'amount': amount}])
+
+    spending(1.0)
+    spending(2.0)
+    assert json.loads(report.read_text(encoding='utf-8')) == [{'amount': 2.0}]
+    assert [path.name for path in report.parent.iterdir()] == ['report.json']
+
+
+def test_jsonl_report_appends_lines(tmp_path: Any) -> None:
+    report = tmp_path / 'report.jsonl'
+
+    @decorator_spending_by_category(str(report), report_format='jsonl')
+    def spending(amount: float) -> str:
+        return json.dumps({'food': [{'amount': amount}]}, indent=4)
+
+    spending(1.0)
+    spending(2.0)
+    lines = report.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [{'food': [{'amount': 1.0}]}, {'food': [{'amount': 2.0}]}]
+
+
+def test_parquet_report(tmp_path: Any) -> None:
+    pytest.importorskip('pyarrow')
+    report = tmp_path / 'report.parquet'
+
+    @decorator_spending_by_category(str(report), report_format='parquet')
+    def spending() -> str:
+        return json.dumps({'food': [{'amount': 1.0}], 'clothing': [{'amount': 5.0}]})
+
+    spending()
+    assert pd.read_parquet(report)['amount'].tolist() == [1.0, 5.0]
+
+
+def test_unknown_format_is_logged_not_raised(tmp_path: Any) -> None:
+    @decorator_spending_by_category(str(tmp_path / 'report.xml'), report_format='xml')
+    def spending() -> str:
+        return '[]'
+
+    assert spending() == '[]'
+    assert not (tmp_path / 'report.xml').exists()
+
+
+def test_background_writer_coalesces_reports(tmp_path: Any) -> None:
+    writer = ReportWriter(flush_interval=60)
+    try:
+        for amount in range(5):
+            writer.submit(tmp_path / 'report.json', 'compact', json.dumps([{'amount': amount}]))
+            writer.submit(tmp_path / 'report.jsonl', 'jsonl', json.dumps({'amount': amount}))
+        assert not (tmp_path / 'report.json').exists()
+        assert writer.flush(timeout=5)
+        assert json.loads((tmp_path / 'report.json').read_text(encoding='utf-8')) == [{'amount': 4}]
+        lines = (tmp_path / 'report.jsonl').read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)['amount'] for line in lines] == list(range(5))
+    finally:
+        writer.close(timeout=5)
+    with pytest.raises(RuntimeError):
+        writer.submit(tmp_path / 'report.json', 'json', '[]')
+
+
+def test_background_decorator_uses_shared_writer(tmp_path: Any) -> None:
+    report = tmp_path / 'report.json'
+
+    @decorator_spending_by_category(str(report), background=True)
+    def spending() -> str:
+        return '[{"amount": 1.0}]'
+
+    assert spending() == '[{"amount": 1.0}]'
+    assert flush_reports(timeout=5)
+    assert json.loads(report.read_text(encoding='utf-8')) == [{'amount': 1.0}]
+
+
+def test_writer_close_writes_pending_reports(tmp_path: Any) -> None:
+    writer = ReportWriter(flush_interval=60)
+    writer.submit(tmp_path / 'report.json', 'json', '[1]')
+    writer.close(timeout=5)
+    assert json.loads((tmp_path / 'report.json').read_text(encoding='utf-8')) == [1]
+
+
+def test_bytes_result_is_written_as_is(tmp_path: Any) -> None:
+    report = tmp_path / 'report.jsonl'
+
+    @decorator_spending_by_category(str(report), report_format='jsonl')
+    def spending() -> bytes:
+        return b'[{"amount":1.0}]'
+
+    assert spending() == b'[{"amount":1.0}]'
+    assert report.read_bytes() == b'[{"amount":1.0}]\n'
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,41 @@
+import sys
+from typing import Any
+
+from src.lazy import LazyModule, is_loaded, lazy_import
+
+
+def test_lazy_import_returns_loaded_module() -> None:
+    assert lazy_import("json") is sys.modules["json"]
+
+
+def test_lazy_module_imports_on_attribute_access(monkeypatch: Any) -> None:
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    monkeypatch.setattr("src.lazy._proxies", {})
+    proxy = lazy_import("colorsys")
+    assert isinstance(proxy, LazyModule)
+    assert lazy_import("colorsys") is proxy
+    assert not is_loaded("colorsys")
+
+    assert proxy.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert is_loaded("colorsys")
+    # Атрибуты модуля не копируются в заместитель
+    assert "rgb_to_hsv" not in vars(proxy)
+
+
+def test_lazy_module_sees_patches_of_real_module(monkeypatch: Any) -> None:
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    monkeypatch.setattr("src.lazy._proxies", {})
+    proxy = lazy_import("colorsys")
+    assert proxy.hsv_to_rgb(0.0, 0.0, 1.0) == (1.0, 1.0, 1.0)
+
+    monkeypatch.setattr(sys.modules["colorsys"], "hsv_to_rgb", lambda *args: "подмена")
+    assert proxy.hsv_to_rgb(0.0, 0.0, 1.0) == "подмена"
+
+
+def test_lazy_module_keeps_patched_attributes(monkeypatch: Any) -> None:
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    monkeypatch.setattr("src.lazy._proxies", {})
+    proxy = lazy_import("colorsys")
+    monkeypatch.setattr(proxy, "rgb_to_hsv", lambda *args: "подмена", raising=False)
+    assert proxy.rgb_to_hsv(1.0, 0.0, 0.0) == "подмена"
+    assert proxy.hsv_to_rgb(0.0, 0.0, 1.0) == (1.0, 1.0, 1.0)
@@ -0,0 +1,60 @@
+import logging
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from src.logging_setup import setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def restore_root() -> Iterator[None]:
+    root = logging.getLogger()
+    level = root.level
+    yield
+    shutdown_logging()
+    root.setLevel(level)
+
+
+def test_setup_logging_writes_through_listener(tmp_path: Path, restore_root: None) -> None:
+    log_file = tmp_path / "nested" / "app.log"
+    setup_logging("INFO", log_file)
+    logger = logging.getLogger("src.test")
+    logger.info("Операций: %d", 3)
+    logger.debug("не попадет в файл: %s", "отладка")
+    shutdown_logging()
+
+    content = log_file.read_text(encoding="utf-8")
+    assert "src.test - INFO - Операций: 3" in content
+    assert "отладка" not in content
+
+
+def test_setup_logging_is_idempotent(tmp_path: Path, restore_root: None) -> None:
+    root = logging.getLogger()
+    handlers = len(root.handlers)
+    listener = setup_logging("INFO", tmp_path / "app.log")
+    assert setup_logging("DEBUG", tmp_path / "other.log") is listener
+    assert len(root.handlers) == handlers + 1
+    assert not (tmp_path / "other.log").exists()
+
+
+def test_shutdown_logging_removes_handler(tmp_path: Path, restore_root: None) -> None:
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    setup_logging("INFO", tmp_path / "app.log")
+    shutdown_logging()
+    shutdown_logging()
+    assert root.handlers == handlers
+
+
+def test_lazy_arguments_are_not_formatted_below_level(restore_root: None) -> None:
+    class Expensive:
+        def __str__(self) -> str:
+            raise AssertionError("аргумент не должен форматироваться")
+
+    logger = logging.getLogger("src.test.lazy")
+    logger.setLevel(logging.INFO)
+    try:
+        logger.debug("Данные: %s", Expensive())
+    finally:
+        logger.setLevel(logging.NOTSET)
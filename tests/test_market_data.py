@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.market_data import QuoteCache, fetch_concurrently, get_executor, get_session, quote_cache
+from src.utils import get_stock_price
+
+
+def test_get_session_is_shared() -> None:
+    assert get_session() is get_session()
+    assert get_executor() is get_executor()
+
+
+def test_fetch_concurrently_keeps_order() -> None:
+    def slow_square(value: int) -> int:
+        time.sleep(0.05 * (5 - value))
+        return value * value
+
+    assert fetch_concurrently(slow_square, [1, 2, 3, 4]) == [1, 4, 9, 16]
+    assert fetch_concurrently(slow_square, []) == []
+
+
+def test_quote_cache_ttl_and_stale_while_revalidate(mocker: Any) -> None:
+    cache = QuoteCache({"stock": 60})
+    clock = mocker.patch("src.market_data.time.time", return_value=1000.0)
+    fetch = MagicMock(return_value=1.0)
+
+    assert cache.get("stock", "AAPL", fetch) == 1.0
+    assert cache.get("stock", "AAPL", fetch) == 1.0
+    assert fetch.call_count == 1  # Второй запрос обслужен из кэша
+
+    # Котировка устарела: возвращается старое значение, новое запрашивается в фоне
+    clock.return_value = 2000.0
+    fetch.return_value = 2.0
+    assert cache.get("stock", "AAPL", fetch) == 1.0
+    deadline = time.monotonic() + 2
+    while cache.get("stock", "AAPL", fetch) != 2.0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get("stock", "AAPL", fetch) == 2.0
+
+
+def test_quote_cache_lru_eviction() -> None:
+    cache = QuoteCache({"stock": 60}, max_entries=2)
+    cache.put("stock", "AAPL", 1.0)
+    cache.put("stock", "MSFT", 2.0)
+    cache.get("stock", "AAPL", MagicMock())  # AAPL становится недавно использованной
+    cache.put("stock", "TSLA", 3.0)
+
+    fetch = MagicMock(return_value=None)
+    assert cache.get("stock", "MSFT", fetch) is None  # MSFT вытеснена
+    assert cache.get("stock", "AAPL", fetch) == 1.0
+    assert cache.get("stock", "TSLA", fetch) == 3.0
+
+
+def test_quote_cache_persistence(tmp_path: Path) -> None:
+    path = tmp_path / "quotes.json"
+    QuoteCache({"fx": 60}, persist_path=path).put("fx", "USD", {"rates": {"RUB": 73.21}})
+    restored = QuoteCache({"fx": 60}, persist_path=path)
+    assert restored.get("fx", "USD", MagicMock(return_value=None)) == {"rates": {"RUB": 73.21}}
+
+
+class _StubQuoteHandler(BaseHTTPRequestHandler):
+    """Локальный сервер, отвечающий как Alpha Vantage."""
+
+    def do_GET(self) -> None:
+        body = json.dumps({"Global Quote": {"05. price": "123.456"}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def test_get_stock_price_from_stub_server(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubQuoteHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.setenv("STOCK_API_URL", f"http://127.0.0.1:{server.server_port}/query")
+        quote_cache.clear()
+        assert get_stock_price(["AAPL", "MSFT"]) == [
+            {"stock": "AAPL", "price": 123.46},
+            {"stock": "MSFT", "price": 123.46},
+        ]
+    finally:
+        quote_cache.clear()
+        server.shutdown()
@@ -0,0 +1,96 @@
+import atexit
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+import src.metrics as metrics_module
+from src.lazy import lazy_import
+from src.metrics import MetricsRegistry, count_rows, parse_profile_mode, registry, timed
+
+
+@pytest.fixture
+def metrics() -> MetricsRegistry:
+    return MetricsRegistry(profile_mode="")
+
+
+def test_measure_records_time_and_rows(metrics: MetricsRegistry) -> None:
+    for rows in (3, 4):
+        with metrics.measure("filter", "date_slice") as measurement:
+            measurement.rows = rows
+    stats = metrics.snapshot()["filter"]["date_slice"]
+    assert stats["calls"] == 2
+    assert stats["rows"] == 7
+    assert stats["seconds"] >= stats["max_seconds"] > 0
+    assert "alloc_bytes" not in stats
+
+
+def test_measure_records_on_error(metrics: MetricsRegistry) -> None:
+    with pytest.raises(ValueError):
+        with metrics.measure("load", "load_operations"):
+            raise ValueError("ошибка")
+    assert metrics.snapshot()["load"]["load_operations"]["calls"] == 1
+
+
+def test_timed_counts_input_rows() -> None:
+    registry.reset()
+
+    @timed("aggregate")
+    def first_rows(df: pd.DataFrame) -> pd.DataFrame:
+        return df.head(1)
+
+    assert len(first_rows(pd.DataFrame({"a": range(5)}))) == 1
+    stats = registry.snapshot()["aggregate"]["test_timed_counts_input_rows.<locals>.first_rows"]
+    assert stats["rows"] == 5
+    assert first_rows.__name__ == "first_rows"
+    registry.reset()
+
+
+def test_count_rows_does_not_import_pandas(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Как в процессе, где pandas и numpy еще не загружены
+    for attribute, name in (("pd", "pandas"), ("np", "numpy")):
+        monkeypatch.delitem(sys.modules, name)
+        monkeypatch.setattr(metrics_module, attribute, lazy_import(name))
+
+    assert count_rows({"url": "https://example.com"}) is None
+    assert count_rows([1, 2]) == 2
+    assert "pandas" not in sys.modules
+    assert "numpy" not in sys.modules
+
+
+def test_export_json_and_prometheus(metrics: MetricsRegistry) -> None:
+    with metrics.measure("serialize", 'page "main"', rows=2):
+        pass
+    assert json.loads(metrics.to_json())["serialize"]['page "main"']["rows"] == 2
+
+    text = metrics.to_prometheus()
+    assert "# TYPE bank_stage_seconds_total counter" in text
+    assert 'bank_stage_rows_total{stage="serialize",operation="page \\"main\\""} 2' in text
+    assert MetricsRegistry(profile_mode="").to_prometheus() == ""
+
+
+def test_profiling_modes(tmp_path: Path, mocker: Any) -> None:
+    assert parse_profile_mode("all") == {"cprofile", "tracemalloc"}
+    assert parse_profile_mode(" cProfile, unknown ") == {"cprofile"}
+    assert parse_profile_mode("") == set()
+
+    register = mocker.spy(atexit, "register")
+    unregister = mocker.spy(atexit, "unregister")
+    metrics = MetricsRegistry(profile_mode="cprofile,tracemalloc", profile_dir=tmp_path)
+    register.assert_called_once_with(metrics.dump_profiles)
+    with metrics.measure("aggregate", "outer"):
+        with metrics.measure("aggregate", "inner"):
+            sum(range(1000))
+    assert "alloc_bytes" in metrics.snapshot()["aggregate"]["outer"]
+
+    metrics.dump_profiles()
+    # Профилируется только внешняя стадия
+    assert [path.name for path in tmp_path.iterdir()] == ["aggregate.outer.prof"]
+    metrics.configure_profiling("")
+    assert not tracemalloc.is_tracing()
+    # После выключения профилирования профили не сохраняются при завершении процесса
+    unregister.assert_called_once_with(metrics.dump_profiles)
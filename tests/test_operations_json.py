@@ -0,0 +1,154 @@
+import io
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+import pytest
+
+import src.operations_json as operations_json
+from src.operations_json import (OPERATION_COLUMNS, _iter_json_array, iter_json_records, operations_frame,
+                                 parse_amount_minor, read_operations_json)
+from src.readers import iter_operations
+from src.reports import spending_by_category
+from src.store import PARSED_DATE_COLUMN, TransactionStore, load_operations
+
+# Операции в формате data/operations.json
+records: List[Dict[str, Any]] = [
+    {
+        "id": 441945886,
+        "state": "EXECUTED",
+        "date": "2019-08-26T10:50:58.294041",
+        "operationAmount": {"amount": "31957.58", "currency": {"name": "руб.", "code": "RUB"}},
+        "description": "Перевод организации",
+        "from": "Maestro 1596837868705199",
+        "to": "Счет 64686473678894779589",
+    },
+    {},
+    {
+        "id": 587085106,
+        "state": "CANCELED",
+        "date": "2019-08-27T11:00:00.000001",
+        "operationAmount": {"amount": "48223.5", "currency": {"name": "USD", "code": "USD"}},
+        "description": "Открытие вклада",
+        "to": "Счет 41421565395219882431",
+    },
+    {
+        "id": 1,
+        "state": "EXECUTED",
+        "date": "2019-08-28T12:00:00",
+        "operationAmount": {"amount": "100", "currency": {"name": "руб.", "code": "RUB"}},
+        "description": "Перевод со счета на счет",
+        "from": "Счет 75106830613657916952",
+        "to": "Счет 11776614605963066702",
+    },
+]
+
+
+@pytest.fixture
+def operations_file(tmp_path: Path) -> Path:
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def test_parse_amount_minor() -> None:
+    minor = parse_amount_minor(pd.Series(["31957.58", "48223.5", "100", "-0.07", "1e3", None, " 12.30 "]))
+    assert minor.tolist()[:5] == [3195758, 4822350, 10000, -7, pd.NA]
+    assert minor.isna().tolist() == [False, False, False, False, True, True, False]
+    assert minor.iloc[6] == 1230
+
+
+def test_operations_frame_unified_schema() -> None:
+    df = operations_frame([record for record in records if record])
+    assert list(df.columns) == [*OPERATION_COLUMNS, PARSED_DATE_COLUMN]
+    first = df.iloc[0]
+    assert first["Дата операции"] == "26.08.2019 10:50:58"
+    assert first["Дата платежа"] == "26.08.2019"
+    assert first["Номер карты"] == "*5199"
+    assert first["Статус"] == "OK"
+    assert first["Сумма платежа"] == -31957.58
+    assert first["Сумма операции с округлением"] == 31957.58
+    assert first["Валюта операции"] == "RUB"
+    assert first["Категория"] == "Переводы"
+    assert first[PARSED_DATE_COLUMN] == pd.Timestamp("2019-08-26 10:50:58.294041")
+
+    # Без счета списания операция считается поступлением, у счетов нет номера карты
+    assert df["Сумма операции"].tolist() == [-31957.58, 48223.5, -100.0]
+    assert df["Статус"].tolist() == ["OK", "FAILED", "OK"]
+    assert df["Категория"].tolist() == ["Переводы", "Открытие вклада", "Переводы"]
+    assert math.isnan(df["Номер карты"].iloc[1]) and math.isnan(df["Номер карты"].iloc[2])
+
+
+def test_foreign_currency_has_no_payment_amount() -> None:
+    df = operations_frame(
+        [
+            {**records[0], "operationAmount": {"amount": "100.5", "currency": {"name": "USD", "code": "USD"}}},
+            {**records[0], "from": "Visa Classic 6831982476737658", "operationAmount": records[3]["operationAmount"]},
+        ]
+    )
+    # Сумма операции остается в валюте операции, рублевой суммы платежа у нее нет
+    assert df["Сумма операции"].tolist() == [-100.5, -100.0]
+    assert df["Валюта операции"].tolist() == ["USD", "RUB"]
+    assert math.isnan(df["Сумма платежа"].iloc[0]) and math.isnan(df["Валюта платежа"].iloc[0])
+    assert math.isnan(df["Сумма операции с округлением"].iloc[0])
+    assert df["Сумма платежа"].iloc[1] == -100.0 and df["Валюта платежа"].iloc[1] == "RUB"
+
+    # В своды расходов по картам попадают только рубли
+    store = TransactionStore.from_frame(df)
+    spend = store.card_spend("2019-08-01", "2019-08-31")
+    assert spend[spend != 0].to_dict() == {"*7658": -100.0}
+
+
+def test_schema_matches_excel_loader(tmp_path: Path) -> None:
+    excel = load_operations("data/operations.xlsx", cache_dir=tmp_path)
+    df = read_operations_json("data/operations.json")
+    assert len(df) == 100
+    assert df.dtypes.to_dict() == excel.dtypes.to_dict()
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 4096])
+def test_streaming_array_parser(read_size: int) -> None:
+    text = json.dumps(records, ensure_ascii=False, indent=2)
+    assert list(_iter_json_array(io.StringIO(text), read_size)) == records
+    assert list(_iter_json_array(io.StringIO(" [ ] "), read_size)) == []
+
+
+def test_streaming_array_parser_rejects_broken_json() -> None:
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO('[{"a": 1}, {"b": ')))
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO('{"a": 1}')))
+
+
+def test_large_files_are_streamed(operations_file: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    whole = list(iter_json_records(operations_file))
+    monkeypatch.setattr(operations_json, "STREAM_THRESHOLD", 0)
+    monkeypatch.setattr(operations_json, "READ_SIZE", 16)
+    assert list(iter_json_records(operations_file)) == whole == [record for record in records if record]
+
+
+def test_json_and_jsonl_give_same_frame(operations_file: Path, tmp_path: Path) -> None:
+    lines = tmp_path / "operations.jsonl"
+    lines.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in records), encoding="utf-8")
+    pd.testing.assert_frame_equal(read_operations_json(operations_file, chunk_size=2), read_operations_json(lines))
+
+
+def test_store_and_reports_run_on_json(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    df = store.frame()
+    assert len(df) == 3
+    assert store.card_spend("2019-08-01", "2019-08-31").to_dict() == {"*5199": -31957.58}
+    result = json.loads(spending_by_category(df, "Переводы", "31.08.2019 00:00:00"))
+    assert result == [
+        {"date": "26.08.2019 10:50:58", "amount": 31957.58},
+        {"date": "28.08.2019 12:00:00", "amount": 100.0},
+    ]
+
+
+def test_iter_operations_reads_nested_json(operations_file: Path) -> None:
+    result = list(iter_operations(operations_file))
+    assert [record["Сумма операции"] for record in result] == [-31957.58, 48223.5, -100.0]
+    assert math.isnan(result[1]["Сумма платежа"])
+    assert PARSED_DATE_COLUMN not in result[0]
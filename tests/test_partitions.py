@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from src.partitions import PartitionedStore
+from src.store import TransactionStore, parse_operations
+from src.views import form_main_page_info
+
+OPERATIONS = pd.DataFrame(
+    {
+        "Дата операции": [
+            "01.12.2021 10:00:00",
+            "05.12.2021 12:00:00",
+            "10.12.2021 09:30:00",
+            "15.12.2021 18:45:00",
+            "20.11.2021 08:00:00",
+            "25.12.2021 11:11:11",
+        ],
+        "Номер карты": ["*1111", "*2222", "*1111", "*3333", "*2222", None],
+        "Сумма платежа": [-100.0, -250.0, -40.0, -999.0, -10.0, -5.0],
+        "Категория": ["Еда", "Транспорт", "Еда", "Переводы", "Еда", "Еда"],
+        "Описание": ["Обед", "Такси", "Кофе", "Иван Ф.", "Булка", "Чай"],
+    }
+)
+
+
+@pytest.fixture
+def users_dir(tmp_path: Path) -> Path:
+    root = tmp_path / "users"
+    root.mkdir()
+    OPERATIONS.iloc[:3].to_excel(root / "alice.xlsx", index=False)
+    OPERATIONS.iloc[3:5].to_excel(root / "bob.xlsx", index=False)
+    (root / "carol").mkdir()
+    OPERATIONS.iloc[5:].to_excel(root / "carol" / "operations.xlsx", index=False)
+    (root / "notes.txt").write_text("не выгрузка", encoding="utf-8")
+    return root
+
+
+def test_from_directory_loads_lazily(users_dir: Path) -> None:
+    partitions = PartitionedStore.from_directory(users_dir, cache_dir=users_dir.parent / "cache")
+    assert partitions.keys() == ["alice", "bob", "carol"]
+    assert partitions.loaded() == []
+
+    alice = partitions.get("alice")
+    assert len(alice.frame()) == 3
+    assert partitions.get("alice") is alice
+    assert partitions.loaded() == ["alice"]
+    assert partitions.stats == {"hits": 1, "loads": 1, "evictions": 0}
+    assert len(partitions.get("carol").frame()) == 1
+    assert partitions.memory_usage() > 0
+
+    with pytest.raises(KeyError):
+        partitions.get("dave")
+
+
+def test_partition_aggregates_are_per_user(users_dir: Path) -> None:
+    partitions = PartitionedStore.from_directory(users_dir, cache_dir=users_dir.parent / "cache")
+    spend = partitions.get("alice").card_spend("2021-12-01", "2021-12-31")
+    assert spend.to_dict() == {"*1111": -140.0, "*2222": -250.0}
+    bob_spend = partitions.get("bob").card_spend("2021-12-01", "2021-12-31")
+    assert bob_spend[bob_spend != 0].to_dict() == {"*3333": -999.0}
+
+
+def test_lru_eviction_by_memory_budget(users_dir: Path) -> None:
+    partitions = PartitionedStore.from_directory(users_dir, cache_dir=users_dir.parent / "cache")
+    sizes = {key: partitions.get(key).memory_usage() for key in ("alice", "bob", "carol")}
+    partitions.clear()
+
+    # Бюджет вмещает два любых раздела, но не три
+    partitions.memory_budget = sum(sizes.values()) - min(sizes.values()) // 2
+    partitions.get("alice")
+    partitions.get("bob")
+    partitions.get("alice")
+    partitions.get("carol")
+    # Вытесняется давно не использованный раздел bob
+    assert partitions.loaded() == ["alice", "carol"]
+    assert partitions.stats["evictions"] == 1
+
+    # Раздел больше бюджета все равно загружается, остальные вытесняются
+    partitions.memory_budget = 0
+    assert len(partitions.get("bob").frame()) == 2
+    assert partitions.loaded() == ["bob"]
+
+
+def test_from_frame_partitions_by_account(tmp_path: Path) -> None:
+    store = TransactionStore.from_frame(parse_operations(OPERATIONS))
+    partitions = PartitionedStore.from_frame(store.frame(), spill_dir=tmp_path / "spill")
+    assert partitions.keys() == ["*1111", "*2222", "*3333"]
+    assert partitions.loaded() == []
+
+    account = partitions.get("*2222")
+    assert list(account.frame()["Описание"]) == ["Булка", "Такси"]
+    assert account.card_spend("2021-12-01", "2021-12-31").to_dict() == {"*2222": -250.0}
+    total = sum(partitions.get(key).card_spend("2021-11-01", "2021-12-31").sum() for key in partitions.keys())
+    assert total == store.card_spend("2021-11-01", "2021-12-31").sum()
+
+
+def test_form_main_page_info_for_user(users_dir: Path, mocker: Any) -> None:
+    partitions = PartitionedStore.from_directory(users_dir, cache_dir=users_dir.parent / "cache")
+    mocker.patch("src.views.get_partitions", return_value=partitions)
+    get_store = mocker.patch("src.views.get_store")
+    mocker.patch("src.views.get_market_data", return_value=([], []))
+
+    result = form_main_page_info("2021-12-31 23:00:00", user="bob")
+    get_store.assert_not_called()
+    assert result["cards"] == [{"last_digits": "3333", "total_spent": 999.0, "cashback": 9.99}]
+    assert partitions.loaded() == ["bob"]
+
+    error = form_main_page_info("2021-12-31 23:00:00", return_json=True, user="dave")
+    assert json.loads(error)["error"] == "Пользователь не найден."
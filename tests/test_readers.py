@@ -0,0 +1,71 @@
+import json
+import math
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.readers import iter_operation_chunks, iter_operation_frames, iter_operations
+from src.reports import spending_by_category
+from src.services import get_transactions_ind
+
+# Операции в формате выгрузки operations.xlsx
+operations = pd.DataFrame(
+    {
+        "Дата операции": ["01.12.2021 10:00:00", "02.12.2021 11:00:00", "03.12.2021 12:00:00"],
+        "Номер карты": ["*7197", None, "*7197"],
+        "Сумма платежа": [-100.5, -2000.0, -50.0],
+        "Категория": ["Фастфуд", "Переводы", "Фастфуд"],
+        "Описание": ["Mouse Tail", "Иван П.", "Teremok"],
+        "Бонусы (включая кэшбэк)": [2, 0, 1],
+        "Сумма операции с округлением": [100.5, 2000.0, 50.0],
+    }
+)
+
+
+@pytest.fixture(params=["xlsx", "csv", "json", "jsonl"])
+def operations_file(request: pytest.FixtureRequest, tmp_path: Path) -> Path:
+    path = tmp_path / f"operations.{request.param}"
+    if request.param == "xlsx":
+        operations.to_excel(path, index=False)
+    elif request.param == "csv":
+        operations.to_csv(path, index=False, sep=";")
+    elif request.param == "json":
+        operations.to_json(path, orient="records", force_ascii=False)
+    else:
+        operations.to_json(path, orient="records", lines=True, force_ascii=False)
+    return path
+
+
+def test_iter_operations_typed_records(operations_file: Path) -> None:
+    records = list(iter_operations(operations_file))
+    assert len(records) == 3
+    assert records[0]["Сумма платежа"] == -100.5
+    assert records[0]["Бонусы (включая кэшбэк)"] == 2
+    assert math.isnan(records[1]["Номер карты"])
+    assert records[1]["Описание"] == "Иван П."
+
+
+def test_iter_operation_chunks(operations_file: Path) -> None:
+    assert [len(chunk) for chunk in iter_operation_chunks(operations_file, chunk_size=2)] == [2, 1]
+
+
+def test_streaming_into_reports_and_services(operations_file: Path) -> None:
+    result = json.loads(
+        spending_by_category(iter_operation_frames(operations_file, chunk_size=2), "Фастфуд", "31.12.2021 00:00:00")
+    )
+    assert result == [
+        {"date": "01.12.2021 10:00:00", "amount": 100.5},
+        {"date": "03.12.2021 12:00:00", "amount": 50.0},
+    ]
+
+    transfers = json.loads(get_transactions_ind(iter_operations(operations_file), r"\b[А-Я][а-я]+\s[А-Я]\."))
+    assert [transfer["Описание"] for transfer in transfers] == ["Иван П."]
+
+
+def test_iter_operations_errors(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        iter_operations(tmp_path / "missing.xlsx")
+    (tmp_path / "operations.txt").write_text("", encoding="utf-8")
+    with pytest.raises(ValueError):
+        iter_operations(tmp_path / "operations.txt")
@@ -0,0 +1,54 @@
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+from src.records import FIELDS, Transaction, TransactionBatch
+from src.reports import spending_by_category
+from src.services import get_transactions_ind
+from tests.test_services import transactions_data
+
+
+def test_transaction_from_dict_round_trip() -> None:
+    transaction = Transaction.from_dict(transactions_data[0])
+    assert transaction.description == "Константин Ф."
+    assert transaction.date.year == 2018
+    assert json.dumps(transaction.to_dict()) == json.dumps(transactions_data[0])
+    assert not hasattr(transaction, "__dict__")  # Запись хранится в слотах
+
+
+def test_transaction_slots_are_annotated() -> None:
+    # Аннотации слотов нужны для проверки типов и должны совпадать с полями выгрузки
+    assert list(Transaction.__annotations__) == [attr for attr, _, _ in FIELDS] == list(Transaction.__slots__)
+
+
+def test_transaction_batch_columns() -> None:
+    batch = TransactionBatch.from_records(transactions_data)
+    assert len(batch) == 4
+    assert list(batch.labels["category"]) == ["Переводы", "Коммунальные"]
+    assert list(batch.column("category")) == ["Переводы", "Переводы", "Переводы", "Коммунальные"]
+    assert batch.columns["payment_amount"].sum() == pytest.approx(-31500.0)
+    # Одинаковые строки в словаре интернированы
+    assert batch.labels["status"][0] is sys.intern("OK")
+    assert batch[1].description == "Иванов И.И."
+
+
+def test_services_and_reports_accept_batch() -> None:
+    batch = TransactionBatch.from_records(transactions_data)
+    pattern = r"\b[А-Я][а-я]+\s[А-Я]\."
+    assert get_transactions_ind(batch, pattern) == get_transactions_ind(transactions_data, pattern)
+    transactions = [Transaction.from_dict(record) for record in transactions_data]
+    assert get_transactions_ind(transactions, pattern) == get_transactions_ind(transactions_data, pattern)
+
+    result = json.loads(spending_by_category(batch, "Коммунальные", "30.06.2018 00:00:00"))
+    assert result == [{"date": "06.06.2018 15:45:00", "amount": 1500.0}]
+
+
+def test_transaction_batch_from_frame_to_frame() -> None:
+    df = pd.DataFrame(transactions_data)
+    batch = TransactionBatch.from_frame(df)
+    frame = batch.to_frame()
+    assert list(frame.columns) == list(df.columns)
+    assert frame["Дата операции"].iloc[0] == pd.Timestamp("2018-06-03 14:19:08")
+    assert len(batch.select(batch.columns["payment_amount"] < -4000)) == 2
@@ -5,6 +5,7 @@ import pandas as pd
 import pytest
 
 from src.reports import spending_by_category
+from src.store import TransactionStore, parse_operations
 
 
 # Создаем фикстуру с тестовыми данными
@@ -27,14 +28,14 @@ def test_spending_by_category_with_valid_category(sample_transactions: pd.DataFr
 
     # Изменяем диапазон на 90 дней перед 28.02.2022, чтобы все три транзакции включались
     result: str = spending_by_category(sample_transactions, "Супермаркеты", "28.02.2022 23:59:59")
-    assert result == json.dumps(expected_result, indent=4, ensure_ascii=False)
+    assert json.loads(result) == expected_result
 
 
 def test_spending_by_category_with_invalid_category(sample_transactions: pd.DataFrame) -> None:
     expected_result: List[Dict[str, Any]] = []
 
     result: str = spending_by_category(sample_transactions, "Неправильная категория", "28.08.2022 23:59:59")
-    assert result == json.dumps(expected_result, indent=4, ensure_ascii=False)
+    assert json.loads(result) == expected_result
 
 
 def test_spending_by_category_with_no_date(sample_transactions: pd.DataFrame) -> None:
@@ -47,7 +48,7 @@ def test_spending_by_category_with_no_date(sample_transactions: pd.DataFrame) ->
     ]
 
     result: str = spending_by_category(sample_transactions, "Супермаркеты", fixed_date_end)
-    assert result == json.dumps(expected_result, indent=4, ensure_ascii=False)
+    assert json.loads(result) == expected_result
 
 
 def test_spending_by_category_with_missing_date(sample_transactions: pd.DataFrame) -> None:
@@ -59,7 +60,69 @@ def test_spending_by_category_with_missing_date(sample_transactions: pd.DataFram
     ]
 
     result: str = spending_by_category(sample_transactions, "Супермаркеты", "28.02.2022 23:59:59")
-    assert result == json.dumps(expected_result, indent=4, ensure_ascii=False)
+    assert json.loads(result) == expected_result
+
+
+def test_spending_by_category_does_not_mutate_input(sample_transactions: pd.DataFrame) -> None:
+    original = sample_transactions.copy()
+    spending_by_category(sample_transactions, "Супермаркеты", "28.02.2022 23:59:59")
+    pd.testing.assert_frame_equal(sample_transactions, original)
+
+
+def test_spending_by_category_with_several_categories(sample_transactions: pd.DataFrame) -> None:
+    result = json.loads(
+        spending_by_category(sample_transactions, ["Рестораны", "Супермаркеты", "Такси"], "28.02.2022 23:59:59")
+    )
+    assert result == {
+        "Рестораны": [{"date": "20.01.2022 00:00:00", "amount": 1500}],
+        "Супермаркеты": [
+            {"date": "01.01.2022 00:00:00", "amount": 1000},
+            {"date": "15.01.2022 00:00:00", "amount": 2000},
+            {"date": "28.02.2022 23:59:59", "amount": 500},
+        ],
+        "Такси": [],
+    }
+
+
+def test_spending_by_category_same_order_for_store_and_frame(sample_transactions: pd.DataFrame, mocker: Any) -> None:
+    # Выгрузка банка идет от новых операций к старым
+    descending = sample_transactions.iloc[::-1].reset_index(drop=True)
+    store = TransactionStore.from_frame(parse_operations(descending))
+    mocker.patch("src.reports.get_store", return_value=store)
+
+    from_frame = json.loads(spending_by_category(descending, "Супермаркеты", "28.02.2022 23:59:59"))
+    from_store = json.loads(spending_by_category(None, "Супермаркеты", "28.02.2022 23:59:59"))
+    from_chunks = json.loads(
+        spending_by_category([descending.iloc[:2], descending.iloc[2:]], "Супермаркеты", "28.02.2022 23:59:59")
+    )
+    assert from_frame == from_store == from_chunks
+    assert [item["date"] for item in from_frame] == [
+        "01.01.2022 00:00:00",
+        "15.01.2022 00:00:00",
+        "28.02.2022 23:59:59",
+    ]
+
+
+def test_spending_by_category_chunks_merged_by_date() -> None:
+    # Порции идут от новых к старым, траты с одинаковой датой сохраняют порядок строк
+    chunks = [
+        pd.DataFrame(
+            {
+                "Категория": ["Супермаркеты", "Супермаркеты"],
+                "Дата операции": ["15.01.2022 00:00:00", "15.01.2022 00:00:00"],
+                "Сумма операции с округлением": [1, 2],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "Категория": ["Супермаркеты", "Супермаркеты"],
+                "Дата операции": ["15.01.2022 00:00:00", "01.01.2022 00:00:00"],
+                "Сумма операции с округлением": [3, 4],
+            }
+        ),
+    ]
+    result = json.loads(spending_by_category(chunks, "Супермаркеты", "28.02.2022 23:59:59"))
+    assert [item["amount"] for item in result] == [4, 1, 2, 3]
 
 
 if __name__ == "__main__":
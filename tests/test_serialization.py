@@ -0,0 +1,128 @@
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import serialization
+from src.serialization import dumps, dumps_str, get_backend, loads, register_backend, set_backend, to_payload
+
+BACKENDS = ["json"] + (["orjson"] if serialization.orjson is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request: pytest.FixtureRequest) -> Iterator[str]:
+    previous = get_backend()
+    set_backend(request.param)
+    yield request.param
+    set_backend(previous)
+
+
+def test_compact_output_by_default(backend: str) -> None:
+    value = {"greeting": "Добрый день", "cards": [{"last_digits": "5814", "total_spent": 1.5}]}
+    assert dumps_str(value) == json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    assert dumps(value) == dumps_str(value).encode("utf-8")
+
+
+def test_pretty_output(backend: str) -> None:
+    value = {"a": [1, 2]}
+    assert dumps_str(value, pretty=True) == json.dumps(value, indent=2)
+
+
+def test_numpy_and_pandas_values(backend: str) -> None:
+    value = {
+        "int": np.int64(3),
+        "float": np.float32(1.5),
+        "bool": np.bool_(True),
+        "array": np.array([1, 2]),
+        "timestamp": pd.Timestamp("2021-12-31 16:44:00"),
+        "date": date(2021, 12, 31),
+        "nat": pd.NaT,
+        "series": pd.Series([1.0, 2.0]),
+        "decimal": Decimal("2.5"),
+    }
+    assert loads(dumps(value)) == {
+        "int": 3,
+        "float": 1.5,
+        "bool": True,
+        "array": [1, 2],
+        "timestamp": "2021-12-31T16:44:00",
+        "date": "2021-12-31",
+        "nat": None,
+        "series": [1.0, 2.0],
+        "decimal": 2.5,
+    }
+
+
+def test_nan_is_written_as_null(backend: str) -> None:
+    frame = pd.DataFrame({"Номер карты": [np.nan, "*7197"], "Кэшбэк": [np.nan, 1.0]})
+    value = {
+        "records": frame.to_dict(orient="records"),
+        "float64": np.float64("nan"),
+        "float32": np.float32("inf"),
+        "array": np.array([1.0, np.nan]),
+        "series": pd.Series([np.nan]),
+        "python": [float("nan"), float("-inf")],
+        "decimal": Decimal("NaN"),
+    }
+    expected = {
+        "records": [{"Номер карты": None, "Кэшбэк": None}, {"Номер карты": "*7197", "Кэшбэк": 1.0}],
+        "float64": None,
+        "float32": None,
+        "array": [1.0, None],
+        "series": [None],
+        "python": [None, None],
+        "decimal": None,
+    }
+    for pretty in (False, True):
+        payload = dumps_str(value, pretty=pretty)
+        # Результат - корректный JSON: стандартный json разбирает его без расширения NaN
+        assert json.loads(payload, parse_constant=pytest.fail) == expected
+
+
+def test_backends_agree_on_nan() -> None:
+    if serialization.orjson is None:
+        pytest.skip("orjson не установлен")
+    value = [{"Сумма": np.float64("nan"), "Описание": "Константин Ф.", "Бонусы": 0}]
+    previous = get_backend()
+    payloads = []
+    try:
+        for name in ("json", "orjson"):
+            set_backend(name)
+            payloads.append(dumps(value))
+    finally:
+        set_backend(previous)
+    assert payloads[0] == payloads[1] == '[{"Сумма":null,"Описание":"Константин Ф.","Бонусы":0}]'.encode("utf-8")
+
+
+def test_unsupported_type_raises(backend: str) -> None:
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_to_payload_returns_bytes_or_str(backend: str) -> None:
+    assert to_payload([1], as_bytes=True) == b"[1]"
+    assert to_payload([1]) == "[1]"
+
+
+def test_register_and_select_backend() -> None:
+    previous = get_backend()
+    register_backend("upper", lambda value, pretty: json.dumps(value).upper())
+    try:
+        assert set_backend("upper") == "upper"
+        assert dumps_str(["a"]) == '["A"]'
+    finally:
+        set_backend(previous)
+    with pytest.raises(ValueError):
+        set_backend("unknown")
+
+
+def test_auto_prefers_orjson() -> None:
+    previous = get_backend()
+    try:
+        assert set_backend("auto") == ("orjson" if serialization.orjson is not None else "json")
+    finally:
+        set_backend(previous)
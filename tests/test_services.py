@@ -1,9 +1,12 @@
 import json
+import re
 from typing import Any, Dict, List
 
+import pandas as pd
 import pytest
 
-from src.services import get_transactions_ind
+from src.serialization import dumps_str
+from src.services import TRANSFER_TYPE_COLUMN, find_transfers, get_transactions_ind
 
 # Пример данных для тестов с необходимыми полями
 transactions_data: List[Dict[str, Any]] = [
@@ -81,7 +84,7 @@ transactions_data: List[Dict[str, Any]] = [
 def test_get_transactions_ind_success() -> None:
     """Тестируем успешный случай, когда есть соответствующие транзакции"""
     pattern: str = r"\b[А-Я][а-я]+\s[А-Я]\."  # Паттерн для поиска физических лиц
-    expected_result: str = json.dumps(
+    expected_result: str = dumps_str(
         [
             {
                 "Дата операции": "03.06.2018 14:19:08",
@@ -134,9 +137,7 @@ def test_get_transactions_ind_success() -> None:
                 "Округление на инвесткопилку": 0,
                 "Сумма операции с округлением": 3000.0,
             },
-        ],
-        ensure_ascii=False,
-        indent=2,
+        ]
     )
 
     result: str = get_transactions_ind(transactions_data, pattern)
@@ -168,5 +169,81 @@ def test_get_transactions_ind_missing_fields() -> None:
     assert result == "[]"
 
 
+def test_get_transactions_ind_dataframe() -> None:
+    """Тестируем случай, когда операции переданы датафреймом"""
+    pattern: str = r"\b[А-Я][а-я]+\s[А-Я]\."
+    result = json.loads(get_transactions_ind(pd.DataFrame(transactions_data), pattern))
+    assert [trans["Описание"] for trans in result] == ["Константин Ф.", "Иванов И.И.", "Петров П.П."]
+
+
+def test_find_transfers_tags_patterns() -> None:
+    """Тестируем, что каждый перевод отмечен именем сработавшего паттерна"""
+    transactions = transactions_data + [
+        {"Категория": "Переводы", "Описание": "Перевод по номеру +7 921 111-22-33"},
+        {"Категория": "Переводы", "Описание": 'На р/с ООО "ФОРТУНА"'},
+        {"Категория": "Переводы", "Описание": "Перевод Кредитная карта. ТП 10.2 RUR"},
+        {"Категория": "Мобильная связь", "Описание": "МТС +7 921 111-22-33"},
+    ]
+    result = json.loads(find_transfers(pd.DataFrame(transactions)))
+    assert [(trans["Описание"], trans[TRANSFER_TYPE_COLUMN]) for trans in result] == [
+        ("Константин Ф.", "individual"),
+        ("Иванов И.И.", "individual"),
+        ("Петров П.П.", "individual"),
+        ("Перевод по номеру +7 921 111-22-33", "phone"),
+        ('На р/с ООО "ФОРТУНА"', "organisation"),
+    ]
+
+
+def test_find_transfers_first_pattern_wins() -> None:
+    """Тестируем, что при совпадении нескольких паттернов берется первый по порядку"""
+    patterns = {"surname": r"[А-Я][а-я]+ [А-Я]\.[А-Я]\.", "any": r".+"}
+    result = json.loads(find_transfers(transactions_data, patterns))
+    assert [trans[TRANSFER_TYPE_COLUMN] for trans in result] == ["any", "surname", "surname"]
+
+
+def test_find_transfers_matches_loop() -> None:
+    """Тестируем, что векторный поиск совпадает с построчной проверкой re.match"""
+    df = pd.DataFrame(transactions_data * 3)
+    pattern = r"\b[А-Я][а-я]+\s[А-Я]\."
+    expected = [trans["Описание"] for trans in json.loads(get_transactions_ind(transactions_data * 3, pattern))]
+    result = json.loads(find_transfers(df, {"individual": pattern}))
+    assert [trans["Описание"] for trans in result] == expected
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (r"(?i)константин", ["Константин Ф."]),
+        (r"([А-Я])[а-я]+ \1\.", ["Иванов И.И.", "Петров П.П.", "Иван И."]),
+    ],
+)
+def test_transfer_patterns_used_as_is(pattern: str, expected: List[str]) -> None:
+    """Тестируем, что глобальные флаги и ссылки на группы по номеру работают, как в re.match"""
+    data = transactions_data + [{"Категория": "Переводы", "Описание": "Иван И."}]
+    assert [trans["Описание"] for trans in data if re.match(pattern, trans["Описание"])] == expected
+    assert [trans["Описание"] for trans in json.loads(get_transactions_ind(data, pattern))] == expected
+    assert [trans["Описание"] for trans in json.loads(get_transactions_ind(pd.DataFrame(data), pattern))] == expected
+
+    # Такие паттерны не объединяются в одно выражение, а проверяются по одному
+    result = json.loads(find_transfers(data, {"petrov": r"(?i)ПЕТРОВ", "individual": pattern}))
+    tagged = sorted(set(expected) | {"Петров П.П."}, key=[trans["Описание"] for trans in data].index)
+    assert [trans["Описание"] for trans in result] == tagged
+    assert {trans[TRANSFER_TYPE_COLUMN] for trans in result if trans["Описание"] == "Петров П.П."} == {"petrov"}
+
+
+def test_find_transfers_missing_columns() -> None:
+    """Тестируем случай, когда в операциях нет категории или описания"""
+    assert find_transfers([{"Описание": "Иванов И.И."}]) == "[]"
+    assert find_transfers([]) == "[]"
+
+
+def test_payload_as_bytes() -> None:
+    pattern = r"\b[А-Я][а-я]+\s[А-Я]\."
+    assert get_transactions_ind(transactions_data, pattern, as_bytes=True) == get_transactions_ind(
+        transactions_data, pattern
+    ).encode("utf-8")
+    assert find_transfers([], as_bytes=True) == b"[]"
+
+
 if __name__ == "__main__":
     pytest.main()
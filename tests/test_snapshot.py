@@ -0,0 +1,123 @@
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.snapshot as snapshot_module
+import src.store as store_module
+from src.records import TransactionBatch
+from src.snapshot import get_snapshot, open_snapshot, snapshot_dir, write_snapshot
+from src.store import TransactionStore, date_slice, load_operations
+from src.utils import get_dict_transaction, top_transaction
+from src.views import form_main_page_info
+
+
+# Небольшая выгрузка операций в формате operations.xlsx (строки не по порядку дат, одна дата некорректна)
+@pytest.fixture
+def operations_file(tmp_path: Path) -> Path:
+    path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": [
+                "31.12.2021 16:44:00",
+                "01.12.2021 10:00:00",
+                "неизвестно",
+                "15.12.2021 12:30:00",
+                "20.11.2021 09:00:00",
+            ],
+            "Номер карты": ["*7197", "*5091", "*7197", "*7197", "*5091"],
+            "Статус": ["OK", "OK", "OK", "OK", "FAILED"],
+            "Сумма платежа": [-160.89, -64.0, -10.0, -1500.0, 300.0],
+            "Валюта платежа": ["RUB", "RUB", "RUB", "RUB", "RUB"],
+            "Категория": ["Супермаркеты", "Фастфуд", "Фастфуд", "Переводы", None],
+            "Описание": ["Колхоз", "Mouse Tail", "Mouse Tail", "Иван Ф.", "Пополнение"],
+            "Бонусы (включая кэшбэк)": [3, 1, 0, 0, 0],
+        }
+    ).to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture
+def snapshot_root(tmp_path: Path, monkeypatch: Any) -> Path:
+    root = tmp_path / "snapshots"
+    # Кэш разобранных выгрузок тоже пишется во временную директорию, а не в data/.cache
+    monkeypatch.setattr(store_module, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(snapshot_module, "SNAPSHOT_DIR", root)
+    monkeypatch.setattr(snapshot_module, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(snapshot_module, "_opened", {})
+    return root
+
+
+@pytest.fixture
+def snapshot(operations_file: Path, snapshot_root: Path) -> Any:
+    write_snapshot(load_operations(operations_file, cache_dir=snapshot_root.parent / "cache"), operations_file)
+    return open_snapshot(operations_file)
+
+
+def test_snapshot_round_trip(snapshot: Any, operations_file: Path, snapshot_root: Path, monkeypatch: Any) -> None:
+    monkeypatch.setattr(snapshot_module, "SNAPSHOT_ENABLED", False)
+    expected = pd.DataFrame(get_dict_transaction(str(operations_file)))
+    pd.testing.assert_frame_equal(pd.DataFrame(snapshot.to_dicts()), expected)
+
+
+def test_snapshot_arrays_are_memory_mapped(snapshot: Any) -> None:
+    assert len(snapshot) == 5
+    assert isinstance(snapshot.batch.columns["payment_amount"], np.memmap)
+    assert isinstance(snapshot.rollups["card_spend"].to_arrays()["prefix"], np.memmap)
+    # Операции отсортированы по дате, операция без даты - первая
+    assert np.isnat(snapshot.batch.columns["date"][0])
+    assert list(snapshot.batch.column("description")[1:]) == ["Пополнение", "Mouse Tail", "Иван Ф.", "Колхоз"]
+
+
+def test_open_snapshot_is_memoized(snapshot: Any, operations_file: Path) -> None:
+    assert open_snapshot(operations_file) is snapshot
+
+
+def test_stale_snapshot_is_rejected(snapshot: Any, operations_file: Path) -> None:
+    stat = operations_file.stat()
+    os.utime(operations_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert open_snapshot(operations_file) is None
+
+
+def test_snapshot_matches_store(snapshot: Any, operations_file: Path, snapshot_root: Path) -> None:
+    store = TransactionStore.from_frame(load_operations(operations_file, cache_dir=snapshot_root.parent / "cache"))
+    start, end = pd.Timestamp("2021-12-01"), pd.Timestamp("2021-12-31 23:59:59")
+    window = snapshot.between(start, end)
+    assert isinstance(window, TransactionBatch)
+    assert len(window) == len(date_slice(store.frame(), start, end)) == 3
+    pd.testing.assert_series_equal(snapshot.card_spend(start, end), store.card_spend(start, end))
+    assert top_transaction(window) == top_transaction(date_slice(store.frame(), start, end))
+
+
+def test_get_snapshot_builds_missing_snapshot(operations_file: Path, snapshot_root: Path) -> None:
+    assert not snapshot_dir(operations_file).exists()
+    cache_dir = snapshot_root.parent / "build-cache"
+    snapshot = get_snapshot(operations_file, cache_dir=cache_dir)
+    assert snapshot is not None and len(snapshot) == 5
+    assert snapshot_dir(operations_file).parent == snapshot_root
+    assert any(cache_dir.iterdir())
+
+
+def test_get_snapshot_disabled(operations_file: Path, snapshot_root: Path, monkeypatch: Any) -> None:
+    monkeypatch.setattr(snapshot_module, "SNAPSHOT_ENABLED", False)
+    assert get_snapshot(operations_file) is None
+
+
+def test_form_main_page_info_uses_snapshot(snapshot: Any, mocker: Any) -> None:
+    TransactionStore.reset_instance()
+    mocker.patch("src.views.get_snapshot", return_value=snapshot)
+    get_store = mocker.patch("src.views.get_store")
+    mocker.patch("src.views.get_market_data", return_value=([], []))
+    mocker.patch("src.views.load_user_currencies", return_value=[])
+    mocker.patch("src.views.load_user_stocks", return_value=[])
+
+    result = form_main_page_info("2021-12-31 20:00:00")
+    get_store.assert_not_called()
+    assert result["cards"] == [
+        {"last_digits": "5091", "total_spent": 64.0, "cashback": 0.64},
+        {"last_digits": "7197", "total_spent": 1660.89, "cashback": 16.61},
+    ]
+    assert [item["description"] for item in result["top_transactions"]] == ["Иван Ф.", "Колхоз", "Mouse Tail"]
@@ -0,0 +1,266 @@
+import os
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+
+import src.store as store_module
+from src.store import (PARSED_DATE_COLUMN, TransactionStore, date_slice, get_store, index_by_date, is_date_indexed,
+                       load_operations, load_operations_many, parse_operations)
+
+
+# Небольшая выгрузка операций в формате operations.xlsx
+@pytest.fixture
+def operations_file(tmp_path: Path) -> Path:
+    path = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Номер карты": ["*7197", "*5091"],
+            "Сумма платежа": [-160.89, -64.0],
+            "Категория": ["Супермаркеты", "Фастфуд"],
+            "Описание": ["Колхоз", "Mouse Tail"],
+        }
+    ).to_excel(path, index=False)
+    return path
+
+
+def test_load_operations_parses_dates(operations_file: Path, tmp_path: Path) -> None:
+    df = load_operations(operations_file, cache_dir=tmp_path / "cache")
+    assert len(df) == 2
+    assert df[PARSED_DATE_COLUMN].iloc[0] == pd.Timestamp("2021-12-31 16:44:00")
+
+
+def test_load_operations_uses_cache(operations_file: Path, tmp_path: Path, mocker: Any) -> None:
+    load_operations(operations_file, cache_dir=tmp_path / "cache")
+    read_excel = mocker.patch("src.store.pd.read_excel")
+    df = load_operations(operations_file, cache_dir=tmp_path / "cache")
+    read_excel.assert_not_called()
+    assert list(df["Описание"]) == ["Колхоз", "Mouse Tail"]
+
+    # Изменение времени модификации без изменения содержимого не пересобирает кэш
+    os.utime(operations_file, ns=(0, 0))
+    load_operations(operations_file, cache_dir=tmp_path / "cache")
+    read_excel.assert_not_called()
+
+
+def test_load_operations_rebuilds_on_change(operations_file: Path, tmp_path: Path) -> None:
+    load_operations(operations_file, cache_dir=tmp_path / "cache")
+    pd.DataFrame({"Дата операции": ["01.01.2022 00:00:00"], "Описание": ["Новая"]}).to_excel(
+        operations_file, index=False
+    )
+    df = load_operations(operations_file, cache_dir=tmp_path / "cache")
+    assert list(df["Описание"]) == ["Новая"]
+
+
+def test_load_operations_missing_file(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        load_operations(tmp_path / "missing.xlsx", cache_dir=tmp_path / "cache")
+
+
+def test_transaction_store_loads_once(operations_file: Path, tmp_path: Path, mocker: Any) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    loader = mocker.patch("src.store.load_operations", wraps=load_operations)
+    first = store.frame()
+    second = store.frame()
+    assert loader.call_count == 1
+    assert first is not second  # Каждый вызов получает свое представление
+
+    # Изменение представления не затрагивает данные хранилища
+    first["Описание"] = "Изменено"
+    assert list(store.frame()["Описание"]) == ["Mouse Tail", "Колхоз"]  # Отсортировано по дате
+
+
+def test_transaction_store_reloads_changed_file(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    store.frame()
+    pd.DataFrame({"Дата операции": ["01.01.2022 00:00:00"], "Описание": ["Новая"]}).to_excel(
+        operations_file, index=False
+    )
+    store.refresh()
+    assert list(store.frame()["Описание"]) == ["Новая"]
+
+
+def test_transaction_store_from_frame() -> None:
+    store = TransactionStore.from_frame(
+        parse_operations(pd.DataFrame({"Дата операции": ["02.01.2022 00:00:00", "01.01.2022 00:00:00"]}))
+    )
+    assert list(store.refresh().index) == [pd.Timestamp("2022-01-01"), pd.Timestamp("2022-01-02")]
+
+
+def test_transaction_store_from_files(tmp_path: Path) -> None:
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    for month in (1, 2, 3):
+        pd.DataFrame(
+            {"Дата операции": [f"0{month}.{month:02d}.2022 10:00:00"], "Описание": [f"Операция {month}"]}
+        ).to_excel(exports / f"operations_{month}.xlsx", index=False)
+
+    store = TransactionStore.from_files(exports, max_workers=2, cache_dir=tmp_path / "cache")
+    assert list(store.frame()["Описание"]) == ["Операция 1", "Операция 2", "Операция 3"]
+    assert [item["rows"] for item in store.load_report] == [1, 1, 1]
+
+    glob_store = TransactionStore.from_files(exports / "operations_[12].xlsx", cache_dir=tmp_path / "cache")
+    assert len(glob_store.frame()) == 2
+
+
+def test_load_operations_many_schema_mismatch(tmp_path: Path) -> None:
+    pd.DataFrame({"Дата операции": ["01.01.2022 10:00:00"], "Описание": ["А"]}).to_excel(
+        tmp_path / "a.xlsx", index=False
+    )
+    pd.DataFrame({"Дата операции": ["01.01.2022 10:00:00"], "Сумма": [1]}).to_excel(tmp_path / "b.xlsx", index=False)
+    with pytest.raises(ValueError):
+        load_operations_many(tmp_path, cache_dir=tmp_path / "cache")
+    with pytest.raises(FileNotFoundError):
+        load_operations_many(tmp_path / "*.csv")
+
+
+def test_get_store_is_singleton() -> None:
+    TransactionStore.reset_instance()
+    assert not TransactionStore.is_loaded()
+    assert get_store() is get_store()
+    assert TransactionStore.is_loaded()
+    TransactionStore.reset_instance()
+
+
+def test_index_by_date_sorts_operations() -> None:
+    df = index_by_date(
+        parse_operations(
+            pd.DataFrame({"Дата операции": ["02.01.2022 00:00:00", "неверная дата", "01.01.2022 00:00:00"]})
+        )
+    )
+    assert is_date_indexed(df)
+    assert list(df["Дата операции"]) == ["неверная дата", "01.01.2022 00:00:00", "02.01.2022 00:00:00"]
+
+
+def test_date_slice_indexed_and_plain() -> None:
+    plain = pd.DataFrame(
+        {
+            "Дата операции": ["15.12.2021 10:00:00", "01.12.2021 00:00:00", "30.11.2021 23:59:59", "неверная дата"],
+            "Сумма платежа": [-1.0, -2.0, -3.0, -4.0],
+        }
+    )
+    indexed = index_by_date(parse_operations(plain.copy()))
+    start, end = pd.Timestamp("2021-12-01 00:00:00"), pd.Timestamp("2021-12-15 10:00:00")
+
+    assert sorted(date_slice(indexed, start, end)["Сумма платежа"]) == [-2.0, -1.0]
+    assert sorted(date_slice(plain, start, end)["Сумма платежа"]) == [-2.0, -1.0]
+    assert date_slice(indexed, pd.Timestamp("2022-01-01"), pd.Timestamp("2022-02-01")).empty
+
+
+def test_transaction_store_between(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    result = store.between(pd.Timestamp("2021-12-31 00:00:00"), pd.Timestamp("2021-12-31 23:59:59"))
+    assert list(result["Описание"]) == ["Колхоз"]
+
+
+def test_transaction_store_frame_is_read_only(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    before = store.frame().copy()
+    frame = store.frame()
+    with pytest.raises(ValueError):
+        frame.iloc[0, frame.columns.get_loc("Сумма платежа")] = 999
+    with pytest.raises(ValueError):
+        frame.loc[frame.index[0], "Номер карты"] = "HACK"
+    # Замена колонки целиком меняет только копию
+    frame["Номер карты"] = "HACK"
+
+    pd.testing.assert_frame_equal(store.frame(), before)
+    period = (pd.Timestamp("2021-12-01"), pd.Timestamp("2021-12-31 23:59:59"))
+    assert store.card_spend(*period).to_dict() == before.groupby("Номер карты")["Сумма платежа"].sum().to_dict()
+
+    # Слитые с хранилищем дописанные порции тоже защищены от записи
+    assert store.append(before.reset_index(drop=True).assign(**{"Дата операции": "01.01.2022 09:00:00"})) == 2
+    frame = store.frame()
+    with pytest.raises(ValueError):
+        frame.iloc[-1, 0] = "HACK"
+
+
+def test_transaction_store_append_only_new_rows(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    store.frame()
+    assert store.high_water_mark == pd.Timestamp("2021-12-31 16:44:00")
+
+    # Новая выгрузка пересекается со старой: уже загруженные строки не дописываются
+    newer = pd.DataFrame(
+        {
+            "Дата операции": [
+                "01.01.2022 09:00:00",
+                "31.12.2021 16:44:00",
+                "31.12.2021 16:44:00",
+                "30.12.2021 10:00:00",
+            ],
+            "Номер карты": ["*7197", "*7197", "*5091", "*5091"],
+            "Сумма платежа": [-10.0, -160.89, -5.0, -64.0],
+            "Категория": ["Фастфуд", "Супермаркеты", "Фастфуд", "Фастфуд"],
+            "Описание": ["Новая", "Колхоз", "Та же секунда", "Mouse Tail"],
+        }
+    )
+    assert store.append(newer) == 2
+    assert store.append(newer) == 0
+    assert list(store.frame()["Описание"]) == ["Mouse Tail", "Колхоз", "Та же секунда", "Новая"]
+    assert store.high_water_mark == pd.Timestamp("2022-01-01 09:00:00")
+
+    period = (pd.Timestamp("2021-12-01"), pd.Timestamp("2022-01-31"))
+    assert store.card_spend(*period).to_dict() == {"*5091": -69.0, "*7197": -170.89}
+
+
+def test_transaction_store_append_keeps_duplicates_at_mark(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    store.frame()
+    row = {
+        "Дата операции": "31.12.2021 16:44:00",
+        "Номер карты": "*7197",
+        "Сумма платежа": -160.89,
+        "Категория": "Супермаркеты",
+        "Описание": "Колхоз",
+    }
+
+    # Две одинаковые операции в ту же секунду: одна уже загружена, вторая новая
+    assert store.append(pd.DataFrame([row, row])) == 1
+    assert store.append(pd.DataFrame([row, row])) == 0
+    assert store.append(pd.DataFrame([row, row, row])) == 1
+    assert list(store.frame()["Описание"]) == ["Mouse Tail", "Колхоз", "Колхоз", "Колхоз"]
+
+    period = (pd.Timestamp("2021-12-31"), pd.Timestamp("2021-12-31 23:59:59"))
+    assert store.card_spend(*period)["*7197"] == pytest.approx(-482.67)
+
+
+def test_transaction_store_append_schema_mismatch(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    with pytest.raises(ValueError):
+        store.append(pd.DataFrame({"Дата операции": ["01.01.2022 09:00:00"], "Сумма": [1]}))
+
+
+def test_transaction_store_incremental_refresh(operations_file: Path, tmp_path: Path) -> None:
+    store = TransactionStore(operations_file, cache_dir=tmp_path / "cache")
+    store.frame()
+    df = pd.read_excel(operations_file)
+    new_row = {
+        "Дата операции": "02.01.2022 12:00:00",
+        "Номер карты": "*1111",
+        "Сумма платежа": -1.0,
+        "Категория": "Такси",
+        "Описание": "Новая",
+    }
+    pd.concat([pd.DataFrame([new_row]), df]).to_excel(operations_file, index=False)
+    os.utime(operations_file, ns=(0, 0))
+
+    store.refresh(incremental=True)
+    assert list(store.frame()["Описание"]) == ["Mouse Tail", "Колхоз", "Новая"]
+    assert store.card_spend(pd.Timestamp("2022-01-01"), pd.Timestamp("2022-01-31")).to_dict() == {
+        "*1111": -1.0, "*5091": 0.0, "*7197": 0.0
+    }
+
+
+def test_transaction_store_caches_parsed_dates(operations_file: Path, tmp_path: Path, mocker: Any) -> None:
+    df = pd.read_excel(operations_file).assign(**{"Дата платежа": ["31.12.2021", "30.12.2021"]})
+    store = TransactionStore.from_frame(parse_operations(df))
+    parse = mocker.spy(store_module, "parse_date_column")
+
+    payments = store.dates("Дата платежа")
+    assert list(payments) == [pd.Timestamp("2021-12-30"), pd.Timestamp("2021-12-31")]
+    assert store.dates("Дата платежа") is payments
+    assert list(store.dates()) == list(store.frame().index)
+    assert parse.call_count == 1
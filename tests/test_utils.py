@@ -4,10 +4,12 @@ from unittest.mock import MagicMock
 
 import pandas as pd
 import pytest
+import requests
 from freezegun import freeze_time
 
-from src.utils import (get_currency_rates, get_data, get_dict_transaction, get_expenses_cards, get_stock_price,
-                       greeting_by_time_of_day, top_transaction)
+from src.market_data import quote_cache
+from src.utils import (get_currency_rates, get_data, get_dict_transaction, get_expenses_cards, get_market_data,
+                       get_stock_price, greeting_by_time_of_day, top_transaction)
 
 # Тестовые данные
 mock_transactions = pd.DataFrame({
@@ -22,6 +24,12 @@ mock_transactions = pd.DataFrame({
 mock_transactions["Дата операции"] = pd.to_datetime(mock_transactions["Дата операции"], dayfirst=True)
 
 
+# Котировки не должны переходить из одного теста в другой через общий кэш
+@pytest.fixture(autouse=True)
+def clear_quote_cache() -> None:
+    quote_cache.clear()
+
+
 @freeze_time("2022-01-01 08:00:00")
 def test_greeting_by_time_of_day() -> None:
     assert greeting_by_time_of_day() == "Доброе утро"
@@ -48,19 +56,26 @@ def test_get_expenses_cards() -> None:
     assert result[0]["last_digits"] == "5678"  # Проверяем последние 4 цифры первой карты
 
 
+def test_get_expenses_cards_from_totals() -> None:
+    totals = pd.Series({"*1111": -1200.0, "*2222": 0.0})
+    result = get_expenses_cards(totals)
+    assert result == [{"last_digits": "1111", "total_spent": 1200.0, "cashback": 12.0}]
+
+
 def test_get_dict_transaction(mocker: Any) -> None:
-    # Используем mock для pd.read_excel
-    mocker.patch("src.utils.pd.read_excel", return_value=mock_transactions)
+    # Используем mock для загрузчика операций
+    mocker.patch("src.utils.load_operations", return_value=mock_transactions.assign(datetime=pd.NaT))
     mocker.patch("os.path.isfile", return_value=True)  # Мокируем os.path.isfile
     result = get_dict_transaction("fake_path.xlsx")  # Это не вызовет ошибку
     assert len(result) == 3  # Ожидаем 3 транзакции
+    assert "datetime" not in result[0]  # Служебная колонка не попадает в словари
 
 
 def test_get_currency_rates(mocker: Any, monkeypatch: pytest.MonkeyPatch) -> None:
     # Устанавливаем переменную окружения API_KEY
     monkeypatch.setenv("API_KEY", "fake_api_key")
 
-    mocker.patch("src.utils.requests.get", return_value=MagicMock(status_code=200, json=lambda: {
+    mocker.patch("src.utils.http_get", return_value=MagicMock(status_code=200, json=lambda: {
         'rates': {
             'RUB': 73.21,
             'EUR': 87.08,
@@ -72,7 +87,7 @@ def test_get_currency_rates(mocker: Any, monkeypatch: pytest.MonkeyPatch) -> Non
 
 
 def test_get_stock_price(mocker: Any) -> None:
-    mocker.patch("src.utils.requests.get", return_value=MagicMock(status_code=200, json=lambda: {
+    mocker.patch("src.utils.http_get", return_value=MagicMock(status_code=200, json=lambda: {
         "Global Quote": {
             "05. price": "150.12"
         }
@@ -82,5 +97,25 @@ def test_get_stock_price(mocker: Any) -> None:
     assert result[0]["stock"] == "AAPL"  # Проверяем, что акция - это AAPL
 
 
+def test_get_stock_price_concurrent_keeps_order(mocker: Any) -> None:
+    def fake_get(url: str) -> MagicMock:
+        if "symbol=BAD" in url:
+            raise requests.ConnectionError("нет соединения")
+        symbol = url.split("symbol=")[1].split("&")[0]
+        return MagicMock(status_code=200, json=lambda: {"Global Quote": {"05. price": str(len(symbol))}})
+
+    mocker.patch("src.utils.http_get", side_effect=fake_get)
+    result = get_stock_price(["AAPL", "BAD", "MSFT", "TSLA"])
+    assert [item["stock"] for item in result] == ["AAPL", "MSFT", "TSLA"]
+
+
+def test_get_market_data(mocker: Any) -> None:
+    mocker.patch("src.utils.get_currency_rates", return_value=[{"currency": "USD", "rate": 73.21}])
+    mocker.patch("src.utils.get_stock_price", return_value=[{"stock": "AAPL", "price": 150.12}])
+    currency_rates, stock_prices = get_market_data(["USD"], ["AAPL"])
+    assert currency_rates == [{"currency": "USD", "rate": 73.21}]
+    assert stock_prices == [{"stock": "AAPL", "price": 150.12}]
+
+
 if __name__ == "__main__":
     pytest.main()
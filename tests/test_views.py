@@ -1,46 +1,32 @@
+import asyncio
 import json
-import logging
-import os
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 
 import pandas as pd
 
-from src.views import form_main_page_info
-
-# Настройка логирования
-log_directory = "../logs"
-
-# Проверка на существование директории для логов
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
-
-logger = logging.getLogger("logs")
-logger.setLevel(logging.INFO)
-
-# Проверка на наличие обработчиков, чтобы избежать дублирования
-if not logger.hasHandlers():
-    file_handler = logging.FileHandler(os.path.join(log_directory, "views.log"), encoding="utf-8")
-    file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s: %(message)s")
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+from src.config import UserSettings
+from src.store import TransactionStore, parse_operations
+from src.views import form_main_page_info, form_main_page_info_async, form_main_page_info_batch
 
 
 class TestFormMainPageInfo(unittest.TestCase):
 
     @patch("src.views.greeting_by_time_of_day")
     @patch("src.views.get_expenses_cards")
-    @patch("src.views.pd.read_excel")
-    def test_form_main_page_info(self, mock_read_excel, mock_get_expenses_cards, mock_greeting_by_time_of_day):
+    @patch("src.views.get_store")
+    def test_form_main_page_info(self, mock_get_store, mock_get_expenses_cards, mock_greeting_by_time_of_day):
 
-        mock_read_excel.return_value = pd.DataFrame(
+        mock_get_store.return_value.frame.return_value = parse_operations(pd.DataFrame(
             {
                 "Дата операции": ["10.12.2021 16:02:10", "15.12.2021 13:01:22", "26.12.2021 01:12:25"],
                 "Сумма платежа": [-200, -300, -150],
                 "Категория": ["Еда", "Транспорт", "Развлечения"],  # Добавьте этот столбец
                 "Описание": ["Ужин", "Такси", "Фильм"],  # И этот
             }
-        )
+        ))
 
         # Настройка mock для get_expenses_cards, чтобы возвращал реальные данные
         mock_get_expenses_cards.return_value = [{"cards": "1234", "amount": 100}, {"cards": "6789", "amount": 200}]
@@ -55,17 +41,114 @@ class TestFormMainPageInfo(unittest.TestCase):
         self.assertEqual(len(result_data["cards"]), 2)  # Ожидаем 2 карточки
 
     def test_invalid_date_format(self) -> None:
-        with patch("src.views.pd.read_excel"):
+        with patch("src.views.get_store"):
             result = form_main_page_info("invalid_date")
             result_data = json.loads(result)
             self.assertEqual(result_data["error"], "Некорректный формат даты.")
 
     def test_read_excel_error(self) -> None:
-        with patch("src.views.pd.read_excel", side_effect=FileNotFoundError):
+        with patch("src.views.get_store", side_effect=FileNotFoundError):
             result = form_main_page_info("2021-12-17 14:52:20")
             result_data = json.loads(result)
             self.assertEqual(result_data["error"], "Не удалось прочитать данные.")
 
+    @patch("src.views.greeting_by_time_of_day", return_value="Добрый день")
+    @patch("src.views.get_market_data", return_value=([{"currency": "USD", "rate": 73.21}], []))
+    @patch("src.views.get_store")
+    def test_form_main_page_info_async(self, mock_get_store, mock_get_market_data, mock_greeting_by_time_of_day):
+        mock_get_store.return_value.frame.return_value = parse_operations(pd.DataFrame(
+            {
+                "Дата операции": ["10.12.2021 16:02:10", "15.12.2021 13:01:22"],
+                "Номер карты": ["*1234", "*1234"],
+                "Сумма платежа": [-200, -300],
+                "Категория": ["Еда", "Транспорт"],
+                "Описание": ["Ужин", "Такси"],
+            }
+        ))
+        mock_get_store.return_value.card_spend.return_value = pd.Series({"*1234": -500.0})
+
+        result_async = asyncio.run(form_main_page_info_async("2021-12-25 14:52:20"))
+        self.assertEqual(result_async, form_main_page_info("2021-12-25 14:52:20"))
+        self.assertEqual(result_async["cards"], [{"last_digits": "1234", "total_spent": 500.0, "cashback": 5.0}])
+        self.assertEqual(result_async["currency_rates"], [{"currency": "USD", "rate": 73.21}])
+
+    def test_form_main_page_info_async_invalid_date(self) -> None:
+        result = asyncio.run(form_main_page_info_async("invalid_date"))
+        self.assertEqual(json.loads(result)["error"], "Некорректный формат даты.")
+
+    @patch("src.views.greeting_by_time_of_day", return_value="Добрый день")
+    @patch("src.views.get_market_data")
+    def test_form_main_page_info_batch(self, mock_get_market_data, mock_greeting_by_time_of_day):
+        mock_get_market_data.return_value = (
+            [{"currency": "USD", "rate": 73.21}, {"currency": "EUR", "rate": 84.1}],
+            [{"stock": "AAPL", "price": 150.12}, {"stock": "TSLA", "price": 900.0}],
+        )
+        store = TransactionStore.from_frame(parse_operations(pd.DataFrame(
+            {
+                "Дата операции": ["10.11.2021 16:02:10", "15.12.2021 13:01:22", "16.12.2021 10:00:00"],
+                "Номер карты": ["*1111", "*1234", "*1234"],
+                "Сумма платежа": [-200.0, -300.0, -100.0],
+                "Категория": ["Еда", "Транспорт", "Еда"],
+                "Описание": ["Ужин", "Такси", "Обед"],
+            }
+        )))
+        profiles = {
+            "eur": {"user_currencies": ["EUR"], "user_stocks": ["TSLA"]},
+            "usd": {"user_currencies": ["USD"], "user_stocks": ["AAPL"]},
+        }
+
+        with patch("src.views.get_store", return_value=store):
+            result = form_main_page_info_batch(
+                ["2021-11-30 23:59:59", "2021-12-15 23:59:59", "invalid_date"], profiles=profiles
+            )
+
+        mock_get_market_data.assert_called_once_with(["EUR", "USD"], ["AAPL", "TSLA"])
+        november, december, invalid = result["eur"]
+        self.assertEqual(november["cards"], [{"last_digits": "1111", "total_spent": 200.0, "cashback": 2.0}])
+        self.assertEqual(december["cards"], [{"last_digits": "1234", "total_spent": 300.0, "cashback": 3.0}])
+        self.assertEqual([rate["currency"] for rate in december["currency_rates"]], ["USD", "EUR"])
+        self.assertEqual(december["stock_prices"], [{"stock": "TSLA", "price": 900.0}])
+        self.assertEqual(json.loads(invalid)["error"], "Некорректный формат даты.")
+        self.assertEqual(result["usd"][1]["stock_prices"], [{"stock": "AAPL", "price": 150.12}])
+
+    @patch("src.views.greeting_by_time_of_day", return_value="Добрый день")
+    @patch("src.views.get_market_data", return_value=([], []))
+    @patch("src.views.get_store")
+    def test_form_main_page_info_profile(self, mock_get_store, mock_get_market_data, mock_greeting_by_time_of_day):
+        mock_get_store.return_value.frame.return_value = parse_operations(pd.DataFrame(
+            {
+                "Дата операции": ["10.12.2021 16:02:10"],
+                "Номер карты": ["*1234"],
+                "Сумма платежа": [-200.0],
+                "Категория": ["Еда"],
+                "Описание": ["Ужин"],
+            }
+        ))
+        mock_get_store.return_value.card_spend.return_value = pd.Series({"*1234": -200.0})
+        settings = UserSettings(Path(self.enterContext(tempfile.TemporaryDirectory())) / "user_settings.json")
+        settings.path.write_text(json.dumps({
+            "user_currencies": ["USD"],
+            "user_stocks": ["AAPL"],
+            "profiles": {"eur": {"user_currencies": ["EUR"]}},
+        }), encoding="utf-8")
+
+        with patch("src.config.user_settings", settings), patch("src.views.user_settings", settings):
+            form_main_page_info("2021-12-25 14:52:20", profile="eur")
+            mock_get_market_data.assert_called_once_with(["EUR"], ["AAPL"])
+            result = form_main_page_info("2021-12-25 14:52:20", return_json=True, profile="unknown")
+            self.assertEqual(json.loads(result)["error"], "Профиль настроек не найден.")
+            batch = form_main_page_info_batch(["2021-12-25 14:52:20"], profiles=["default", "eur"])
+        self.assertEqual(set(batch), {"default", "eur"})
+
+    @patch("src.views.get_market_data")
+    @patch("src.views.get_store")
+    def test_form_main_page_info_batch_invalid_profile(self, mock_get_store, mock_get_market_data):
+        for profile in ({"user_currencies": ["USD"]}, ["USD"]):
+            result = form_main_page_info_batch(["2021-12-25 14:52:20"], profiles={"usd": profile})
+            self.assertEqual(json.loads(result)["error"], "Некорректный профиль настроек.")
+        mock_get_store.assert_not_called()
+        mock_get_market_data.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()